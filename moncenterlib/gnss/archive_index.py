@@ -0,0 +1,335 @@
+"""
+This module is designed for indexing of a local archive of GNSS files.
+- persistent SQLite index of path, size, mtime, type, version, marker and start/end time of every file;
+- incremental refresh, only new and changed files are opened, removed files are dropped from the index;
+- queries by directory, type, marker and time, RtkLibPost.match_files and Anubis.scan_dirs can use the index
+  instead of scanning directories.
+
+Types of files are detected by content: obs and nav (RINEX 2, 3), clk (RINEX clock), sp3, ionex, erp and dcb
+(SINEX bias). Only headers (or the first lines) of files are read. Files which can't be read
+(other formats, compressed files) are kept in the index without the type, so they aren't opened again until they change.
+"""
+
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from logging import Logger
+import os
+import sqlite3
+from typeguard import typechecked
+import moncenterlib.tools as mcl_tools
+from moncenterlib.gnss.tools import get_marker, parse_rinex_header
+
+
+# Version of the schema of the index, it's kept in PRAGMA user_version
+_INDEX_VERSION = 1
+_FILE_TYPES = ("obs", "nav", "clk", "sp3", "ionex", "erp", "dcb")
+# Types of RINEX 2, 3 navigation files (GPS, GLONASS, SBAS, Galileo and mixed)
+_NAV_TYPES = "NGHL"
+_GPS_EPOCH = datetime(1980, 1, 6)
+_MJD_EPOCH = datetime(1858, 11, 17)
+# Columns of the table and keys of files, "end" is a keyword of SQL, so times are start_time and end_time
+_COLUMNS = ("path", "size", "mtime_ns", "type", "version", "marker", "start_time", "end_time")
+_KEYS = ("path", "size", "mtime_ns", "type", "version", "marker", "start", "end")
+
+
+def _year4(year: int) -> int:
+    """Two-digit years 80-99 are 19xx, 00-79 are 20xx."""
+    if year < 100:
+        year += 1900 if year >= 80 else 2000
+    return year
+
+
+def _split(line: str, number: int) -> list[str]:
+    """Fields of the line. Raise ValueError if the line has fewer fields."""
+    fields = line.split()
+    if len(fields) < number:
+        raise ValueError(f"Line '{line.strip()}' has fewer than {number} fields.")
+    return fields
+
+
+def _parse_time(fields: list[str]) -> datetime:
+    if len(fields) < 6:
+        raise ValueError(f"Time {' '.join(fields)} is incomplete.")
+    year, month, day, hour, minute = (int(i) for i in fields[:5])
+    return datetime(_year4(year), month, day, hour, minute) + timedelta(seconds=float(fields[5]))
+
+
+def _parse_doy(value: str) -> datetime:
+    year, doy, seconds = value.split(":")
+    return datetime(_year4(int(year)), 1, 1) + timedelta(days=int(doy) - 1, seconds=int(seconds))
+
+
+def _read_rinex(f, path2file: str) -> tuple:
+    f.seek(0)
+    header, is_end = parse_rinex_header(f)
+    if header.file_type == "O":
+        return "obs", header.version, get_marker(header, path2file), header.time_first_obs, header.time_last_obs
+
+    if header.file_type in _NAV_TYPES and is_end:
+        line = f.readline()
+        if header.version.startswith("2"):
+            fields = [line[2:5], line[5:8], line[8:11], line[11:14], line[14:17], line[17:22]]
+        else:
+            fields = [line[4:8], line[9:11], line[12:14], line[15:17], line[18:20], line[21:23]]
+        return "nav", header.version, "", _parse_time(fields), None
+    return (None,) * 5
+
+
+def _read_clk(f) -> tuple:
+    f.seek(0)
+    version = _split(f.readline(), 1)[0]
+    if not (version.startswith("2") or version.startswith("3")):
+        raise ValueError(f"Unknown version rinex {version}")
+    for line in f:
+        # the date of the file is in the comment "GPS week: 2190 Day: 0" as RtkLibPost reads it
+        if "GPS week" in line:
+            fields = _split(line, 5)
+            return "clk", version, "", _GPS_EPOCH + timedelta(weeks=int(fields[2]), days=int(fields[4])), None
+        if "END OF HEADER" in line:
+            break
+    return "clk", version, "", None, None
+
+
+def _read_sp3(f, line: str) -> tuple:
+    start = _parse_time(line[3:31].split())
+    epochs = int(line[32:39])
+    interval = float(_split(f.readline(), 4)[3])
+    return "sp3", line[1], "", start, start + timedelta(seconds=interval * (epochs - 1))
+
+
+def _read_ionex(f, line: str) -> tuple:
+    version = line.split()[0]
+    start, end = None, None
+    for line in f:
+        if "EPOCH OF FIRST MAP" in line:
+            start = _parse_time(line.split()[:6])
+        elif "EPOCH OF LAST MAP" in line:
+            end = _parse_time(line.split()[:6])
+        elif "END OF HEADER" in line:
+            break
+    return "ionex", version, "", start, end
+
+
+def _read_erp(f, line: str) -> tuple:
+    version = _split(line, 2)[1]
+    # 3 lines of the header after the version
+    lines = f.readlines()[3:]
+    mjd = [float(i.split()[0]) for i in lines if i.strip()]
+    return "erp", version, "", _MJD_EPOCH + timedelta(days=min(mjd)), _MJD_EPOCH + timedelta(days=max(mjd))
+
+
+def _read_file_info(path2file: str) -> tuple[tuple, str | None]:
+    """Type, version, marker, start and end of the file. All are None if the file isn't known.
+    The second element is the error if the file can't be read (e.g. it's compressed) or its header is broken."""
+    try:
+        with open(path2file, 'r', encoding="utf-8") as f:
+            line = f.readline()
+            if "RINEX VERSION / TYPE" in line:
+                # clock RINEX has the type "C"
+                return (_read_clk(f) if line[20:21] == "C" else _read_rinex(f, path2file)), None
+            if "IONEX VERSION / TYPE" in line:
+                return _read_ionex(f, line), None
+            if line[:2] in ("#c", "#d"):
+                return _read_sp3(f, line), None
+            if line.startswith("%=BIA"):
+                fields = _split(line, 7)
+                return ("dcb", fields[1], "", _parse_doy(fields[5]), _parse_doy(fields[6])), None
+            if line.lower().startswith("version"):
+                return _read_erp(f, line), None
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return (None,) * 5, str(e)
+    return (None,) * 5, None
+
+
+def _scan_dir(path_dir: str, recursion: bool) -> dict[str, tuple[int, int]]:
+    """Size and mtime of files of the directory, the files aren't opened."""
+    files = {}
+    dirs = [path_dir]
+    while dirs:
+        with os.scandir(dirs.pop()) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                elif recursion and entry.is_dir():
+                    dirs.append(entry.path)
+    return files
+
+
+class ArchiveIndex:
+    """
+    This class is a persistent index of files of a local GNSS archive in SQLite database.
+    The index is updated by refresh(), only new and changed files (size or mtime) are read.
+    """
+    @typechecked
+    def __init__(self, path_db: str, logger: bool | Logger | None = None) -> None:
+        """
+        Args:
+            path_db (str): Path to the database file. It's created if it doesn't exist.
+            logger (bool | Logger, optional): if the logger is None, a logger will be created inside the default class.
+                If the logger is False, then no information will be output.
+                If you pass an instance of your logger, the information output will be implemented according to your logger.
+                Defaults to None.
+
+        Raises:
+            ValueError: Version of the index isn't supported.
+        """
+        self.logger = logger
+        if self.logger in [None, False]:
+            self.logger = mcl_tools.create_simple_logger("ArchiveIndex", logger)
+
+        self.path_db = path_db
+        self.__db = sqlite3.connect(path_db)
+        version = self.__db.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            with self.__db:
+                self.__db.execute("""CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY, dir TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+                    type TEXT, version TEXT, marker TEXT, start_time TEXT, end_time TEXT)""")
+                self.__db.execute("CREATE INDEX IF NOT EXISTS files_dir ON files (dir)")
+                self.__db.execute("CREATE INDEX IF NOT EXISTS files_type_start ON files (type, start_time)")
+                self.__db.execute(f"PRAGMA user_version = {_INDEX_VERSION}")
+        elif version != _INDEX_VERSION:
+            self.__db.close()
+            raise ValueError("Version of the index isn't supported.")
+
+    def close(self) -> None:
+        """Close the database."""
+        self.__db.close()
+
+    def __enter__(self) -> "ArchiveIndex":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __dir_filter(self, path_dir: str, recursion: bool) -> tuple[str, list[str]]:
+        path_dir = os.path.abspath(path_dir)
+        if not recursion:
+            return "dir = ?", [path_dir]
+        # all subdirectories are between "path_dir/" and "path_dir0" ("0" follows "/")
+        prefix = path_dir.rstrip(os.sep) + os.sep
+        return "(dir = ? OR (dir >= ? AND dir < ?))", [path_dir, prefix, prefix[:-1] + chr(ord(os.sep) + 1)]
+
+    @typechecked
+    def refresh(self, path_dir: str, recursion: bool = True, workers: int = 1) -> dict[str, int]:
+        """This method updates the index of files of the directory. The directory is scanned without opening of files,
+        only new files and files with other size or mtime are read. Files which are removed from the directory
+        are removed from the index. Files which can't be read are logged and kept in the index without the type.
+
+        Args:
+            path_dir (str): Path to the directory of the archive.
+            recursion (bool, optional): Scan subdirectories. Defaults to True.
+            workers (int, optional): The number of parallel processes which read files. Defaults to 1.
+
+        Raises:
+            ValueError: Path '{path_dir}' to dir is strange.
+            ValueError: Number of workers must be positive.
+
+        Returns:
+            dict[str, int]: Numbers of "added", "changed", "removed" and "unchanged" files.
+
+        Examples:
+            >>> index = ArchiveIndex("/path/to/archive.sqlite")
+            >>> index.refresh("/path/to/archive", workers=8)
+            {'added': 12, 'changed': 1, 'removed': 0, 'unchanged': 499987}
+        """
+        if not os.path.isdir(path_dir):
+            raise ValueError(f"Path '{path_dir}' to dir is strange.")
+        if workers <= 0:
+            raise ValueError("Number of workers must be positive.")
+
+        files = _scan_dir(os.path.abspath(path_dir), recursion)
+        where, params = self.__dir_filter(path_dir, recursion)
+        indexed = {path: (size, mtime_ns) for path, size, mtime_ns in
+                   self.__db.execute(f"SELECT path, size, mtime_ns FROM files WHERE {where}", params)}
+
+        paths = [path for path, stat in files.items() if indexed.get(path) != stat]
+        removed = [(path,) for path in indexed if path not in files]
+
+        if workers == 1:
+            infos = [_read_file_info(path) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                infos = list(executor.map(_read_file_info, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+        rows = []
+        for path, ((file_type, version, marker, start, end), error) in zip(paths, infos):
+            if error is not None:
+                self.logger.warning("Can't read file %s. %s", path, error)
+            rows.append((path, os.path.dirname(path), *files[path], file_type, version, marker,
+                         None if start is None else start.isoformat(), None if end is None else end.isoformat()))
+        with self.__db:
+            self.__db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.__db.executemany("DELETE FROM files WHERE path = ?", removed)
+
+        changed = sum(path in indexed for path in paths)
+        return {"added": len(paths) - changed, "changed": changed, "removed": len(removed),
+                "unchanged": len(files) - len(paths)}
+
+    @typechecked
+    def files(self,
+              path_dir: str | None = None,
+              file_type: str | None = None,
+              recursion: bool = True,
+              marker: str | None = None,
+              start: datetime | None = None,
+              end: datetime | None = None) -> list[dict[str, str | int | datetime | None]]:
+        """This method returns files of the index. The filesystem isn't touched, call refresh before.
+
+        Args:
+            path_dir (str | None, optional): Only files of the directory. Defaults to None (all files).
+            file_type (str | None, optional): Only files of the type: obs, nav, clk, sp3, ionex, erp or dcb.
+                Defaults to None (all files, also files of unknown type).
+            recursion (bool, optional): Also files of subdirectories of path_dir. Defaults to True.
+            marker (str | None, optional): Only files of the marker. Defaults to None.
+            start (datetime | None, optional): Only files which end (or start if end is unknown) at or after start.
+                Defaults to None.
+            end (datetime | None, optional): Only files which start before end. Defaults to None.
+
+        Raises:
+            ValueError: Unknown type of file {file_type}.
+
+        Returns:
+            list[dict[str, str | int | datetime | None]]: Files sorted by path. Keys are path, size, mtime_ns,
+                type, version, marker, start and end. Unknown values are None.
+
+        Examples:
+            >>> index.files("/path/to/archive/obs", "obs", marker="NSK1", start=datetime(2022, 1, 1))
+            [{'path': '/path/to/archive/obs/NSK10010.22o', 'size': 10485760, 'mtime_ns': 1641081600000000000,
+            'type': 'obs', 'version': '3.04', 'marker': 'NSK1', 'start': datetime.datetime(2022, 1, 1, 0, 0),
+            'end': datetime.datetime(2022, 1, 1, 23, 59, 30)}]
+        """
+        if file_type is not None and file_type not in _FILE_TYPES:
+            raise ValueError(f"Unknown type of file {file_type}.")
+
+        conditions, params = [], []
+        if path_dir is not None:
+            where, dir_params = self.__dir_filter(path_dir, recursion)
+            conditions.append(where)
+            params += dir_params
+        if file_type is not None:
+            conditions.append("type = ?")
+            params.append(file_type)
+        if marker is not None:
+            conditions.append("marker = ?")
+            params.append(marker)
+        if start is not None:
+            conditions.append("COALESCE(end_time, start_time) >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append("start_time < ?")
+            params.append(end.isoformat())
+
+        query = f"SELECT {', '.join(_COLUMNS)} FROM files"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        rows = []
+        for row in self.__db.execute(query + " ORDER BY path", params):
+            info = dict(zip(_KEYS, row))
+            for key in ("start", "end"):
+                if info[key] is not None:
+                    info[key] = datetime.fromisoformat(info[key])
+            rows.append(info)
+        return rows
@@ -0,0 +1,351 @@
+"""
+This module is designed for downsampling of long GNSS time series before plotting.
+- Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape of the serie;
+- min/max envelope, which keeps every spike of the serie;
+- multi-resolution pyramids of downsampled levels, cached next to .pos file;
+- selection of the level of the pyramid for the time window and the pixel budget.
+
+Millions of 1 Hz epochs from parse_pos_file are reduced to a few thousand points in O(n) vectorized time,
+so they can be plotted by matplotlib, plotly etc. Epochs are selected from the serie, values aren't averaged.
+"""
+
+
+from datetime import datetime
+import os
+import numpy as np
+from typeguard import typechecked
+from moncenterlib.gnss.gnss_time_series import parse_pos_file
+from moncenterlib.gnss.sidecar import load_sidecar_arrays, make_stamp, read_sidecar_meta, write_sidecar
+
+
+# Version of the sidecar pyramid format. Pyramids of other versions are rebuilt.
+_PYRAMID_VERSION = 1
+
+
+def _time2float(time: np.ndarray) -> np.ndarray:
+    """Time as float64 seconds from the first epoch (datetime64) or as float64 as is (e.g. MJD)."""
+    if np.issubdtype(time.dtype, np.datetime64):
+        return (time - time[0]) / np.timedelta64(1, "s") if len(time) else np.zeros(0)
+    return time.astype(np.float64)
+
+
+def _valid_points(data: dict[str, np.ndarray], column: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Indices of epochs with finite values of the column, their time as float and values."""
+    for key in ("time", column):
+        if key not in data:
+            raise ValueError(f"Column {key} is not found in time serie.")
+
+    x = _time2float(np.asarray(data["time"]))
+    if np.any(np.diff(x) < 0):
+        raise ValueError("Time serie must be sorted by time.")
+    y = np.asarray(data[column], dtype=np.float64)
+    index = np.flatnonzero(np.isfinite(y))
+    return index, x[index], y[index]
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, n_points: int) -> np.ndarray:
+    """Indices of points selected by LTTB (Steinarsson 2013)."""
+    n = len(x)
+    if n <= n_points:
+        return np.arange(n)
+
+    # the first and the last points are kept, others are split into n_points - 2 buckets of equal size
+    n_buckets = n_points - 2
+    edges = (np.arange(n_buckets + 1) * (n - 2)) // n_buckets + 1
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / counts
+    # the third vertex of the triangle is the mean of the next bucket, for the last bucket it's the last point
+    next_x = np.append(mean_x[1:], x[-1])[:, None]
+    next_y = np.append(mean_y[1:], y[-1])[:, None]
+
+    # candidates of buckets in the padded table, short buckets are padded by their last point
+    candidates = np.minimum(edges[:-1, None] + np.arange(counts.max()), edges[1:, None] - 1)
+    bx, by = x[candidates], y[candidates]
+    # doubled area of triangle (a, b, next) is |ax * p + ay * q + r|, only a depends on the previous bucket
+    p = by - next_y
+    q = next_x - bx
+    r = bx * next_y - next_x * by
+
+    def choose(rows: np.ndarray, ax: np.ndarray, ay: np.ndarray) -> np.ndarray:
+        area = np.abs(ax[:, None] * p[rows] + ay[:, None] * q[rows] + r[rows])
+        return candidates[rows, np.argmax(area, axis=1)]
+
+    # the vertex a of the bucket is the point selected in the previous bucket, the first guess is the mean of that bucket,
+    # then buckets whose previous point has changed are chosen again until nothing changes. The fixed point
+    # is exactly LTTB, usually after a few passes, because a rarely changes the choice of the bucket
+    rows = np.arange(n_buckets)
+    choice = choose(rows, np.r_[x[0], mean_x[:-1]], np.r_[y[0], mean_y[:-1]])
+    used = np.full(n_buckets, -1)
+    while True:
+        a = np.r_[0, choice[:-1]]
+        rows = np.flatnonzero(a != used)
+        if len(rows) == 0:
+            break
+        used[rows] = a[rows]
+        choice[rows] = choose(rows, x[a[rows]], y[a[rows]])
+    return np.r_[0, choice, n - 1]
+
+
+def _minmax_indices(x: np.ndarray, y: np.ndarray, n_points: int) -> np.ndarray:
+    """Indices of the minimum and the maximum in n_points // 2 bins of equal time width."""
+    n = len(x)
+    if n <= n_points:
+        return np.arange(n)
+
+    n_bins = n_points // 2
+    span = x[-1] - x[0]
+    bins = np.minimum(((x - x[0]) * (n_bins / span)).astype(np.int64), n_bins - 1) if span > 0 else np.zeros(n, np.int64)
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    number = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+
+    selected = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = np.flatnonzero(y == reduce.reduceat(y, starts)[number])
+        # the first extreme in every bin, time is sorted so bins of extremes are sorted too
+        first = np.r_[True, number[extreme[1:]] != number[extreme[:-1]]]
+        selected.append(extreme[first])
+    return np.unique(np.concatenate(selected))
+
+
+def _downsample(data: dict[str, np.ndarray], n_points: int, column: str, method: str) -> dict[str, np.ndarray]:
+    if n_points < 3:
+        raise ValueError("Number of points must be at least 3.")
+    if method not in ("lttb", "minmax"):
+        raise ValueError("Method must be lttb or minmax.")
+
+    index, x, y = _valid_points(data, column)
+    select = _lttb_indices if method == "lttb" else _minmax_indices
+    index = index[select(x, y, n_points)]
+    return {key: np.asarray(value)[index] for key, value in data.items()}
+
+
+@typechecked
+def downsample_lttb(data: dict[str, np.ndarray], n_points: int, column: str = "height") -> dict[str, np.ndarray]:
+    """This function reduces the time serie to n_points epochs by Largest-Triangle-Three-Buckets.
+    Epochs are split into buckets of equal size, from every bucket the epoch which makes the largest
+    triangle with the previous selected epoch and the mean of the next bucket is kept.
+    The shape of the curve is preserved much better than by decimation. Buckets are chosen by NumPy
+    all at once and chosen again only where the previous choice has changed, so there is no Python loop over buckets.
+
+    Args:
+        data (dict[str, np.ndarray]): Time serie in columnar mode (see parse_pos_file) sorted by time.
+            "time" can be datetime64 or numbers (e.g. MJD).
+        n_points (int): Number of epochs to keep, e.g. width of the plot in pixels.
+        column (str, optional): Column which is plotted, epochs are selected by its values.
+            Epochs where it's NaN are dropped. Defaults to "height".
+
+    Raises:
+        ValueError: Number of points must be at least 3.
+        ValueError: Column {column} is not found in time serie.
+        ValueError: Time serie must be sorted by time.
+
+    Returns:
+        dict[str, np.ndarray]: Time serie with the same keys, but only selected epochs. If the serie has
+            no more than n_points epochs, all of them are returned.
+
+    Examples:
+        >>> header, data = parse_pos_file("/path/to/file.pos", columnar=True)
+        >>> small = downsample_lttb(data, 2000, "height")
+        >>> plt.plot(small["time"], small["height"])
+    """
+    return _downsample(data, n_points, column, "lttb")
+
+
+@typechecked
+def downsample_minmax(data: dict[str, np.ndarray], n_points: int, column: str = "height") -> dict[str, np.ndarray]:
+    """This function reduces the time serie to the min/max envelope. The time span is split into n_points // 2
+    bins of equal width (pixels of the plot), from every bin the epochs with the minimum and the maximum
+    of the column are kept. Unlike LTTB every outlier stays in the plot. Fully vectorized.
+
+    Args:
+        data (dict[str, np.ndarray]): Time serie in columnar mode (see parse_pos_file) sorted by time.
+            "time" can be datetime64 or numbers (e.g. MJD).
+        n_points (int): Maximum number of epochs to keep, e.g. twice the width of the plot in pixels.
+        column (str, optional): Column which is plotted, epochs are selected by its values.
+            Epochs where it's NaN are dropped. Defaults to "height".
+
+    Raises:
+        ValueError: Number of points must be at least 3.
+        ValueError: Column {column} is not found in time serie.
+        ValueError: Time serie must be sorted by time.
+
+    Returns:
+        dict[str, np.ndarray]: Time serie with the same keys, but only selected epochs in time order.
+            Bins without epochs (gaps) give no points, bins with one epoch give one point.
+
+    Examples:
+        >>> small = downsample_minmax(data, 4000, "height")
+        >>> plt.plot(small["time"], small["height"])
+    """
+    return _downsample(data, n_points, column, "minmax")
+
+
+@typechecked
+def build_pyramid(data: dict[str, np.ndarray],
+                  column: str = "height",
+                  method: str = "minmax",
+                  factor: int = 4,
+                  min_points: int = 1000) -> list[dict[str, np.ndarray]]:
+    """This function builds the multi-resolution pyramid of the time serie. Every level is downsampled
+    from the previous one by the factor, so the whole pyramid is built in O(n) and takes less memory than
+    the serie itself. Levels have keys "time", the column and "index" (the index of the epoch in data),
+    so other columns can be taken for the selected epochs.
+
+    Args:
+        data (dict[str, np.ndarray]): Time serie in columnar mode (see parse_pos_file) sorted by time.
+        column (str, optional): Column which is plotted. Defaults to "height".
+        method (str, optional): "minmax" or "lttb". Defaults to "minmax".
+        factor (int, optional): Reduction of the number of epochs between levels. Defaults to 4.
+        min_points (int, optional): Levels with fewer epochs aren't built. Defaults to 1000.
+
+    Raises:
+        ValueError: Method must be lttb or minmax.
+        ValueError: Factor must be at least 2.
+        ValueError: Number of points must be at least 3.
+        ValueError: Column {column} is not found in time serie.
+        ValueError: Time serie must be sorted by time.
+
+    Returns:
+        list[dict[str, np.ndarray]]: Levels from the finest (len(data) / factor epochs) to the coarsest.
+            Empty if the serie is shorter than factor * min_points.
+
+    Examples:
+        >>> pyramid = build_pyramid(data, "height", factor=4, min_points=1000)
+        >>> [len(level["time"]) for level in pyramid]
+        [900000, 225000, 56250, 14062, 3515]
+    """
+    if method not in ("lttb", "minmax"):
+        raise ValueError("Method must be lttb or minmax.")
+    if factor < 2:
+        raise ValueError("Factor must be at least 2.")
+    if min_points < 3:
+        raise ValueError("Number of points must be at least 3.")
+
+    index, _, _ = _valid_points(data, column)
+    level = {"time": np.asarray(data["time"])[index], column: np.asarray(data[column])[index], "index": index}
+    pyramid = []
+    while len(level["time"]) // factor >= min_points:
+        level = _downsample(level, len(level["time"]) // factor, column, method)
+        pyramid.append(level)
+    return pyramid
+
+
+def _load_pyramid(path_pyramid: str, name: str, stat: os.stat_result, sep: str | None) -> list | None:
+    """Load the pyramid from the sidecar directory. Return None if it doesn't exist or is out of date."""
+    meta = read_sidecar_meta(path_pyramid, make_stamp(stat, _PYRAMID_VERSION, sep=sep))
+    if meta is None or name not in meta.get("pyramids", {}):
+        return None
+
+    pyramid = []
+    columns = meta["pyramids"][name]["columns"]
+    for i in range(meta["pyramids"][name]["levels"]):
+        arrays = load_sidecar_arrays(path_pyramid, [f"{name}.{i}.{j}" for j in range(len(columns))])
+        if arrays is None:
+            return None
+        pyramid.append(dict(zip(columns, arrays.values())))
+    return pyramid
+
+
+def _save_pyramid(path_pyramid: str, name: str, stat: os.stat_result, sep: str | None, pyramid: list) -> None:
+    """Save levels as .npy files, see sidecar. Pyramids of other columns are kept while the file is the same."""
+    stamp = make_stamp(stat, _PYRAMID_VERSION, sep=sep)
+    meta = read_sidecar_meta(path_pyramid, stamp)
+    if meta is None or not isinstance(meta.get("pyramids"), dict):
+        meta = {**stamp, "pyramids": {}}
+    meta["pyramids"][name] = {"levels": len(pyramid), "columns": list(pyramid[0]) if pyramid else []}
+    write_sidecar(path_pyramid, meta, {f"{name}.{i}.{j}": value for i, level in enumerate(pyramid)
+                                       for j, value in enumerate(level.values())})
+
+
+@typechecked
+def get_pos_pyramid(path2file: str,
+                    column: str = "height",
+                    method: str = "minmax",
+                    factor: int = 4,
+                    min_points: int = 1000,
+                    sep: str | None = None) -> list[dict[str, np.ndarray]]:
+    """This function returns the pyramid (see build_pyramid) of .pos file. The pyramid is cached
+    in the sidecar directory "path2file.pyramid" and the next calls load levels as read-only memory maps
+    without parsing the file. The cache is rebuilt when the size or the modification time of .pos file changes.
+    Pyramids of several columns and methods are kept in the same directory.
+
+    Args:
+        path2file (str): Path to the file .pos
+        column (str, optional): Column which is plotted. Defaults to "height".
+        method (str, optional): "minmax" or "lttb". Defaults to "minmax".
+        factor (int, optional): Reduction of the number of epochs between levels. Defaults to 4.
+        min_points (int, optional): Levels with fewer epochs aren't built. Defaults to 1000.
+        sep (str | None, optional): If .pos file has separation (e.g. ;) use sep=";". Defaults to None.
+
+    Raises:
+        ValueError: Method must be lttb or minmax.
+        ValueError: Factor must be at least 2.
+        ValueError: Number of points must be at least 3.
+        ValueError: Column {column} is not found in time serie.
+
+    Returns:
+        list[dict[str, np.ndarray]]: Levels from the finest to the coarsest.
+
+    Examples:
+        >>> pyramid = get_pos_pyramid("/path/to/file.pos", "height")
+        >>> level = select_pyramid_level(pyramid, 2000, start=datetime(2022, 1, 1), end=datetime(2022, 1, 8))
+    """
+    path_pyramid = path2file + ".pyramid"
+    name = f"{column}-{method}-{factor}-{min_points}"
+    stat = os.stat(path2file)
+    pyramid = _load_pyramid(path_pyramid, name, stat, sep)
+    if pyramid is not None:
+        return pyramid
+
+    _, data = parse_pos_file(path2file, sep=sep, columnar=True)
+    pyramid = build_pyramid(data, column, method, factor, min_points)
+    _save_pyramid(path_pyramid, name, stat, sep, pyramid)
+    return pyramid
+
+
+@typechecked
+def select_pyramid_level(pyramid: list[dict[str, np.ndarray]],
+                         n_points: int,
+                         start: datetime | np.datetime64 | float | None = None,
+                         end: datetime | np.datetime64 | float | None = None) -> dict[str, np.ndarray]:
+    """This function selects epochs of the pyramid for the plot of the time window start <= time < end.
+    The finest level which has no more than n_points epochs in the window is used. If even the coarsest
+    level has more, its window is reduced to n_points by the method of min/max envelope.
+
+    Args:
+        pyramid (list[dict[str, np.ndarray]]): Pyramid from build_pyramid or get_pos_pyramid.
+        n_points (int): Maximum number of epochs, e.g. width of the plot in pixels.
+        start (datetime | np.datetime64 | float | None, optional): Start of the window. Defaults to None.
+        end (datetime | np.datetime64 | float | None, optional): End of the window. Defaults to None.
+
+    Raises:
+        ValueError: Pyramid is empty.
+        ValueError: Number of points must be at least 3.
+
+    Returns:
+        dict[str, np.ndarray]: Epochs of the level in the window with the same keys as levels.
+
+    Examples:
+        >>> level = select_pyramid_level(pyramid, 2000)
+        >>> plt.plot(level["time"], level["height"])
+    """
+    if not pyramid:
+        raise ValueError("Pyramid is empty.")
+    if n_points < 3:
+        raise ValueError("Number of points must be at least 3.")
+
+    for level in pyramid:
+        time = level["time"]
+        if np.issubdtype(time.dtype, np.datetime64):
+            lo = 0 if start is None else np.searchsorted(time, np.datetime64(start, "ns"), side="left")
+            hi = len(time) if end is None else np.searchsorted(time, np.datetime64(end, "ns"), side="left")
+        else:
+            lo = 0 if start is None else np.searchsorted(time, start, side="left")
+            hi = len(time) if end is None else np.searchsorted(time, end, side="left")
+        window = {key: np.asarray(value[lo:hi]) for key, value in level.items()}
+        if hi - lo <= n_points:
+            return window
+
+    column = next(key for key in window if key not in ("time", "index"))
+    return _downsample(window, n_points, column, "minmax")
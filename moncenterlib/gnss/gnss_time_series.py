@@ -1,39 +1,554 @@
 from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import chain
+import os
+from typing import BinaryIO
+import warnings
+import numpy as np
 from typeguard import typechecked
+import moncenterlib.tools as mcl_tools
+from moncenterlib.gnss.sidecar import load_sidecar_arrays, make_stamp, read_sidecar_meta, write_sidecar
+
+
+# Keys of the coordinate columns in columnar mode. Other columns are named by their
+# header label without the unit, e.g. "sdn(m)" -> "sdn".
+_COORD_KEYS = {
+    "latitude(deg)": "lat",
+    "longitude(deg)": "lon",
+    "latitude(d'\")": "lat",
+    "longitude(d'\")": "lon",
+    "height(m)": "height",
+    "x-ecef(m)": "x",
+    "y-ecef(m)": "y",
+    "z-ecef(m)": "z",
+    "e-baseline(m)": "e",
+    "n-baseline(m)": "n",
+    "u-baseline(m)": "u"
+}
+_INT_COLUMNS = ("Q", "ns")
+# Q of RTKLib by the fix quality of NMEA GGA sentence (solq_nmea of RTKLib: PPP is 6, dead reckoning is 7)
+_NMEA_Q = np.array([0, 5, 4, 6, 1, 2, 7, 0, 0], dtype=np.int32)
+# Version of the sidecar cache format. Caches of other versions are rebuilt.
+_CACHE_VERSION = 2
+# Size of the block in bytes which is read after the binary search in .pos file
+_BISECT_BLOCK = 1 << 16
+
+# Coordinates which are aggregated by aggregate_pos_series and their sd columns for weights
+_AGGREGATE_COLUMNS = {
+    "lat": "sdn", "lon": "sde", "height": "sdu",
+    "x": "sdx", "y": "sdy", "z": "sdz",
+    "e": "sde", "n": "sdn", "u": "sdu"
+}
+_MIN_SD = 1e-4
+
+_GPS_EPOCH = np.datetime64("1980-01-06T00:00:00", "ns")
+# UTC dates of leap seconds since GPS epoch. GPST - UTC is the number of passed dates.
+_LEAP_SECONDS = np.array(["1981-07-01", "1982-07-01", "1983-07-01", "1985-07-01", "1988-01-01",
+                          "1990-01-01", "1991-01-01", "1992-07-01", "1993-07-01", "1994-07-01",
+                          "1996-01-01", "1997-07-01", "1999-01-01", "2006-01-01", "2009-01-01",
+                          "2012-07-01", "2015-07-01", "2017-01-01"], dtype="datetime64[ns]")
+
+
+def _parse_header_line(line: str, header: defaultdict) -> bool:
+    """Parse the header line of .pos file into header. Return False if the line isn't a header line."""
+    if not line.startswith("%"):
+        return False
+
+    # parse header
+    if ": " in line:
+        info = line.split(": ")
+        key = info[0].replace("% ", "").strip()
+        value = info[1].replace("\n", "").strip()
+        header[key] += [value]
+
+    # parse name columns
+    elif "ratio" in line:
+        header["name_columns"] = line.split()[1:]
+
+    return True
+
+
+def _time2gpst(table: np.ndarray, calendar: bool, timesys: str) -> np.ndarray:
+    """Convert time fields of .pos file into datetime64[ns] of GPST.
+
+    Args:
+        table (np.ndarray): Time fields. Year, month, day, hour, minute, second if calendar is True.
+            Otherwise GPS week and time of week.
+        calendar (bool): The form of time (out-timeform=hms).
+        timesys (str): The time system of .pos file. GPST, UTC or JST.
+    """
+    if calendar:
+        ymd = table[:, :5].astype(np.int64)
+        time = ((ymd[:, 0] - 1970).astype("datetime64[Y]") + (ymd[:, 1] - 1).astype("timedelta64[M]")).astype("datetime64[D]")
+        time = time + (ymd[:, 2] - 1).astype("timedelta64[D]")
+        sec = ymd[:, 3] * 3600 + ymd[:, 4] * 60
+        time = time.astype("datetime64[ns]") + (sec * 10**9).astype("timedelta64[ns]")
+        time = time + np.round(table[:, 5] * 1e9).astype(np.int64).astype("timedelta64[ns]")
+    else:
+        time = gps_week2gpst(table[:, 0], table[:, 1])
+
+    if timesys == "JST":
+        time = time - np.timedelta64(9, "h")
+    if timesys in ("UTC", "JST"):
+        time = time + np.searchsorted(_LEAP_SECONDS, time, side="right").astype("timedelta64[s]")
+
+    return time
+
+
+class _PosSchema:
+    """Layout of rows of .pos file. The layout is inferred once from the name of columns and the first row,
+    then blocks of rows are converted into columns without inspecting every row.
+    Supported are all out-solformat (llh, xyz, enu, nmea), out-outvel, out-degform, out-timeform and out-timesys.
+    """
+
+    def __init__(self, name_columns: list[str], first_line: str, sep: str | None) -> None:
+        self.sep = sep
+        self.nmea = first_line.startswith("$")
+        # date of the last RMC sentence, it's kept between blocks of NMEA rows
+        self.nmea_date = None
+        if self.nmea:
+            return
+
+        if not name_columns:
+            raise ValueError("Name of columns is not found in header of .pos file.")
+        # separator between date and time as it's written in rows, None if rows don't start
+        # with the fixed width text "yyyy/mm/dd hh:mm:ss"
+        self.time_sep = None
+        if len(first_line) >= 19 and first_line[4] + first_line[7] + first_line[13] + first_line[16] == "//::":
+            self.time_sep = first_line[10]
+        if sep:
+            name_columns = " ".join(name_columns).replace(sep, " ").split()
+            first_line = first_line.replace(sep, " ")
+
+        self.timesys = name_columns[0]
+        # time is "yyyy/mm/dd hh:mm:ss.sss" or "week tow"
+        self.calendar = "/" in "".join(first_line.split(maxsplit=1)[:1])
+
+        # (key, number of fields, type)
+        self.columns = [("time", 6 if self.calendar else 2, "time")]
+        for name in name_columns[1:]:
+            key = _COORD_KEYS.get(name, name.split("(")[0])
+            if name.endswith("(d'\")"):
+                self.columns.append((key, 3, "dms"))
+            elif key in _INT_COLUMNS:
+                self.columns.append((key, 1, "int"))
+            else:
+                self.columns.append((key, 1, "float"))
+        self.width = sum(column[1] for column in self.columns)
+        # position of the first field of every column in a row
+        self.positions = dict(zip([column[0] for column in self.columns],
+                                  np.cumsum([0] + [column[1] for column in self.columns[:-1]])))
+
+    def convert(self, lines: list[str], filters: "_PosFilter | None" = None) -> dict[str, np.ndarray]:
+        """Convert data lines of .pos file into columns. All lines are converted to one float table
+        by one NumPy call, then the table is sliced into columns. Rows rejected by filters are dropped
+        from the table before the columns are made."""
+        if self.nmea:
+            columns = self._convert_nmea(lines)
+            if filters is not None:
+                mask = filters.mask_quality(columns["Q"], columns["ns"], None)
+                mask &= filters.mask_time(columns["time"])
+                columns = {key: value[mask] for key, value in columns.items()}
+            return columns
+
+        text = "".join(lines)
+        if self.sep:
+            text = text.replace(self.sep, " ")
+        if self.calendar:
+            text = text.replace("/", " ").replace(":", " ")
+
+        with warnings.catch_warnings():
+            # numpy warns if the text has a non-numeric field, the size check below raises then
+            warnings.simplefilter("ignore", DeprecationWarning)
+            table = np.fromstring(text, dtype=np.float64, sep=" ")
+        if table.size != len(lines) * self.width:
+            raise ValueError("Number of fields in rows of .pos file doesn't match the name of columns.")
+        table = table.reshape(len(lines), self.width)
+
+        if filters is not None:
+            table = table[filters.mask_quality(self._field(table, "Q"), self._field(table, "ns"),
+                                               self._field(table, "ratio"))]
+        time = _time2gpst(table[:, :self.columns[0][1]], self.calendar, self.timesys)
+        if filters is not None:
+            mask = filters.mask_time(time)
+            table = table[mask]
+            time = time[mask]
+
+        columns = {}
+        pos = 0
+        for key, width, kind in self.columns:
+            if kind == "time":
+                columns[key] = time
+            elif kind == "dms":
+                columns[key] = _dms2deg(table[:, pos], table[:, pos + 1], table[:, pos + 2])
+            elif kind == "int":
+                columns[key] = table[:, pos].astype(np.int32)
+            else:
+                columns[key] = np.ascontiguousarray(table[:, pos])
+            pos += width
+
+        return columns
+
+    def _field(self, table: np.ndarray, key: str) -> np.ndarray | None:
+        if key not in self.positions:
+            return None
+        return table[:, self.positions[key]]
+
+    def _convert_nmea(self, lines: list[str]) -> dict[str, np.ndarray]:
+        """Convert GGA sentences into columns. The date is taken from the previous RMC sentence.
+        Time of NMEA is UTC."""
+        lines = [line.strip() for line in lines if line[3:6] in ("GGA", "RMC")]
+        is_rmc = np.array([line[3:6] == "RMC" for line in lines], dtype=bool)
+        gga = _split_nmea([line for line, rmc in zip(lines, is_rmc) if not rmc])
+        rmc = _split_nmea([line for line, rmc in zip(lines, is_rmc) if rmc])
+
+        # date of every GGA is taken from the last RMC before it, 0 is the last RMC of the previous block
+        dates = np.concatenate([[self.nmea_date or ""], rmc[:, 9]])
+        gga_dates = dates[np.cumsum(is_rmc)[~is_rmc]]
+        if len(rmc):
+            self.nmea_date = rmc[-1, 9]
+
+        # empty GGA sentences are epochs without solution
+        valid = gga[:, 1] != ""
+        gga = gga[valid]
+        gga_dates = gga_dates[valid]
+        if np.any(gga_dates == ""):
+            raise ValueError("Date of NMEA sentence is not found.")
+
+        # ddmmyy hhmmss.ss -> table of year, month, day, hour, minute, second
+        gga_dates = gga_dates.astype(np.int64)
+        tod = _nmea2float(gga[:, 1])
+        table = np.column_stack([2000 + gga_dates % 100, gga_dates // 100 % 100, gga_dates // 10000,
+                                 tod // 10000, tod // 100 % 100, tod % 100])
+
+        q = np.nan_to_num(_nmea2float(gga[:, 6])).astype(np.int64)
+        columns = {
+            "time": _time2gpst(table, True, "UTC"),
+            "lat": _nmea2deg(_nmea2float(gga[:, 2]), gga[:, 3] == "S"),
+            "lon": _nmea2deg(_nmea2float(gga[:, 4]), gga[:, 5] == "W"),
+            # altitude above geoid plus geoid separation
+            "height": _nmea2float(gga[:, 9]) + _nmea2float(gga[:, 11]),
+            "Q": _NMEA_Q[np.clip(q, 0, len(_NMEA_Q) - 1)],
+            "ns": np.nan_to_num(_nmea2float(gga[:, 7])).astype(np.int32),
+            "hdop": _nmea2float(gga[:, 8]),
+            "age": _nmea2float(gga[:, 13])
+        }
+        return columns
+
+
+class _PosFilter:
+    """Filter of epochs of .pos file. Rows out of the time window are skipped by comparing the text
+    of the calendar time, so they aren't converted at all. Rows of .pos file are sorted by time,
+    so reading stops after the end of the window. Q, ns and ratio are checked on the raw table."""
+
+    def __init__(self,
+                 q: int | list[int] | None,
+                 min_ns: int | None,
+                 min_ratio: float | None,
+                 start: datetime | np.datetime64 | None,
+                 end: datetime | np.datetime64 | None) -> None:
+        self.q = None if q is None else np.array(q, dtype=np.int32).reshape(-1)
+        self.min_ns = min_ns
+        self.min_ratio = min_ratio
+        self.start = None if start is None else np.datetime64(start, "ns")
+        self.end = None if end is None else np.datetime64(end, "ns")
+        self.start_text = None
+        self.end_text = None
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in (self.q, self.min_ns, self.min_ratio, self.start, self.end))
+
+    def bind(self, schema: _PosSchema) -> None:
+        """Make time bounds in the text form of rows. The bounds are widened by 1 s,
+        rows at the edges are filtered exactly after conversion. If rows don't start with the fixed width
+        calendar time, rows aren't skipped by text and all of them are filtered after conversion."""
+        if schema.nmea or not schema.calendar or schema.time_sep is None:
+            return
+        if self.start is not None:
+            self.start_text = _gpst2text(self.start - np.timedelta64(1, "s"), schema.timesys, schema.time_sep)
+        if self.end is not None:
+            self.end_text = _gpst2text(self.end + np.timedelta64(1, "s"), schema.timesys, schema.time_sep)
+
+    def skip(self, line: str) -> bool:
+        """Return True if the row is before the time window."""
+        return self.start_text is not None and line[:19] < self.start_text
+
+    def stop(self, line: str) -> bool:
+        """Return True if the row and all next rows are after the time window."""
+        return self.end_text is not None and line[:19] > self.end_text
+
+    def mask_quality(self, q: np.ndarray | None, ns: np.ndarray | None, ratio: np.ndarray | None) -> np.ndarray:
+        """Mask of epochs by Q, ns and ratio. The filter of the column which isn't in the file
+        (e.g. ratio of NMEA file) raises ValueError instead of keeping all epochs."""
+        for name, value, column in (("q", self.q, q), ("min_ns", self.min_ns, ns), ("min_ratio", self.min_ratio, ratio)):
+            if value is not None and column is None:
+                raise ValueError(f"Column of the filter {name} is not found in .pos file.")
+        mask = np.ones(len(q) if q is not None else len(ns), dtype=bool)
+        if self.q is not None:
+            mask &= np.isin(q, self.q)
+        if self.min_ns is not None:
+            mask &= ns >= self.min_ns
+        if self.min_ratio is not None:
+            mask &= ratio >= self.min_ratio
+        return mask
+
+    def mask_time(self, time: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(time), dtype=bool)
+        if self.start is not None:
+            mask &= time >= self.start
+        if self.end is not None:
+            mask &= time < self.end
+        return mask
+
+
+def _gpst2text(time: np.datetime64, timesys: str, time_sep: str = " ") -> str:
+    """Convert GPST to the text "yyyy/mm/dd hh:mm:ss" in the time system of .pos file.
+    Date and time are separated by time_sep."""
+    if timesys in ("UTC", "JST"):
+        time = time - np.timedelta64(int(np.searchsorted(_LEAP_SECONDS, time, side="right")), "s")
+    if timesys == "JST":
+        time = time + np.timedelta64(9, "h")
+    return np.datetime_as_string(time, unit="s").replace("-", "/").replace("T", time_sep)
+
+
+def _dms2deg(deg: np.ndarray, minute: np.ndarray, sec: np.ndarray) -> np.ndarray:
+    """Convert degrees, minutes, seconds to decimal degrees. The sign of "-0" degrees is kept by signbit."""
+    value = np.abs(deg) + minute / 60 + sec / 3600
+    return np.where(np.signbit(deg), -value, value)
+
+
+def _split_nmea(lines: list[str]) -> np.ndarray:
+    """Split NMEA sentences of one type into 2D array of fields. The checksum is the last field."""
+    if not lines:
+        return np.empty((0, 16), dtype=str)
+    fields = ",".join(lines).replace("*", ",").split(",")
+    if len(fields) % len(lines) != 0:
+        raise ValueError("Number of fields in NMEA sentences is different.")
+    return np.array(fields, dtype=str).reshape(len(lines), -1)
+
+
+def _nmea2float(fields: np.ndarray) -> np.ndarray:
+    """Convert NMEA fields to float. Empty fields are NaN."""
+    return np.where(fields == "", "nan", fields).astype(np.float64)
+
+
+def _nmea2deg(value: np.ndarray, negative: np.ndarray) -> np.ndarray:
+    """Convert NMEA angle (d)ddmm.mmmm to decimal degrees."""
+    deg = np.floor(value / 100)
+    deg = deg + (value - deg * 100) / 60
+    return np.where(negative, -deg, deg)
+
+
+def _path2cache(path2file: str) -> str:
+    return path2file + ".cache"
+
+
+def _load_cache(path2file: str, sep: str | None, stat: os.stat_result) -> tuple[dict, dict] | None:
+    """Load the sidecar cache of .pos file. Return None if the cache doesn't exist or is out of date."""
+    path_cache = _path2cache(path2file)
+    meta = read_sidecar_meta(path_cache, make_stamp(stat, _CACHE_VERSION, sep=sep))
+    if meta is None or "columns" not in meta or "header" not in meta:
+        return None
+    arrays = load_sidecar_arrays(path_cache, [str(i) for i in range(len(meta["columns"]))])
+    if arrays is None:
+        return None
+    return meta["header"], dict(zip(meta["columns"], arrays.values()))
+
+
+def _save_cache(path2file: str, sep: str | None, stat: os.stat_result, header: dict, data: dict) -> None:
+    """Save columns of .pos file as .npy files next to it, see sidecar."""
+    meta = {**make_stamp(stat, _CACHE_VERSION, sep=sep), "columns": list(data.keys()), "header": header}
+    write_sidecar(_path2cache(path2file), meta, {str(i): value for i, value in enumerate(data.values())})
+
+
+def _read_header(f: BinaryIO) -> tuple[dict[str, list], str, int]:
+    """Read the header of .pos file opened in binary mode.
+    Return the header, the first data row and the offset of the first data row."""
+    header = defaultdict(list)
+    offset = 0
+    for raw_line in iter(f.readline, b""):
+        line = raw_line.decode("utf-8")
+        if not _parse_header_line(line, header) and line.strip():
+            return dict(header), line, offset
+        offset += len(raw_line)
+    return dict(header), "", offset
+
+
+def _iter_chunks(lines: Iterable[str], schema: _PosSchema, filters: _PosFilter | None,
+                 chunk_size: int) -> Iterator[dict[str, np.ndarray]]:
+    """Convert data rows into chunks of columns. Rows out of the time window are skipped as text."""
+    chunk = []
+    for line in lines:
+        if not line.strip() or line.startswith("%"):
+            continue
+
+        if filters is not None:
+            if filters.stop(line):
+                break
+            if filters.skip(line):
+                continue
+        chunk.append(line)
+
+        if len(chunk) == chunk_size:
+            yield schema.convert(chunk, filters)
+            chunk = []
+
+    if chunk:
+        yield schema.convert(chunk, filters)
+
+
+def _concat_chunks(chunks: list[dict[str, np.ndarray]], header: dict[str, list], sep: str | None) -> dict[str, np.ndarray]:
+    if not chunks:
+        return _PosSchema(header.get("name_columns", []), "", sep).convert([])
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+
+def _bisect_pos_file(f: BinaryIO, schema: _PosSchema, lo: int, hi: int, target: np.datetime64) -> tuple[int, int]:
+    """Binary search of the time in .pos file opened in binary mode. Rows of the file must be sorted by time.
+
+    Args:
+        f (BinaryIO): .pos file.
+        schema (_PosSchema): Schema of rows.
+        lo (int): Offset of the first row for search.
+        hi (int): Size of the file.
+        target (np.datetime64): Time to find.
+
+    Returns:
+        tuple[int, int]: lo is the offset of a row with time < target (or the first row).
+            All rows starting after hi have time >= target. hi - lo is less than _BISECT_BLOCK.
+    """
+    while hi - lo > _BISECT_BLOCK:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()  # the rest of the row
+
+        pos = f.tell()
+        line = f.readline()
+        while line and (line.startswith(b"%") or not line.strip()):
+            pos = f.tell()
+            line = f.readline()
+
+        if line and schema.convert([line.decode("utf-8")])["time"][0] < target:
+            lo = pos
+        else:
+            hi = mid
+    return lo, hi
+
+
+def _read_lines(f: BinaryIO, offset: int, hi: int) -> Iterator[str]:
+    """Read rows of the file from offset while the row starts at or before hi."""
+    f.seek(offset)
+    for raw_line in iter(f.readline, b""):
+        if offset > hi:
+            break
+        offset += len(raw_line)
+        yield raw_line.decode("utf-8")
 
 
 @typechecked
-def parse_pos_file(path2file: str, sep: str | None = None) -> tuple[dict[str, list], list[list[str]]]:
+def parse_pos_file(path2file: str,
+                   sep: str | None = None,
+                   columnar: bool = False,
+                   cache: bool = False,
+                   q: int | list[int] | None = None,
+                   min_ns: int | None = None,
+                   min_ratio: float | None = None,
+                   start: datetime | np.datetime64 | None = None,
+                   end: datetime | np.datetime64 | None = None) -> tuple[dict[str, list], list[list[str]] | dict[str, np.ndarray]]:
     """This function for parsing .pos file. The method returns header, name of columns and time serie.
 
     Args:
         path2file (str): Path to the file .pos
         sep (str | None, optional): If .pos file has separation (e.g. ;) use sep=";". Defaults to None.
+        columnar (bool, optional): If True, the time serie is returned as a dictionary of NumPy arrays
+            (one typed array per column) instead of a list of rows. All rows are parsed in bulk,
+            so it is much faster and lighter for large files. Defaults to False.
+        cache (bool, optional): Only for columnar mode. If True, the parsed columns are saved as .npy files
+            in the sidecar directory "path2file.cache". The next calls load them as read-only memory maps
+            instead of parsing the text. The cache is rebuilt when the size or the modification time
+            of .pos file changes. Defaults to False.
+        q (int | list[int] | None, optional): Only for columnar mode. Keep only epochs with this Q
+            (e.g. 1 is fix, [1, 2] are fix and float). Defaults to None.
+        min_ns (int | None, optional): Only for columnar mode. Keep only epochs with ns >= min_ns. Defaults to None.
+        min_ratio (float | None, optional): Only for columnar mode. Keep only epochs with ratio >= min_ratio.
+            NMEA files have no ratio, the filter raises ValueError for them. Defaults to None.
+        start (datetime | np.datetime64 | None, optional): Only for columnar mode. Keep only epochs with
+            time >= start (GPST). Defaults to None.
+        end (datetime | np.datetime64 | None, optional): Only for columnar mode. Keep only epochs with
+            time < end (GPST). Defaults to None.
+            The filters are applied while the file is read, rejected epochs aren't converted into columns.
+            With the time window the rows before start are skipped as text and reading stops after end.
+            With cache the whole file is cached and the filters are applied to the loaded columns.
+
+    Raises:
+        ValueError: Cache is supported only in columnar mode.
+        ValueError: Filters are supported only in columnar mode.
+        ValueError: Column of the filter {name} is not found in .pos file. Only for columnar mode.
+        ValueError: Name of columns is not found in header of .pos file. Only for columnar mode.
+        ValueError: Number of fields in rows of .pos file doesn't match the name of columns. Only for columnar mode.
 
     Returns:
-        tuple[dict[str, list], list[list[str]]]: Return tuple. First item is header of .pos file.
-            Second item is time serie.
+        tuple[dict[str, list], list[list[str]] | dict[str, np.ndarray]]: Return tuple. First item is header of .pos file.
+            Second item is time serie. If columnar is True, keys of time serie are "time", coordinates
+            ("lat", "lon", "height" or "x", "y", "z" or "e", "n", "u"), "Q", "ns", sd columns (e.g. "sdn"), "age", "ratio".
+            "time" is datetime64[ns] array of GPST. Time in calendar or GPS week/TOW form and in UTC or JST
+            (see out-timeform and out-timesys of RtkLibPost) is converted to GPST with leap seconds.
+            Latitude and longitude in d'" format are converted to decimal degrees.
+            Velocity columns (out-outvel) are named by their header labels (e.g. "vn", "sdvn").
+            For NMEA files (out-solformat=nmea) GGA sentences are parsed into "time", "lat", "lon",
+            "height" (ellipsoidal), "Q" (RTKLib quality), "ns", "hdop", "age".
+
+    Examples:
+        >>> header, data = parse_pos_file("/path/to/file.pos", columnar=True)
+        >>> data["lat"]
+        array([55.01234568, 55.01234569, ...])
+        >>> data["Q"]
+        array([1, 1, 2, ...], dtype=int32)
+        >>> data["time"][data["time"] >= np.datetime64("2022-01-01T12:00")]
+        array(['2022-01-01T12:00:00.000000000', ...], dtype='datetime64[ns]')
+        >>> # only fixed epochs of one hour
+        >>> header, data = parse_pos_file("/path/to/file.pos", columnar=True, q=1,
+        ...                               start=datetime(2022, 1, 1, 12), end=datetime(2022, 1, 1, 13))
     """
 
+    filters = _PosFilter(q, min_ns, min_ratio, start, end)
+
+    if cache and not columnar:
+        raise ValueError("Cache is supported only in columnar mode.")
+    if not filters.is_empty() and not columnar:
+        raise ValueError("Filters are supported only in columnar mode.")
+
+    if cache:
+        stat = os.stat(path2file)
+        cached = _load_cache(path2file, sep, stat)
+        if cached is None:
+            cached = parse_pos_file(path2file, sep, columnar=True)
+            _save_cache(path2file, sep, stat, *cached)
+        header, data = cached
+        if not filters.is_empty():
+            mask = filters.mask_quality(data.get("Q"), data.get("ns"), data.get("ratio"))
+            mask &= filters.mask_time(data["time"])
+            data = {key: value[mask] for key, value in data.items()}
+        return header, data
+
+    if columnar:
+        chunks = iter_pos_file(path2file, sep=sep, q=q, min_ns=min_ns, min_ratio=min_ratio, start=start, end=end)
+        header = next(chunks)
+        return header, _concat_chunks(list(chunks), header, sep)
+
     header = defaultdict(list)
     data = list()
 
     with open(path2file, 'r', encoding="utf-8") as f:
         for line in f:
-            # parse header
-            if line.startswith("%") and ": " in line:
-                info = line.split(": ")
-                key = info[0].replace("% ", "").strip()
-                value = info[1].replace("\n", "").strip()
-                header[key] += [value]
-
-            # parse name columns
-            elif line.startswith("%") and "ratio" in line:
-                name_columns = line.split()[1:]
-                header["name_columns"] = name_columns
+            # parse header and name columns
+            if _parse_header_line(line, header):
+                continue
 
             # parse data
-            elif not line.startswith("%"):
+            else:
                 row = line.split(sep)
                 # concatenation time
                 row[1] = f"{row[0]} {row[1]}"
@@ -66,3 +581,565 @@ def parse_pos_file(path2file: str, sep: str | None = None) -> tuple[dict[str, li
                 data.append(row)
 
     return dict(header), data
+
+
+@typechecked
+def iter_pos_file(path2file: str,
+                  chunk_size: int = 86400,
+                  sep: str | None = None,
+                  q: int | list[int] | None = None,
+                  min_ns: int | None = None,
+                  min_ratio: float | None = None,
+                  start: datetime | np.datetime64 | None = None,
+                  end: datetime | np.datetime64 | None = None) -> Iterator[dict[str, list] | dict[str, np.ndarray]]:
+    """This generator parses .pos file by chunks. First it yields the header of .pos file once,
+    then it yields chunks of the time serie in columnar mode (see parse_pos_file with columnar=True).
+    Only one chunk is kept in memory, so files of any size can be processed.
+
+    Args:
+        path2file (str): Path to the file .pos
+        chunk_size (int, optional): Max number of epochs in one chunk. Defaults to 86400.
+        sep (str | None, optional): If .pos file has separation (e.g. ;) use sep=";". Defaults to None.
+        q (int | list[int] | None, optional): Keep only epochs with this Q. Defaults to None.
+        min_ns (int | None, optional): Keep only epochs with ns >= min_ns. Defaults to None.
+        min_ratio (float | None, optional): Keep only epochs with ratio >= min_ratio. Defaults to None.
+        start (datetime | np.datetime64 | None, optional): Keep only epochs with time >= start (GPST). Defaults to None.
+        end (datetime | np.datetime64 | None, optional): Keep only epochs with time < end (GPST). Defaults to None.
+            Rejected epochs aren't converted, see parse_pos_file. Chunks can be shorter than chunk_size then.
+
+    Raises:
+        ValueError: Chunk size must be positive.
+        ValueError: Column of the filter {name} is not found in .pos file.
+        ValueError: Name of columns is not found in header of .pos file.
+        ValueError: Number of fields in rows of .pos file doesn't match the name of columns.
+
+    Yields:
+        dict[str, list] | dict[str, np.ndarray]: The first item is header of .pos file.
+            Next items are chunks of the time serie.
+
+    Examples:
+        >>> chunks = iter_pos_file("/path/to/file.pos", chunk_size=3600)
+        >>> header = next(chunks)
+        >>> for chunk in chunks:
+        ...     print(chunk["time"][0], chunk["height"].mean())
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive.")
+
+    filters = _PosFilter(q, min_ns, min_ratio, start, end)
+    if filters.is_empty():
+        filters = None
+
+    with open(path2file, 'rb') as f:
+        header, first_line, _ = _read_header(f)
+        yield header
+        if not first_line:
+            return
+
+        schema = _PosSchema(header.get("name_columns", []), first_line, sep)
+        if filters is not None:
+            filters.bind(schema)
+
+        lines = chain([first_line], (line.decode("utf-8") for line in f))
+        yield from _iter_chunks(lines, schema, filters, chunk_size)
+
+
+@typechecked
+def gpst2gps_seconds(time: np.ndarray) -> np.ndarray:
+    """Convert datetime64 array of GPST (e.g. "time" of parse_pos_file in columnar mode)
+    into float seconds since GPS epoch 1980-01-06.
+
+    Args:
+        time (np.ndarray): Array of datetime64.
+
+    Returns:
+        np.ndarray: Array of float64 GPS seconds. GPS week is seconds // 604800.
+
+    Examples:
+        >>> gpst2gps_seconds(np.array(["2022-01-01T00:00:00"], dtype="datetime64[ns]"))
+        array([1.3250304e+09])
+    """
+    return (time.astype("datetime64[ns]") - _GPS_EPOCH).astype(np.int64) / 1e9
+
+
+@typechecked
+def gps_week2gpst(week: np.ndarray, tow: np.ndarray) -> np.ndarray:
+    """Convert GPS week and time of week (e.g. fields of .pos file with out-timeform=tow or of .stat file)
+    into datetime64[ns] of GPST.
+
+    Args:
+        week (np.ndarray): Array of GPS weeks.
+        tow (np.ndarray): Array of float seconds of week.
+
+    Returns:
+        np.ndarray: Array of datetime64[ns]. Seconds are rounded to nanoseconds.
+
+    Examples:
+        >>> gps_week2gpst(np.array([2190]), np.array([518400.5]))
+        array(['2022-01-01T00:00:00.500000000'], dtype='datetime64[ns]')
+    """
+    time = _GPS_EPOCH + (np.asarray(week).astype(np.int64) * 604800 * 10**9).astype("timedelta64[ns]")
+    return time + np.round(np.asarray(tow, dtype=np.float64) * 1e9).astype(np.int64).astype("timedelta64[ns]")
+
+
+@typechecked
+def build_pos_index(path2file: str, stride: int = 3600, sep: str | None = None) -> dict[str, np.ndarray]:
+    """This function builds the time index of .pos file. The index stores the time and the byte offset
+    of every stride-th epoch. It's used by read_pos_window to seek to the time window directly.
+    The index stays valid while new epochs are only appended to the file.
+
+    Args:
+        path2file (str): Path to the file .pos
+        stride (int, optional): Number of epochs between the index entries. Defaults to 3600.
+        sep (str | None, optional): If .pos file has separation (e.g. ;) use sep=";". Defaults to None.
+
+    Raises:
+        ValueError: Stride must be positive.
+        ValueError: Random access isn't supported for NMEA files.
+
+    Returns:
+        dict[str, np.ndarray]: Dictionary with keys "time" (datetime64[ns] of GPST) and "offset" (int64).
+
+    Examples:
+        >>> index = build_pos_index("/path/to/file.pos", stride=600)
+        >>> np.savez("/path/to/file.pos.index.npz", **index)
+        >>> header, data = read_pos_window("/path/to/file.pos", datetime(2022, 1, 1, 12), datetime(2022, 1, 1, 13),
+        ...                                index=dict(np.load("/path/to/file.pos.index.npz")))
+    """
+    if stride <= 0:
+        raise ValueError("Stride must be positive.")
+
+    lines = []
+    offsets = []
+    with open(path2file, 'rb') as f:
+        header, first_line, offset = _read_header(f)
+        schema = _PosSchema(header.get("name_columns", []), first_line, sep)
+        if schema.nmea:
+            raise ValueError("Random access isn't supported for NMEA files.")
+
+        f.seek(offset)
+        number = 0
+        for raw_line in iter(f.readline, b""):
+            if raw_line.strip() and not raw_line.startswith(b"%"):
+                if number % stride == 0:
+                    lines.append(raw_line.decode("utf-8"))
+                    offsets.append(offset)
+                number += 1
+            offset += len(raw_line)
+
+    return {"time": schema.convert(lines)["time"], "offset": np.array(offsets, dtype=np.int64)}
+
+
+@typechecked
+def read_pos_window(path2file: str,
+                    start: datetime | np.datetime64,
+                    end: datetime | np.datetime64,
+                    index: dict[str, np.ndarray] | None = None,
+                    sep: str | None = None,
+                    q: int | list[int] | None = None,
+                    min_ns: int | None = None,
+                    min_ratio: float | None = None) -> tuple[dict[str, list], dict[str, np.ndarray]]:
+    """This function reads epochs of .pos file in the time window start <= time < end (GPST).
+    Unlike parse_pos_file it doesn't read the file from the top: it seeks to the window by the index
+    from build_pos_index or, without the index, by the binary search on the time of rows.
+    Rows of .pos file must be sorted by time, as RTKLib writes them.
+
+    Args:
+        path2file (str): Path to the file .pos
+        start (datetime | np.datetime64): Start of the time window (GPST).
+        end (datetime | np.datetime64): End of the time window (GPST).
+        index (dict[str, np.ndarray] | None, optional): Index from build_pos_index. Defaults to None.
+        sep (str | None, optional): If .pos file has separation (e.g. ;) use sep=";". Defaults to None.
+        q (int | list[int] | None, optional): Keep only epochs with this Q. Defaults to None.
+        min_ns (int | None, optional): Keep only epochs with ns >= min_ns. Defaults to None.
+        min_ratio (float | None, optional): Keep only epochs with ratio >= min_ratio. Defaults to None.
+
+    Raises:
+        ValueError: Random access isn't supported for NMEA files.
+
+    Returns:
+        tuple[dict[str, list], dict[str, np.ndarray]]: Header and time serie in columnar mode (see parse_pos_file).
+
+    Examples:
+        >>> header, data = read_pos_window("/path/to/file.pos", datetime(2022, 1, 1, 23), datetime(2022, 1, 2))
+    """
+    filters = _PosFilter(q, min_ns, min_ratio, start, end)
+
+    with open(path2file, 'rb') as f:
+        header, first_line, first_offset = _read_header(f)
+        if not first_line:
+            return header, _concat_chunks([], header, sep)
+
+        schema = _PosSchema(header.get("name_columns", []), first_line, sep)
+        if schema.nmea:
+            raise ValueError("Random access isn't supported for NMEA files.")
+        filters.bind(schema)
+        size = os.fstat(f.fileno()).st_size
+
+        if index is not None:
+            i = np.searchsorted(index["time"], filters.start, side="left") - 1
+            lo = int(index["offset"][i]) if i >= 0 else first_offset
+            j = np.searchsorted(index["time"], filters.end, side="left")
+            hi = int(index["offset"][j]) - 1 if j < len(index["time"]) else size
+        else:
+            lo, _ = _bisect_pos_file(f, schema, first_offset, size, filters.start)
+            _, hi = _bisect_pos_file(f, schema, lo, size, filters.end)
+
+        chunks = list(_iter_chunks(_read_lines(f, lo, hi), schema, filters, 86400))
+
+    return header, _concat_chunks(chunks, header, sep)
+
+
+class PosTailReader:
+    """
+    This class reads .pos file incrementally, e.g. while rnx2rtkp is still writing it.
+    The reader remembers the byte offset and the unfinished last row, so every call of read_new
+    reads and converts only the data appended since the previous call.
+    If the file is truncated or replaced (e.g. by a new run of RtkLibPost), the reader starts from the top.
+    """
+    @typechecked
+    def __init__(self, path2file: str, sep: str | None = None) -> None:
+        """
+        Args:
+            path2file (str): Path to the file .pos
+            sep (str | None, optional): If .pos file has separation (e.g. ;) use sep=";". Defaults to None.
+        """
+        self.path2file = path2file
+        self.sep = sep
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the state of the reader. The next call of read_new reads the file from the top."""
+        self.header = defaultdict(list)
+        self.offset = 0
+        self.__partial = b""
+        self.__schema = None
+        self.__inode = None
+
+    @typechecked
+    def read_new(self) -> dict[str, np.ndarray]:
+        """Read epochs appended to the file since the last call.
+
+        Raises:
+            ValueError: Name of columns is not found in header of .pos file.
+            ValueError: Number of fields in rows of .pos file doesn't match the name of columns.
+
+        Returns:
+            dict[str, np.ndarray]: New epochs in columnar mode (see parse_pos_file).
+                The dictionary is empty while the name of columns isn't written to the file yet.
+
+        Examples:
+            >>> reader = PosTailReader("/path/to/file.pos")
+            >>> while True:
+            ...     new_data = reader.read_new()
+            ...     if new_data and len(new_data["time"]):
+            ...         print(new_data["time"][-1], new_data["height"][-1])
+            ...     time.sleep(1)
+        """
+        with open(self.path2file, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self.__inode or stat.st_size < self.offset:
+                self.reset()
+                self.__inode = stat.st_ino
+
+            f.seek(self.offset)
+            new_bytes = f.read()
+        self.offset += len(new_bytes)
+
+        # only finished rows are parsed, the rest waits for the next call
+        new_bytes = self.__partial + new_bytes
+        end = new_bytes.rfind(b"\n") + 1
+        self.__partial = new_bytes[end:]
+
+        lines = []
+        for line in new_bytes[:end].decode("utf-8").splitlines(keepends=True):
+            if self.__schema is None and _parse_header_line(line, self.header):
+                continue
+            if not line.strip() or line.startswith("%"):
+                continue
+            if self.__schema is None:
+                self.__schema = _PosSchema(self.header.get("name_columns", []), line, self.sep)
+            lines.append(line)
+
+        if self.__schema is not None:
+            return self.__schema.convert(lines)
+        if "name_columns" in self.header:
+            return _PosSchema(self.header["name_columns"], "", self.sep).convert([])
+        return {}
+
+
+def _parse_pos_worker(path2file: str, kwargs: dict) -> tuple[str, dict[str, np.ndarray] | str]:
+    """Parse .pos file in a worker process. NumPy arrays are sent back to the parent as raw buffers."""
+    try:
+        _, data = parse_pos_file(path2file, columnar=True, **kwargs)
+    except (OSError, ValueError, UnicodeDecodeError) as e:
+        return path2file, str(e)
+    return path2file, {key: np.asarray(value) for key, value in data.items()}
+
+
+@typechecked
+def assemble_station_series(input_files: str | list[str],
+                            workers: int = 1,
+                            recursion: bool = False,
+                            sep: str | None = None,
+                            cache: bool = False,
+                            q: int | list[int] | None = None,
+                            min_ns: int | None = None,
+                            min_ratio: float | None = None,
+                            start: datetime | np.datetime64 | None = None,
+                            end: datetime | np.datetime64 | None = None
+                            ) -> tuple[dict[str, dict[str, np.ndarray]], dict[str, str]]:
+    """This function assembles time series of stations from many .pos files (e.g. daily output of
+    RtkLibPost.start_multi_processing). Files are grouped by station, the name of station is
+    the first 4 letters of the file name in upper case (as in RINEX file names).
+    Files are parsed in parallel processes in columnar mode, then the time serie of every station
+    is sorted by time and the duplicated epochs are removed (the epoch of the first file is kept).
+
+    Args:
+        input_files (str | list[str]): Path to the directory with .pos files or list of paths to .pos files.
+        workers (int, optional): The number of parallel processes. Defaults to 1.
+        recursion (bool, optional): Recursively search for files in the directory. Defaults to False.
+        sep (str | None, optional): If .pos file has separation (e.g. ;) use sep=";". Defaults to None.
+        cache (bool, optional): Use the sidecar cache of every file, see parse_pos_file. Defaults to False.
+        q (int | list[int] | None, optional): Keep only epochs with this Q. Defaults to None.
+        min_ns (int | None, optional): Keep only epochs with ns >= min_ns. Defaults to None.
+        min_ratio (float | None, optional): Keep only epochs with ratio >= min_ratio. Defaults to None.
+        start (datetime | np.datetime64 | None, optional): Keep only epochs with time >= start (GPST). Defaults to None.
+        end (datetime | np.datetime64 | None, optional): Keep only epochs with time < end (GPST). Defaults to None.
+
+    Raises:
+        ValueError: Number of workers must be positive.
+
+    Returns:
+        tuple[dict[str, dict[str, np.ndarray]], dict[str, str]]: First element of the tuple is a dictionary,
+            where key is name of station and value is time serie in columnar mode (see parse_pos_file).
+            Second element of the tuple is a dictionary of files which can't be parsed, value is the error.
+            If files of the station have different columns, the station is skipped and all its files are there.
+
+    Examples:
+        >>> series, errors = assemble_station_series("/path/to/dir_pos", workers=8, recursion=True, q=1)
+        >>> series["NSK1"]["time"]
+        array(['2022-01-01T00:00:00.000000000', ...], dtype='datetime64[ns]')
+    """
+    if workers <= 0:
+        raise ValueError("Number of workers must be positive.")
+
+    if isinstance(input_files, str):
+        input_files = [file for file in mcl_tools.get_files_from_dir(input_files, recursion) if file.endswith(".pos")]
+    input_files = sorted(input_files)
+
+    kwargs = {"sep": sep, "cache": cache, "q": q, "min_ns": min_ns, "min_ratio": min_ratio, "start": start, "end": end}
+    if workers == 1:
+        results = [_parse_pos_worker(file, kwargs) for file in input_files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_parse_pos_worker, input_files, [kwargs] * len(input_files),
+                                        chunksize=max(1, len(input_files) // (workers * 4))))
+
+    errors = {}
+    station_chunks = defaultdict(list)
+    station_files = defaultdict(list)
+    for file, data in results:
+        if isinstance(data, str):
+            errors[file] = data
+            continue
+        station = os.path.basename(file)[:4].upper()
+        station_chunks[station].append(data)
+        station_files[station].append(file)
+
+    series = {}
+    for station, chunks in station_chunks.items():
+        if any(chunk.keys() != chunks[0].keys() for chunk in chunks):
+            errors.update((file, f"Files of station {station} have different columns.") for file in station_files[station])
+            continue
+
+        data = {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+        order = np.argsort(data["time"], kind="stable")
+        _, first = np.unique(data["time"][order], return_index=True)
+        order = order[first]
+        series[station] = {key: value[order] for key, value in data.items()}
+
+    return series, errors
+
+
+def _aggregate_bins(data: dict[str, np.ndarray], bins: np.ndarray, interval: np.timedelta64) -> dict[str, np.ndarray]:
+    """Statistics of the sorted bins for every coordinate column of data."""
+    starts = np.flatnonzero(np.concatenate([[True], bins[1:] != bins[:-1]]))
+    counts = np.diff(np.append(starts, len(bins)))
+    group = np.repeat(np.arange(len(starts)), counts)
+
+    output = {"time": np.datetime64(0, "ns") + bins[starts] * interval, "count": counts}
+    for key, sd_key in _AGGREGATE_COLUMNS.items():
+        if key not in data:
+            continue
+        values = data[key].astype(np.float64)
+        mean = np.add.reduceat(values, starts) / counts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(np.add.reduceat((values - mean[group]) ** 2, starts) / (counts - 1))
+        ordered = values[np.lexsort((values, group))]
+        median = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+
+        output[f"{key}_mean"] = mean
+        output[f"{key}_median"] = median
+        output[f"{key}_std"] = std
+        if sd_key in data:
+            weights = 1 / np.maximum(data[sd_key].astype(np.float64), _MIN_SD) ** 2
+            weights_sum = np.add.reduceat(weights, starts)
+            output[f"{key}_wmean"] = np.add.reduceat(weights * values, starts) / weights_sum
+            output[f"{key}_wsigma"] = 1 / np.sqrt(weights_sum)
+    return output
+
+
+@typechecked
+def aggregate_pos_series(chunks: dict[str, np.ndarray] | Iterable[dict],
+                         interval: np.timedelta64 = np.timedelta64(1, "D"),
+                         q: int | list[int] | None = None) -> dict[str, np.ndarray]:
+    """This function aggregates epochs of the time serie into intervals (e.g. daily positions from 1 Hz
+    kinematic solutions of RtkLibPost). For every interval and coordinate it computes the mean, median,
+    the mean weighted by the sd column (1 / sd^2), its formal sigma, the count and the scatter (std).
+    Chunks are processed one by one, only the last unfinished interval is kept between them, so a year
+    of 1 Hz data is never fully in memory. Chunks must be sorted by time, as .pos files are.
+
+    The coordinates and their weights are lat/lon/height with sdn/sde/sdu, x/y/z with sdx/sdy/sdz
+    and e/n/u with sde/sdn/sdu. sd less than 0.1 mm is considered as 0.1 mm.
+
+    Args:
+        chunks (dict[str, np.ndarray] | Iterable[dict]): Time serie in columnar mode or chunks of it,
+            e.g. iter_pos_file (the header is skipped) or parse_pos_file with columnar=True.
+        interval (np.timedelta64, optional): Length of intervals. Intervals start at midnight GPST for daily
+            and hourly intervals. Defaults to np.timedelta64(1, "D").
+        q (int | list[int] | None, optional): Use only epochs with this Q. Defaults to None.
+
+    Raises:
+        ValueError: Interval must be positive.
+        ValueError: Chunks must be sorted by time.
+
+    Returns:
+        dict[str, np.ndarray]: Columns "time" (start of interval), "count" and for every coordinate
+            (e.g. height) "height_mean", "height_median", "height_std", "height_wmean", "height_wsigma".
+            Empty intervals aren't included.
+
+    Examples:
+        >>> daily = aggregate_pos_series(iter_pos_file("/path/to/file.pos", chunk_size=3600), q=1)
+        >>> daily["time"], daily["height_wmean"], daily["count"]
+        (array(['2022-01-01T00:00:00.000000000'], dtype='datetime64[ns]'), array([150.1234]), array([86400]))
+        >>> hourly = aggregate_pos_series(data, interval=np.timedelta64(1, "h"))
+    """
+    interval = interval.astype("timedelta64[ns]")
+    if interval <= np.timedelta64(0, "ns"):
+        raise ValueError("Interval must be positive.")
+    if isinstance(chunks, dict):
+        chunks = [chunks]
+
+    results = []
+    pending = None
+    last_bin = None
+    for chunk in chunks:
+        # the header of iter_pos_file
+        if "time" not in chunk:
+            continue
+        if q is not None and "Q" in chunk:
+            chunk = {key: value[np.isin(chunk["Q"], q)] for key, value in chunk.items()}
+        if len(chunk["time"]) == 0:
+            continue
+
+        if pending is not None:
+            chunk = {key: np.concatenate([pending[key], chunk[key]]) for key in chunk}
+        bins = (chunk["time"].astype("datetime64[ns]") - np.datetime64(0, "ns")) // interval
+        if np.any(bins[1:] < bins[:-1]) or (last_bin is not None and bins[0] <= last_bin):
+            raise ValueError("Chunks must be sorted by time.")
+
+        # the last interval can be continued in the next chunk
+        done = int(np.searchsorted(bins, bins[-1]))
+        if done:
+            results.append(_aggregate_bins({key: value[:done] for key, value in chunk.items()}, bins[:done], interval))
+            last_bin = bins[done - 1]
+        pending = {key: value[done:] for key, value in chunk.items()}
+
+    if pending is not None:
+        bins = (pending["time"].astype("datetime64[ns]") - np.datetime64(0, "ns")) // interval
+        results.append(_aggregate_bins(pending, bins, interval))
+    if not results:
+        return {"time": np.array([], dtype="datetime64[ns]"), "count": np.array([], dtype=np.int64)}
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+
+def _series_report(data: dict[str, np.ndarray], nominal_interval: np.timedelta64 | None,
+                   gap_factor: float) -> dict:
+    time = np.sort(data["time"].astype("datetime64[ns]"))
+    report = {"epochs": len(time)}
+    if len(time) == 0:
+        return report
+
+    steps = np.diff(time)
+    positive = steps[steps > np.timedelta64(0, "ns")]
+    if nominal_interval is None:
+        nominal_interval = np.median(positive) if len(positive) else np.timedelta64(1, "s")
+    nominal_interval = nominal_interval.astype("timedelta64[ns]")
+    span = time[-1] - time[0]
+
+    gaps = np.flatnonzero(steps > gap_factor * nominal_interval)
+    days = np.arange(time[0].astype("datetime64[D]"), time[-1].astype("datetime64[D]") + 1)
+    day_epochs = np.bincount((time.astype("datetime64[D]") - days[0]).astype(np.int64), minlength=len(days))
+
+    report.update({
+        "start": time[0],
+        "end": time[-1],
+        "nominal_interval": nominal_interval,
+        "actual_interval": span / (len(time) - 1) if len(time) > 1 else nominal_interval,
+        "duplicates": int(np.sum(steps == np.timedelta64(0, "ns"))),
+        "completeness": min(1.0, len(time) / (span // nominal_interval + 1)),
+        "gaps": {"start": time[gaps], "end": time[gaps + 1], "duration": steps[gaps]},
+        "days": days,
+        "day_epochs": day_epochs,
+        "day_completeness": day_epochs / (np.timedelta64(1, "D") // nominal_interval)
+    })
+    if "Q" in data:
+        q, counts = np.unique(data["Q"], return_counts=True)
+        report["q_fraction"] = {int(key): float(count / len(time)) for key, count in zip(q, counts)}
+    return report
+
+
+@typechecked
+def report_series_quality(series: dict[str, np.ndarray] | dict[str, dict[str, np.ndarray]],
+                          nominal_interval: np.timedelta64 | None = None,
+                          gap_factor: float = 1.5) -> dict:
+    """This function reports gaps, sampling and completeness of the time serie of one station
+    (e.g. from parse_pos_file with columnar=True) or of every station of the archive (e.g. from
+    assemble_station_series). Everything is computed by differences of time arrays.
+
+    Args:
+        series (dict[str, np.ndarray] | dict[str, dict[str, np.ndarray]]): Time serie in columnar mode or
+            dictionary of time series of stations.
+        nominal_interval (np.timedelta64 | None, optional): Nominal sampling interval. If None, it's the median
+            step of the serie. Defaults to None.
+        gap_factor (float, optional): A step longer than gap_factor * nominal_interval is a gap. Defaults to 1.5.
+
+    Raises:
+        ValueError: Gap factor must be greater than 1.
+
+    Returns:
+        dict: Report of the serie or dictionary of reports of stations. Keys of report: "epochs", "start", "end",
+            "nominal_interval", "actual_interval" (mean step), "duplicates" (number of repeated epochs),
+            "completeness" (epochs / nominal epochs between start and end), "gaps" (dictionary with arrays
+            "start" - last epoch before the gap, "end" - first epoch after the gap, "duration"),
+            "days", "day_epochs", "day_completeness" (epochs of the day / nominal epochs of the whole day)
+            and "q_fraction" (fraction of epochs of every Q, if the serie has Q).
+            The empty serie has only "epochs".
+
+    Examples:
+        >>> header, data = parse_pos_file("/path/to/file.pos", columnar=True)
+        >>> report = report_series_quality(data, np.timedelta64(1, "s"))
+        >>> report["completeness"], report["q_fraction"], len(report["gaps"]["start"])
+        (0.987, {1: 0.95, 2: 0.05}, 3)
+        >>> series, errors = assemble_station_series("/path/to/dir_pos", workers=8)
+        >>> reports = report_series_quality(series)
+        >>> reports["NSK1"]["day_completeness"]
+        array([1., 0.98, ...])
+    """
+    if gap_factor <= 1:
+        raise ValueError("Gap factor must be greater than 1.")
+
+    if "time" in series:
+        return _series_report(series, nominal_interval, gap_factor)
+    return {station: _series_report(data, nominal_interval, gap_factor) for station, data in series.items()}
@@ -0,0 +1,324 @@
+"""
+This module is designed for data exchange with Hector (see conf/removeoutliers.ctl and conf/estimatetrend.ctl).
+- Write .mom files of many stations and components from time series in columnar mode;
+- Read .mom files (input and output of removeoutliers and estimatetrend) back into time series.
+
+Numbers are formatted by NumPy for the whole file at once and every file is written by one buffered write,
+stations and components are processed in parallel processes.
+Files are placed as in the ctl files: path_dir/NSK1/U/Hector_U.mom.
+"""
+
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import warnings
+import numpy as np
+from typeguard import typechecked
+from moncenterlib.gnss.time_series_analysis import time2mjd, MJD_EPOCH
+
+
+# Decimals of MJD in .mom files, 1e-10 day is about 9 microseconds
+_TIME_DECIMALS = 10
+# Maximum number of digits which int64 holds without overflow
+_MAX_DIGITS = 18
+# Powers of 10 for the number of digits of integers
+_POWERS = 10 ** np.arange(1, _MAX_DIGITS + 1, dtype=np.int64)
+
+
+def _format_fixed(values: np.ndarray, decimals: int) -> np.ndarray:
+    """Values as right-aligned text "%.{decimals}f" in the table of bytes (rows, width)."""
+    scaled = np.rint(np.abs(values) * 10.0 ** decimals).astype(np.int64)
+    negative = (values < 0) & (scaled > 0)
+    n_digits = max(int(np.searchsorted(_POWERS, scaled.max(), side="right")) + 1 if len(scaled) else 1, decimals + 1)
+    if n_digits > _MAX_DIGITS:
+        raise ValueError("Values are too large for .mom file.")
+
+    digits = np.empty((len(values), n_digits), dtype=np.uint8)
+    rest = scaled
+    for j in range(n_digits - 1, -1, -1):
+        rest, digit = np.divmod(rest, 10)
+        digits[:, j] = digit + ord("0")
+
+    # leading zeros of the integer part are spaces, the sign is just before the first digit
+    n_int = n_digits - decimals
+    lead = n_int - 1 - np.searchsorted(_POWERS, scaled // 10 ** decimals, side="right")
+    table = np.full((len(values), n_digits + 2 if decimals else n_digits + 1), ord(" "), dtype=np.uint8)
+    table[:, 1:n_int + 1] = np.where(np.arange(n_int) >= lead[:, None], digits[:, :n_int], ord(" "))
+    table[np.flatnonzero(negative), lead[negative]] = ord("-")
+    if decimals:
+        table[:, n_int + 1] = ord(".")
+        table[:, n_int + 2:] = digits[:, n_int:]
+    return table
+
+
+def _mom_bytes(mjd: np.ndarray, columns: list[np.ndarray], offsets: np.ndarray, sampling_period: float,
+               decimals: int) -> bytes:
+    """Text of .mom file: the header and rows "MJD value [model]"."""
+    header = f"# sampling period {sampling_period:.10g}\n"
+    header += "".join(f"# offset {mjd_offset:.{_TIME_DECIMALS}g}\n" for mjd_offset in offsets)
+
+    space = np.full((len(mjd), 1), ord(" "), dtype=np.uint8)
+    tables = [_format_fixed(mjd, _TIME_DECIMALS)]
+    for column in columns:
+        tables += [space, _format_fixed(column, decimals)]
+    tables.append(np.full((len(mjd), 1), ord("\n"), dtype=np.uint8))
+    return header.encode("ascii") + np.concatenate(tables, axis=1).tobytes()
+
+
+@typechecked
+def write_mom(path2file: str,
+              time: np.ndarray,
+              values: np.ndarray,
+              model: np.ndarray | None = None,
+              offsets: np.ndarray | None = None,
+              decimals: int = 6) -> None:
+    """This function writes one .mom file. Epochs where values are NaN are skipped (gaps for Hector).
+    The sampling period is the median step of all epochs.
+
+    Args:
+        path2file (str): Path to the file .mom
+        time (np.ndarray): Time of epochs (datetime64 or MJD).
+        values (np.ndarray): Values, e.g. "u" of the time serie (PhysicalUnit of the ctl file).
+        model (np.ndarray | None, optional): The third column of the model, as in output of estimatetrend.
+            Defaults to None.
+        offsets (np.ndarray | None, optional): Epochs of offsets (datetime64 or MJD), e.g. from detect_offsets.
+            They are written as "# offset MJD". Defaults to None.
+        decimals (int, optional): Decimals of values. Defaults to 6.
+
+    Raises:
+        ValueError: Values are too large for .mom file.
+
+    Examples:
+        >>> write_mom("/path/to/NSK1/U/Hector_U.mom", data["time"], data["u"])
+    """
+    mjd = time2mjd(time)
+    steps = np.diff(mjd)
+    sampling_period = float(np.median(steps[steps > 0])) if np.any(steps > 0) else 1.0
+
+    valid = np.isfinite(values)
+    mjd = mjd[valid]
+    columns = [np.asarray(values, dtype=np.float64)[valid]]
+    if model is not None:
+        columns.append(np.asarray(model, dtype=np.float64)[valid])
+    offsets = np.zeros(0) if offsets is None else time2mjd(offsets)
+
+    text = _mom_bytes(mjd, columns, offsets, sampling_period, decimals)
+    if os.path.dirname(path2file):
+        os.makedirs(os.path.dirname(path2file), exist_ok=True)
+    with open(path2file, 'wb') as f:
+        f.write(text)
+
+
+@typechecked
+def read_mom(path2file: str) -> tuple[dict[str, float | np.ndarray], dict[str, np.ndarray]]:
+    """This function reads .mom file. All rows are converted by one NumPy call.
+
+    Args:
+        path2file (str): Path to the file .mom
+
+    Raises:
+        ValueError: Number of fields in rows of .mom file isn't the same.
+
+    Returns:
+        tuple[dict[str, float | np.ndarray], dict[str, np.ndarray]]: Header with keys "sampling_period" (days)
+            and "offsets" (MJD) and data with keys "time" (MJD), "value" and "model" (only if the file has
+            the third column, e.g. output of estimatetrend).
+
+    Examples:
+        >>> header, data = read_mom("/path/to/NSK1/U/Hector_U_trend.mom")
+        >>> header["offsets"]
+        array([59581.])
+    """
+    with open(path2file, 'rb') as f:
+        text = f.read().decode("ascii")
+
+    # comments are at the top of the file, only they are split into lines
+    comments = []
+    pos = 0
+    while pos < len(text) and text[pos] in "#\r\n":
+        end = text.find("\n", pos) + 1 or len(text)
+        comments.append(text[pos:end])
+        pos = end
+    body = text[pos:]
+    if "#" in body:
+        lines = body.splitlines(keepends=True)
+        comments += [line for line in lines if line.startswith("#")]
+        body = "".join(line for line in lines if not line.startswith("#"))
+
+    header = {"sampling_period": np.nan, "offsets": []}
+    for line in comments:
+        fields = line[1:].split()
+        if fields[:2] == ["sampling", "period"]:
+            header["sampling_period"] = float(fields[2])
+        elif fields[:1] == ["offset"]:
+            header["offsets"].append(float(fields[1]))
+    header["offsets"] = np.array(header["offsets"], dtype=np.float64)
+
+    # the body can be one line without the newline
+    end = body.find("\n")
+    width = len((body if end < 0 else body[:end]).split()) if body.strip() else 2
+    with warnings.catch_warnings():
+        # numpy warns if the text has a non-numeric field, the size check below raises then
+        warnings.simplefilter("ignore", DeprecationWarning)
+        table = np.fromstring(body, dtype=np.float64, sep=" ")
+    if table.size % width:
+        raise ValueError("Number of fields in rows of .mom file isn't the same.")
+    table = table.reshape(-1, width)
+
+    data = {"time": np.ascontiguousarray(table[:, 0]), "value": np.ascontiguousarray(table[:, 1])}
+    if width > 2:
+        data["model"] = np.ascontiguousarray(table[:, 2])
+    return header, data
+
+
+def _path2mom(path_dir: str, station: str, component: str, file_name: str) -> str:
+    return os.path.join(path_dir, station, component.upper(), file_name.format(component=component.upper()))
+
+
+def _write_mom_worker(task: tuple) -> str:
+    path2file, time, values, offsets, decimals = task
+    write_mom(path2file, time, values, offsets=offsets, decimals=decimals)
+    return path2file
+
+
+def _read_mom_worker(path2file: str) -> tuple[dict, dict]:
+    return read_mom(path2file)
+
+
+@typechecked
+def export_mom(series: dict[str, dict[str, np.ndarray]],
+               path_dir: str,
+               components: tuple[str, ...] = ("e", "n", "u"),
+               offsets: dict[str, np.ndarray] | None = None,
+               file_name: str = "Hector_{component}.mom",
+               decimals: int = 6,
+               workers: int = 1) -> dict[str, dict[str, str]]:
+    """This function writes .mom files of all stations and components, e.g. the input of removeoutliers.
+    Files are written in parallel processes, one task is one file.
+
+    Args:
+        series (dict[str, dict[str, np.ndarray]]): Time series of stations in columnar mode,
+            e.g. from assemble_station_series and series2enu.
+        path_dir (str): Path to the directory. Files are saved as path_dir/{station}/{COMPONENT}/file_name.
+        components (tuple[str, ...], optional): Components to export. Defaults to ("e", "n", "u").
+        offsets (dict[str, np.ndarray] | None, optional): Epochs of offsets of stations, e.g. from detect_offsets.
+            Defaults to None.
+        file_name (str, optional): Name of files, {component} is replaced by the component in upper case.
+            Defaults to "Hector_{component}.mom".
+        decimals (int, optional): Decimals of values. Defaults to 6.
+        workers (int, optional): The number of parallel processes. Defaults to 1.
+
+    Raises:
+        ValueError: Number of workers must be positive.
+        ValueError: Component {component} is not found in time serie of station {station}.
+        ValueError: Values are too large for .mom file.
+
+    Returns:
+        dict[str, dict[str, str]]: Paths to files of every station and component.
+
+    Examples:
+        >>> paths = export_mom(enu_series, "/path/to/Hector_test", offsets=detect_offsets(enu_series), workers=8)
+        >>> paths["NSK1"]["u"]
+        '/path/to/Hector_test/NSK1/U/Hector_U.mom'
+    """
+    if workers <= 0:
+        raise ValueError("Number of workers must be positive.")
+    offsets = {} if offsets is None else offsets
+
+    keys = []
+    tasks = []
+    for station, data in series.items():
+        for component in ("time",) + components:
+            if component not in data:
+                raise ValueError(f"Component {component} is not found in time serie of station {station}.")
+        for component in components:
+            keys.append((station, component))
+            tasks.append((_path2mom(path_dir, station, component, file_name), data["time"], data[component],
+                          offsets.get(station), decimals))
+
+    if workers == 1:
+        paths = [_write_mom_worker(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            paths = list(executor.map(_write_mom_worker, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    output = {station: {} for station in series}
+    for (station, component), path in zip(keys, paths):
+        output[station][component] = path
+    return output
+
+
+@typechecked
+def import_mom(path_dir: str,
+               components: tuple[str, ...] = ("e", "n", "u"),
+               file_name: str = "Hector_{component}.mom",
+               workers: int = 1) -> tuple[dict[str, dict[str, np.ndarray]], dict[str, np.ndarray]]:
+    """This function reads .mom files of all stations from the directory with the layout of export_mom,
+    e.g. the output of removeoutliers or estimatetrend. Components of a station are joined by time:
+    epochs which are missing in a component (e.g. removed outliers) are NaN.
+    Files are read in parallel processes.
+
+    Args:
+        path_dir (str): Path to the directory with subdirectories of stations.
+        components (tuple[str, ...], optional): Components to import. Defaults to ("e", "n", "u").
+        file_name (str, optional): Name of files, {component} is replaced by the component in upper case,
+            e.g. "Hector_{component}_trend.mom". Defaults to "Hector_{component}.mom".
+        workers (int, optional): The number of parallel processes. Defaults to 1.
+
+    Raises:
+        ValueError: Number of workers must be positive.
+        ValueError: Number of fields in rows of .mom file isn't the same.
+
+    Returns:
+        tuple[dict[str, dict[str, np.ndarray]], dict[str, np.ndarray]]: First element of the tuple is time series of
+            stations with keys "time" (datetime64[ns]), components and "{component}_model" if files have the model.
+            Stations without any file are skipped. Second element is epochs of offsets (datetime64[ns])
+            from headers of files of every station.
+
+    Examples:
+        >>> series, offsets = import_mom("/path/to/Hector_test", file_name="Hector_{component}_outliers.mom")
+        >>> estimate_trend(series, offsets=offsets)
+    """
+    if workers <= 0:
+        raise ValueError("Number of workers must be positive.")
+
+    keys = []
+    paths = []
+    for station in sorted(os.listdir(path_dir)):
+        for component in components:
+            path2file = _path2mom(path_dir, station, component, file_name)
+            if os.path.isfile(path2file):
+                keys.append((station, component))
+                paths.append(path2file)
+
+    if workers == 1:
+        results = [_read_mom_worker(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_read_mom_worker, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+    files = {}
+    for (station, component), result in zip(keys, results):
+        files.setdefault(station, {})[component] = result
+
+    series = {}
+    offsets = {}
+    for station, station_files in files.items():
+        # MJD to milliseconds, so the same epochs of components are joined exactly
+        times = {component: np.rint(data["time"] * 86400e3).astype(np.int64)
+                 for component, (_, data) in station_files.items()}
+        time = np.unique(np.concatenate(list(times.values())))
+        series[station] = {"time": MJD_EPOCH + time * np.timedelta64(1, "ms")}
+        for component in components:
+            if component not in station_files:
+                continue
+            _, data = station_files[component]
+            index = np.searchsorted(time, times[component])
+            for key, name in (("value", component), ("model", f"{component}_model")):
+                if key in data:
+                    series[station][name] = np.full(len(time), np.nan)
+                    series[station][name][index] = data[key]
+
+        mjd_offsets = np.unique(np.concatenate([header["offsets"] for header, _ in station_files.values()]))
+        offsets[station] = MJD_EPOCH + np.rint(mjd_offsets * 86400e3).astype(np.int64) * np.timedelta64(1, "ms")
+    return series, offsets
@@ -25,6 +25,7 @@ from typeguard import typechecked
 from gps_time import GPSTime
 import moncenterlib.tools as mcl_tools
 import moncenterlib.gnss.tools as mcl_gnss_tools
+from moncenterlib.gnss.archive_index import ArchiveIndex
 import moncenterlib.tools as mcl_tools
 
 
@@ -448,10 +449,37 @@ class RtkLibPost:
             for key, val in config.items():
                 config_file.write(key + '=' + val + '\n')
 
+    def __match_files_from_index(self, input_rnx: dict[str, str], recursion: bool, index: ArchiveIndex,
+                                 match_list: defaultdict) -> None:
+        self.logger.info("Finding files in the index")
+        for type_file, dir in input_rnx.items():
+            if type_file == "otl" or type_file == "satant" or type_file == "rcvant":
+                continue
+
+            file_type = "obs" if type_file == "rover" or type_file == "base" else type_file
+            for row in index.files(dir, file_type, recursion):
+                if row["start"] is None:
+                    self.logger.error("Can't get date from %s file %s", type_file, row["path"])
+                    continue
+
+                if type_file == "erp":
+                    # erp file is used for every day of its records
+                    days = (row["end"].date() - row["start"].date()).days
+                    dates = [(row["start"] + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+                else:
+                    dates = [row["start"].strftime("%Y-%m-%d")]
+
+                for date in dates:
+                    if type_file == "rover":
+                        match_list[date].setdefault("rovers", []).append(row["path"])
+                    else:
+                        match_list[date][type_file] = row["path"]
+
     @typechecked
     def match_files(self,
                     input_rnx: dict[str, str],
-                    recursion: bool = True) -> tuple[dict, dict]:
+                    recursion: bool = True,
+                    index: ArchiveIndex | None = None) -> tuple[dict, dict]:
         """This method allows you to automatically match the input files. The input is provided with data types and
             paths to the directory where these files are stored.
             Each file is scanned and the measurement start date is read.
@@ -462,6 +490,9 @@ class RtkLibPost:
             input_rnx (dict[str, str]): The dictionary where keys are a type of file and values are
                 a path to the directory where files are stored.
             recursion (bool, optional): Recursively search for files. Defaults to True.
+            index (ArchiveIndex | None, optional): The index of the archive (see ArchiveIndex.refresh).
+                If it's passed, files and dates are taken from the index and files aren't opened.
+                Defaults to None.
 
         Raises:
             ValueError: Does not support a type of file
@@ -495,14 +526,17 @@ class RtkLibPost:
                 self.logger.error("Invalid file path: %s", path_file)
                 raise ValueError(f"Invalid file path: {path_file}")
 
+        match_list = defaultdict(dict)
         input_files = defaultdict(list)
-        for type_file, dir in input_rnx.items():
-            if type_file == "otl" or type_file == "satant" or type_file == "rcvant":
-                continue
-            input_files[type_file] = mcl_tools.get_files_from_dir(dir, recursion)
+        if index is not None:
+            self.__match_files_from_index(input_rnx, recursion, index, match_list)
+        else:
+            for type_file, dir in input_rnx.items():
+                if type_file == "otl" or type_file == "satant" or type_file == "rcvant":
+                    continue
+                input_files[type_file] = mcl_tools.get_files_from_dir(dir, recursion)
 
         self.logger.info("Starting match files")
-        match_list = defaultdict(dict)
         for file in input_files.get('rover', []):
             try:
                 date = mcl_gnss_tools.get_start_date_from_obs(file)
@@ -17,6 +17,7 @@ from collections import defaultdict
 from typeguard import typechecked
 import moncenterlib.tools as mcl_tools
 import moncenterlib.gnss.tools as mcl_gnss_tools
+from moncenterlib.gnss.archive_index import ArchiveIndex
 from pathlib import Path
 
 
@@ -47,15 +48,20 @@ class Anubis:
             self.logger = mcl_tools.create_simple_logger("Anubis", logger)
 
     @typechecked
-    def scan_dirs(self, input_dir_obs: str, input_dir_nav: str, recursion: bool = False) -> tuple[dict[str, list[list[str]]], dict[str, list[str]]]:
+    def scan_dirs(self, input_dir_obs: str, input_dir_nav: str, recursion: bool = False,
+                  index: ArchiveIndex | None = None) -> tuple[dict[str, list[list[str]]], dict[str, list[str]]]:
         """
         This method scans the directory and makes a match list of files for further work of the class.
-        The method can also recursively search for files.
+        The method can also recursively search for files. Files without the date (e.g. observation files
+        without TIME OF FIRST OBS) are logged and skipped.
 
         Args:
             input_dir_obs (str): Path to the observation directory.
             input_dir_nav (str): Path to the navigation directory.
             recursion (bool, optional): Recursively search for files. Defaults to False.
+            index (ArchiveIndex | None, optional): The index of the archive (see ArchiveIndex.refresh).
+                If it's passed, files, dates and marker names are taken from the index and files aren't opened.
+                Defaults to None.
 
         Raises:
             ValueError: Please, remove spaces in path.
@@ -80,13 +86,36 @@ class Anubis:
             self.logger.error("Please, remove spaces in path.")
             raise ValueError("Please, remove spaces in path.")
 
+        if index is not None:
+            self.logger.info("Finding files in the index.")
+            filter_files_nav = {row["start"].strftime("%Y-%m-%d"): row["path"]
+                                for row in index.files(input_dir_nav, "nav", recursion) if row["start"] is not None}
+            info_obs = []
+            for row in index.files(input_dir_obs, "obs", recursion):
+                if row["start"] is None:
+                    self.logger.error("Can't get date from obs file %s", row["path"])
+                    continue
+                info_obs.append((row["path"], row["start"].strftime("%Y-%m-%d"), row["marker"]))
+        else:
+            filter_files_nav, info_obs = self._read_dirs(input_dir_obs, input_dir_nav, recursion)
+
+        self.logger.info("Start matching files.")
+        for file_obs, date_obs, marker_name in info_obs:
+            if date_obs in filter_files_nav:
+                match_list[marker_name].append([file_obs, filter_files_nav[date_obs]])
+            else:
+                no_match_list[marker_name] += [file_obs]
+
+        return dict(match_list), dict(no_match_list)
+
+    def _read_dirs(self, input_dir_obs: str, input_dir_nav: str,
+                   recursion: bool) -> tuple[dict[str, str], list[tuple[str, str, str]]]:
         self.logger.info("Finding files obs.")
         files_obs = mcl_tools.get_files_from_dir(input_dir_obs, recursion)
 
         self.logger.info("Finding files nav.")
         files_nav = mcl_tools.get_files_from_dir(input_dir_nav, recursion)
 
-        self.logger.info("Start matching files.")
         filter_files_nav = dict()
         for file_nav in files_nav:
             try:
@@ -95,31 +124,25 @@ class Anubis:
                 self.logger.error("Can't get date from nav file %s", file_nav)
                 self.logger.error(e)
                 continue
+            if date_nav == "":
+                self.logger.error("Can't get date from nav file %s", file_nav)
+                continue
             filter_files_nav[date_nav] = file_nav
 
+        info_obs = []
         for file_obs in files_obs:
-            date_obs = ''
-            marker_name = ''
             try:
-                date_obs = mcl_gnss_tools.get_start_date_from_obs(file_obs)
+                header = mcl_gnss_tools.read_rinex_header(file_obs)
+                date_obs = mcl_gnss_tools.get_start_date(header)
             except Exception as e:
-                self.logger.error("Can't get date from obs file %s", date_obs)
+                self.logger.error("Can't get date and marker name from obs file %s", file_obs)
                 self.logger.error(e)
                 continue
-
-            try:
-                marker_name = mcl_gnss_tools.get_marker_name(file_obs)
-            except Exception as e:
-                self.logger.error("Can't get marker name from obs file %s", date_obs)
-                self.logger.error(e)
+            if date_obs == "":
+                self.logger.error("Can't get date from obs file %s", file_obs)
                 continue
-
-            if date_obs in filter_files_nav:
-                match_list[marker_name].append([file_obs, filter_files_nav[date_obs]])
-            else:
-                no_match_list[marker_name] += [file_obs]
-
-        return dict(match_list), dict(no_match_list)
+            info_obs.append((file_obs, date_obs, mcl_gnss_tools.get_marker(header, file_obs)))
+        return filter_files_nav, info_obs
 
     @typechecked
     def start(self, input_data: dict | tuple,
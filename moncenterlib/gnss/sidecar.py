@@ -0,0 +1,118 @@
+"""
+This module is designed for sidecar caches of files, e.g. columns of .pos file or pyramids of its time serie.
+- arrays derived from the file are kept as .npy files in the directory next to the file;
+- the cache is valid while the version of the format, options and the size and modification time of the file match;
+- arrays are loaded as read-only memory maps.
+
+Layout of the sidecar directory:
+    path_sidecar/meta.json (the stamp of the file and metadata of the cache)
+    path_sidecar/<name>.npy
+
+meta.json is removed before arrays are written and it's written last through the temporary file,
+so an interrupted write is never taken as a valid cache. Caches are optional: errors of reading and writing
+(e.g. the directory of the file is read-only) aren't raised, the cache is just missing then.
+"""
+
+
+import json
+import os
+import numpy as np
+from typeguard import typechecked
+
+
+@typechecked
+def make_stamp(stat: os.stat_result, version: int, **options) -> dict:
+    """Make the stamp of the file which the cache is derived from.
+
+    Args:
+        stat (os.stat_result): Result of os.stat of the file. It's taken before the file is read.
+        version (int): Version of the format of the cache.
+        **options: Options of reading the file which change arrays, e.g. sep=";". Values must be JSON types.
+
+    Returns:
+        dict: The stamp. It's the part of the meta of the cache.
+
+    Examples:
+        >>> stamp = make_stamp(os.stat("/path/to/file.pos"), 2, sep=None)
+        >>> stamp
+        {'version': 2, 'size': 123456, 'mtime_ns': 1641013200000000000, 'sep': None}
+    """
+    return {"version": version, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, **options}
+
+
+@typechecked
+def read_sidecar_meta(path_sidecar: str, stamp: dict) -> dict | None:
+    """Read the meta of the sidecar directory.
+
+    Args:
+        path_sidecar (str): Path to the sidecar directory.
+        stamp (dict): The stamp of the file, see make_stamp.
+
+    Returns:
+        dict | None: The meta. None if the cache doesn't exist, is broken or is out of date.
+
+    Examples:
+        >>> meta = read_sidecar_meta("/path/to/file.pos.cache", stamp)
+    """
+    try:
+        with open(os.path.join(path_sidecar, "meta.json"), 'r', encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(meta, dict) or any(meta.get(key) != value for key, value in stamp.items()):
+        return None
+    return meta
+
+
+@typechecked
+def load_sidecar_arrays(path_sidecar: str, names: list[str]) -> dict[str, np.ndarray] | None:
+    """Load arrays of the sidecar directory as read-only memory maps.
+
+    Args:
+        path_sidecar (str): Path to the sidecar directory.
+        names (list[str]): Names of arrays without ".npy".
+
+    Returns:
+        dict[str, np.ndarray] | None: Arrays by names. None if any array is missing or broken.
+
+    Examples:
+        >>> arrays = load_sidecar_arrays("/path/to/file.pos.cache", ["0", "1"])
+    """
+    try:
+        return {name: np.load(os.path.join(path_sidecar, f"{name}.npy"), mmap_mode="r") for name in names}
+    except (OSError, ValueError):
+        return None
+
+
+@typechecked
+def write_sidecar(path_sidecar: str, meta: dict, arrays: dict[str, np.ndarray]) -> bool:
+    """Write arrays and the meta to the sidecar directory. Arrays of other names in the directory are kept,
+    so the meta can describe arrays of several writes.
+
+    Args:
+        path_sidecar (str): Path to the sidecar directory. It's created if it doesn't exist.
+        meta (dict): The meta with the stamp of the file (see make_stamp). Values must be JSON types.
+        arrays (dict[str, np.ndarray]): Arrays by names without ".npy".
+
+    Returns:
+        bool: False if the cache isn't written, e.g. the directory is read-only.
+
+    Examples:
+        >>> write_sidecar("/path/to/file.pos.cache", {**stamp, "columns": ["time"]}, {"0": data["time"]})
+        True
+    """
+    path_meta = os.path.join(path_sidecar, "meta.json")
+    try:
+        os.makedirs(path_sidecar, exist_ok=True)
+        if os.path.exists(path_meta):
+            os.remove(path_meta)
+
+        for name, value in arrays.items():
+            np.save(os.path.join(path_sidecar, f"{name}.npy"), value)
+
+        with open(path_meta + ".tmp", 'w', encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(path_meta + ".tmp", path_meta)
+    except OSError:
+        return False
+    return True
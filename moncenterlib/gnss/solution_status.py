@@ -0,0 +1,234 @@
+"""
+This module is designed for parsing of solution status files of RTKLib (.pos.stat, out-outstat of RtkLibPost).
+- Streaming parser by chunks of lines, files of any size can be processed;
+- Records $POS, $VELACC, $CLK, $ION, $TROP, $HWBIAS and $SAT are converted into typed arrays;
+- Filters by record type, time and satellites are applied while the file is read.
+
+Lines of every record type are converted to one table by one NumPy call, satellite IDs (e.g. G01) are
+decoded without a loop over lines. Angles, SNR, residuals and atmosphere are float32, flags are int32.
+"""
+
+
+from collections.abc import Iterator
+from datetime import datetime
+from itertools import islice
+import warnings
+import numpy as np
+from typeguard import typechecked
+from moncenterlib.gnss.gnss_time_series import gps_week2gpst
+
+
+# Fields of records after "$NAME,week,tow" as RTKLib 2.4.3 writes them
+_STAT_RECORDS = {
+    "POS": ("stat", "x", "y", "z", "xf", "yf", "zf"),
+    "VELACC": ("stat", "ve", "vn", "vu", "ae", "an", "au", "vef", "vnf", "vuf", "aef", "anf", "auf"),
+    "CLK": ("stat", "rcv", "clk1", "clk2", "clk3", "clk4"),
+    "ION": ("stat", "sat", "az", "el", "ion", "ionf"),
+    "TROP": ("stat", "rcv", "ztd", "ztdf"),
+    "HWBIAS": ("stat", "frq", "bias", "biasf"),
+    "SAT": ("sat", "frq", "az", "el", "resp", "resc", "vsat", "snr", "fix", "slip", "lock", "outc", "slipc", "rejc")
+}
+_INT_FIELDS = ("stat", "rcv", "frq", "vsat", "fix", "slip", "lock", "outc", "slipc", "rejc")
+_FLOAT32_FIELDS = ("az", "el", "snr", "resp", "resc", "ion", "ionf", "ztd", "ztdf")
+# System letters of satellite IDs, the ID is converted to the number system * 100 + PRN.
+# RTKLib writes SBAS satellites as bare PRNs 120-158, they are converted to S20-S58.
+_SYSTEMS = "GRECJSI"
+_SBAS_CODE = (_SYSTEMS.index("S") + 1) * 100 - 100
+
+
+def _sat2code(satellites: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Satellite IDs and letters of systems of the filter into numbers and numbers of systems."""
+    codes = []
+    systems = []
+    for sat in satellites:
+        if len(sat) == 1:
+            systems.append(_SYSTEMS.index(sat) + 1)
+        else:
+            codes.append((_SYSTEMS.index(sat[0]) + 1) * 100 + int(sat[1:]))
+    return np.array(codes, dtype=np.int64), np.array(systems, dtype=np.int64)
+
+
+def _code2sat(codes: np.ndarray) -> np.ndarray:
+    """Numbers of satellites into IDs. Only unique numbers are formatted."""
+    unique, inverse = np.unique(codes, return_inverse=True)
+    names = np.array([f"{_SYSTEMS[code // 100 - 1]}{code % 100:02d}" if code >= 100 else str(code) for code in unique],
+                     dtype="<U3")
+    return names[inverse]
+
+
+class _StatFilter:
+    """Filters of epochs and satellites of .stat file."""
+
+    def __init__(self, records: list[str] | None, satellites: list[str] | None,
+                 start: datetime | np.datetime64 | None, end: datetime | np.datetime64 | None) -> None:
+        self.records = None if records is None else set(records)
+        self.start = None if start is None else np.datetime64(start, "ns")
+        self.end = None if end is None else np.datetime64(end, "ns")
+        self.sat_codes, self.sat_systems = (None, None) if satellites is None else _sat2code(satellites)
+
+    def mask(self, time: np.ndarray, codes: np.ndarray | None) -> np.ndarray:
+        mask = np.ones(len(time), dtype=bool)
+        if self.start is not None:
+            mask &= time >= self.start
+        if self.end is not None:
+            mask &= time < self.end
+        if codes is not None and self.sat_codes is not None:
+            mask &= np.isin(codes, self.sat_codes) | np.isin(codes // 100, self.sat_systems)
+        return mask
+
+
+def _convert_records(record: str, lines: list[str], filters: _StatFilter) -> dict[str, np.ndarray]:
+    """Convert lines of one record type into columns. All lines are converted to one float table."""
+    names = _STAT_RECORDS[record]
+    text = "".join(lines).replace(f"${record},", "")
+    if "sat" in names:
+        # IDs with a letter become negative numbers, so they aren't mixed up with bare SBAS PRNs
+        for i, system in enumerate(_SYSTEMS):
+            text = text.replace(f",{system}", f",-{i + 1}")
+    text = text.replace(",", " ")
+
+    width = len(lines[0].split(",")) - 1
+    with warnings.catch_warnings():
+        # numpy warns if the text has a non-numeric field, the size check below raises then
+        warnings.simplefilter("ignore", DeprecationWarning)
+        table = np.fromstring(text, dtype=np.float64, sep=" ")
+    if width < len(names) + 2 or table.size != len(lines) * width:
+        raise ValueError(f"Number of fields of ${record} records doesn't match.")
+    table = table.reshape(len(lines), width)
+
+    time = gps_week2gpst(table[:, 0], table[:, 1])
+    codes = None
+    if "sat" in names:
+        codes = table[:, 2 + names.index("sat")].astype(np.int64)
+        codes = np.where(codes < 0, -codes, codes + _SBAS_CODE)
+    mask = filters.mask(time, codes)
+    table = table[mask]
+
+    columns = {"time": time[mask]}
+    for i, name in enumerate(names):
+        if name == "sat":
+            columns[name] = _code2sat(codes[mask])
+        elif name in _INT_FIELDS:
+            columns[name] = table[:, 2 + i].astype(np.int32)
+        elif name in _FLOAT32_FIELDS:
+            columns[name] = table[:, 2 + i].astype(np.float32)
+        else:
+            columns[name] = np.ascontiguousarray(table[:, 2 + i])
+    # fields of newer versions of RTKLib
+    for i in range(len(names) + 2, width):
+        columns[f"field{i - 2}"] = np.ascontiguousarray(table[:, i])
+    return columns
+
+
+@typechecked
+def iter_stat_file(path2file: str,
+                   chunk_size: int = 1 << 18,
+                   records: list[str] | None = None,
+                   satellites: list[str] | None = None,
+                   start: datetime | np.datetime64 | None = None,
+                   end: datetime | np.datetime64 | None = None) -> Iterator[dict[str, dict[str, np.ndarray]]]:
+    """This generator parses solution status file of RTKLib (out-outstat=state or residual) by chunks of lines.
+    Only one chunk is kept in memory. Lines of record types which aren't requested aren't converted
+    and reading stops after the end of the time window.
+
+    Args:
+        path2file (str): Path to the file .stat (e.g. file.pos.stat).
+        chunk_size (int, optional): Max number of lines in one chunk. Defaults to 262144.
+        records (list[str] | None, optional): Record types without "$", e.g. ["SAT", "TROP"]. Defaults to None (all).
+        satellites (list[str] | None, optional): Keep only these satellites (e.g. "G01") or systems (e.g. "R")
+            in records with satellites ($SAT and $ION). Defaults to None.
+        start (datetime | np.datetime64 | None, optional): Keep only epochs with time >= start (GPST). Defaults to None.
+        end (datetime | np.datetime64 | None, optional): Keep only epochs with time < end (GPST). Defaults to None.
+
+    Raises:
+        ValueError: Chunk size must be positive.
+        ValueError: Unknown record type {record}.
+        ValueError: Unknown satellite {satellite}.
+        ValueError: Number of fields of ${record} records doesn't match.
+
+    Yields:
+        dict[str, dict[str, np.ndarray]]: Records of the chunk, see parse_stat_file.
+
+    Examples:
+        >>> for chunk in iter_stat_file("/path/to/file.pos.stat", records=["SAT"], satellites=["G"]):
+        ...     print(chunk["SAT"]["resp"].std())
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive.")
+    for record in records or []:
+        if record not in _STAT_RECORDS:
+            raise ValueError(f"Unknown record type {record}.")
+    for sat in satellites or []:
+        if not sat or sat[0] not in _SYSTEMS or not (len(sat) == 1 or sat[1:].isdigit()):
+            raise ValueError(f"Unknown satellite {sat}.")
+    filters = _StatFilter(records, satellites, start, end)
+
+    with open(path2file, 'r', encoding="utf-8") as f:
+        while True:
+            lines = list(islice(f, chunk_size))
+            if not lines:
+                return
+
+            groups = {}
+            for line in lines:
+                record = line[1:line.find(",")]
+                if record in _STAT_RECORDS and (filters.records is None or record in filters.records):
+                    groups.setdefault(record, []).append(line)
+
+            chunk = {record: _convert_records(record, group, filters) for record, group in groups.items()}
+            if any(len(columns["time"]) for columns in chunk.values()):
+                yield chunk
+
+            # lines are sorted by time, the first field of the last line is the week and the second is tow
+            if filters.end is not None:
+                last = lines[-1].split(",")
+                if len(last) > 2 and gps_week2gpst(np.array([float(last[1])]), np.array([float(last[2])]))[0] >= filters.end:
+                    return
+
+
+@typechecked
+def parse_stat_file(path2file: str,
+                    records: list[str] | None = None,
+                    satellites: list[str] | None = None,
+                    start: datetime | np.datetime64 | None = None,
+                    end: datetime | np.datetime64 | None = None) -> dict[str, dict[str, np.ndarray]]:
+    """This function parses solution status file of RTKLib (out-outstat=state or residual).
+    The file is read by chunks (see iter_stat_file), so the memory holds only the filtered records.
+
+    Args:
+        path2file (str): Path to the file .stat (e.g. file.pos.stat).
+        records (list[str] | None, optional): Record types without "$", e.g. ["SAT", "TROP"]. Defaults to None (all).
+        satellites (list[str] | None, optional): Keep only these satellites (e.g. "G01") or systems (e.g. "R")
+            in records with satellites ($SAT and $ION). Defaults to None.
+        start (datetime | np.datetime64 | None, optional): Keep only epochs with time >= start (GPST). Defaults to None.
+        end (datetime | np.datetime64 | None, optional): Keep only epochs with time < end (GPST). Defaults to None.
+
+    Raises:
+        ValueError: Unknown record type {record}.
+        ValueError: Unknown satellite {satellite}.
+        ValueError: Number of fields of ${record} records doesn't match.
+
+    Returns:
+        dict[str, dict[str, np.ndarray]]: Key is the record type without "$" (e.g. "SAT"), value is columns.
+            Every record has "time" (datetime64[ns] of GPST) and fields of RTKLib:
+            "POS": stat, x, y, z (float), xf, yf, zf (fixed);
+            "VELACC": stat, ve, vn, vu, ae, an, au and fixed vef ... auf;
+            "CLK": stat, rcv, clk1 ... clk4 (ns);
+            "ION": stat, sat, az, el, ion, ionf;
+            "TROP": stat, rcv, ztd, ztdf;
+            "HWBIAS": stat, frq, bias, biasf;
+            "SAT": sat (e.g. "G01", SBAS PRN 120 is "S20"), frq, az, el, resp, resc, vsat, snr, fix, slip, lock, outc, slipc, rejc.
+            Records which aren't in the file are missing.
+
+    Examples:
+        >>> stat = parse_stat_file("/path/to/file.pos.stat", records=["SAT"], satellites=["G05"])
+        >>> stat["SAT"]["resc"][stat["SAT"]["el"] > 15]
+        array([ 0.0012, -0.0031, ...], dtype=float32)
+    """
+    chunks = {}
+    for chunk in iter_stat_file(path2file, records=records, satellites=satellites, start=start, end=end):
+        for record, columns in chunk.items():
+            chunks.setdefault(record, []).append(columns)
+
+    return {record: {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+            for record, parts in chunks.items()}
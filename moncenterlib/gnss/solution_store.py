@@ -0,0 +1,312 @@
+"""
+This module is designed for storage of processed GNSS solutions.
+- station-partitioned columnar store with per-year chunks and a small JSON manifest;
+- idempotent ingest of parse_pos_file output, re-processed days replace all old rows of these days;
+- fast reads of the time window through memory maps, without any text files.
+
+Layout of the store:
+    path_store/manifest.json
+    path_store/NSK1/2022.0/0.bin, 1.bin, ... (raw column arrays, one file per column)
+
+The manifest is the only source of truth: it keeps columns, dtypes and the number of epochs of every chunk.
+New days after the end of the chunk are appended to the files, other changes write the new generation
+of the chunk (2022.1, 2022.2, ...). The manifest is replaced atomically at the end of the ingest, so an interrupted
+ingest never damages the store. Only one process must write to the store at a time.
+"""
+
+
+from datetime import datetime
+import json
+import os
+import shutil
+import numpy as np
+from typeguard import typechecked
+from moncenterlib.gnss.gnss_time_series import parse_pos_file
+
+
+# Version of the store format
+_STORE_VERSION = 1
+
+
+def _year(time: np.ndarray) -> np.ndarray:
+    return time.astype("datetime64[Y]").astype(np.int64) + 1970
+
+
+class SolutionStore:
+    """
+    This class is an append-only store of time series of stations in columnar mode (see parse_pos_file).
+    Every station has its own columns, they are fixed by the first ingest of the station.
+    """
+    @typechecked
+    def __init__(self, path_store: str) -> None:
+        """
+        Args:
+            path_store (str): Path to the directory of the store. It's created if it doesn't exist.
+
+        Raises:
+            ValueError: Version of the store isn't supported.
+        """
+        self.path_store = path_store
+        os.makedirs(path_store, exist_ok=True)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Reload the manifest, e.g. after the ingest by another process."""
+        path_manifest = os.path.join(self.path_store, "manifest.json")
+        if os.path.exists(path_manifest):
+            with open(path_manifest, 'r', encoding="utf-8") as f:
+                self.__manifest = json.load(f)
+            if self.__manifest["version"] != _STORE_VERSION:
+                raise ValueError("Version of the store isn't supported.")
+        else:
+            self.__manifest = {"version": _STORE_VERSION, "stations": {}}
+
+    @property
+    def stations(self) -> list[str]:
+        """Names of stations in the store."""
+        return sorted(self.__manifest["stations"])
+
+    @typechecked
+    def span(self, station: str) -> tuple[np.datetime64, np.datetime64, int]:
+        """Time of the first and the last epochs and the number of epochs of the station.
+
+        Args:
+            station (str): Name of station.
+
+        Raises:
+            ValueError: Station {station} is not found in the store.
+
+        Returns:
+            tuple[np.datetime64, np.datetime64, int]: Start, end (GPST) and the number of epochs.
+        """
+        chunks = self.__station(station)["chunks"]
+        years = sorted(chunks, key=int)
+        return (np.datetime64(chunks[years[0]]["start"], "ns"), np.datetime64(chunks[years[-1]]["end"], "ns"),
+                sum(chunk["epochs"] for chunk in chunks.values()))
+
+    def __station(self, station: str) -> dict:
+        if station not in self.__manifest["stations"]:
+            raise ValueError(f"Station {station} is not found in the store.")
+        return self.__manifest["stations"][station]
+
+    def __path_chunk(self, station: str, year: str, generation: int) -> str:
+        return os.path.join(self.path_store, station, f"{year}.{generation}")
+
+    def __open_chunk(self, station: str, year: str, columns: list[str]) -> dict[str, np.ndarray]:
+        """Columns of the chunk as read-only memory maps."""
+        meta = self.__station(station)
+        chunk = meta["chunks"][year]
+        path_chunk = self.__path_chunk(station, year, chunk["generation"])
+        data = {}
+        for column in columns:
+            i = meta["columns"].index(column)
+            dtype = np.dtype(meta["dtypes"][i])
+            if chunk["epochs"] == 0:
+                data[column] = np.zeros(0, dtype=dtype)
+            else:
+                data[column] = np.memmap(os.path.join(path_chunk, f"{i}.bin"), dtype=dtype, mode="r",
+                                         shape=(chunk["epochs"],))
+        return data
+
+    def __write_chunk(self, path_chunk: str, data: dict[str, np.ndarray], epochs: int) -> None:
+        """Append data to the chunk. Bytes after the epochs of the manifest are left by an interrupted ingest,
+        they are cut before."""
+        os.makedirs(path_chunk, exist_ok=True)
+        for i, value in enumerate(data.values()):
+            path_column = os.path.join(path_chunk, f"{i}.bin")
+            with open(path_column, 'r+b' if os.path.exists(path_column) else 'wb') as f:
+                f.truncate(epochs * value.dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(value).tobytes())
+
+    def __save_manifest(self) -> None:
+        path_manifest = os.path.join(self.path_store, "manifest.json")
+        with open(path_manifest + ".tmp", 'w', encoding="utf-8") as f:
+            json.dump(self.__manifest, f, indent=1)
+        os.replace(path_manifest + ".tmp", path_manifest)
+
+    @typechecked
+    def ingest(self, station: str, data: dict[str, np.ndarray]) -> int:
+        """Add the time serie of the station to the store. All epochs of the store in the days (GPST) which
+        have epochs of data are replaced by data, so the ingest of the same or re-processed day is idempotent
+        even if the new solution covers the day shorter. Epochs of the days after the end of the chunk
+        are appended without rewriting it.
+
+        Args:
+            station (str): Name of station, e.g. "NSK1".
+            data (dict[str, np.ndarray]): Time serie in columnar mode (see parse_pos_file).
+
+        Raises:
+            ValueError: Time serie has no key "time".
+            ValueError: Columns of data don't match columns of station {station}.
+
+        Returns:
+            int: Number of epochs of data which are written to the store.
+
+        Examples:
+            >>> store = SolutionStore("/path/to/store")
+            >>> header, data = parse_pos_file("/path/to/nsk10010.22o.pos", columnar=True)
+            >>> store.ingest("NSK1", data)
+            2880
+        """
+        if "time" not in data:
+            raise ValueError("Time serie has no key \"time\".")
+        data = {key: np.asarray(value) for key, value in data.items()}
+        data["time"] = data["time"].astype("datetime64[ns]")
+
+        stations = self.__manifest["stations"]
+        if station not in stations:
+            stations[station] = {"columns": list(data), "dtypes": [value.dtype.str for value in data.values()],
+                                 "chunks": {}}
+        meta = stations[station]
+        if list(data) != meta["columns"]:
+            raise ValueError(f"Columns of data don't match columns of station {station}.")
+        data = {key: value.astype(dtype) for (key, value), dtype in zip(data.items(), meta["dtypes"])}
+
+        # sort by time, the last of duplicated epochs is kept
+        order = np.argsort(data["time"], kind="stable")
+        time = data["time"][order]
+        keep = np.r_[time[1:] != time[:-1], True]
+        data = {key: value[order][keep] for key, value in data.items()}
+        if len(data["time"]) == 0:
+            return 0
+
+        old_paths = []
+        years = _year(data["time"])
+        bounds = np.flatnonzero(np.r_[True, years[1:] != years[:-1], True])
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            year = str(years[lo])
+            part = {key: value[lo:hi] for key, value in data.items()}
+            chunk = meta["chunks"].get(year)
+
+            days = np.unique(part["time"].astype("datetime64[D]"))
+            if chunk is not None and np.datetime64(chunk["end"], "D") < days[0]:
+                self.__write_chunk(self.__path_chunk(station, year, chunk["generation"]), part, chunk["epochs"])
+                chunk["epochs"] += int(hi - lo)
+                chunk["end"] = str(part["time"][-1])
+                continue
+
+            generation = 0
+            if chunk is not None:
+                # the chunk is rewritten: old epochs of the days without data plus data
+                old = {key: np.array(value) for key, value in self.__open_chunk(station, year, meta["columns"]).items()}
+                outside = ~np.isin(old["time"].astype("datetime64[D]"), days)
+                merged = {key: np.concatenate([old[key][outside], part[key]]) for key in part}
+                order = np.argsort(merged["time"], kind="stable")
+                part = {key: value[order] for key, value in merged.items()}
+                generation = chunk["generation"] + 1
+                old_paths.append(self.__path_chunk(station, year, chunk["generation"]))
+
+            path_chunk = self.__path_chunk(station, year, generation)
+            shutil.rmtree(path_chunk, ignore_errors=True)
+            self.__write_chunk(path_chunk, part, 0)
+            meta["chunks"][year] = {"generation": generation, "epochs": len(part["time"]),
+                                    "start": str(part["time"][0]), "end": str(part["time"][-1])}
+
+        self.__save_manifest()
+        for path in old_paths:
+            shutil.rmtree(path, ignore_errors=True)
+        return len(data["time"])
+
+    @typechecked
+    def ingest_pos_file(self, path2file: str, station: str | None = None, sep: str | None = None) -> int:
+        """Parse .pos file (see parse_pos_file) and add it to the store.
+
+        Args:
+            path2file (str): Path to the file .pos
+            station (str | None, optional): Name of station. If None, the first 4 letters of the file name
+                in upper case are used (as in RINEX file names). Defaults to None.
+            sep (str | None, optional): If .pos file has separation (e.g. ;) use sep=";". Defaults to None.
+
+        Raises:
+            ValueError: Columns of data don't match columns of station {station}.
+
+        Returns:
+            int: Number of epochs which are written to the store.
+
+        Examples:
+            >>> for path in mcl_tools.get_files_from_dir("/path/to/dir_pos", True):
+            ...     store.ingest_pos_file(path)
+        """
+        if station is None:
+            station = os.path.basename(path2file)[:4].upper()
+        _, data = parse_pos_file(path2file, sep=sep, columnar=True)
+        return self.ingest(station, data)
+
+    @typechecked
+    def read(self,
+             station: str,
+             start: datetime | np.datetime64 | None = None,
+             end: datetime | np.datetime64 | None = None,
+             columns: list[str] | None = None) -> dict[str, np.ndarray]:
+        """Read epochs of the station in the time window start <= time < end (GPST).
+        Only chunks of the years in the window are opened. If the window is inside one chunk,
+        the columns are read-only memory maps of the store, so nothing is read until it's used.
+
+        Args:
+            station (str): Name of station.
+            start (datetime | np.datetime64 | None, optional): Start of the window. Defaults to None.
+            end (datetime | np.datetime64 | None, optional): End of the window. Defaults to None.
+            columns (list[str] | None, optional): Columns to read, "time" is always read. Defaults to None (all).
+
+        Raises:
+            ValueError: Station {station} is not found in the store.
+            ValueError: Column {column} is not found in the store.
+
+        Returns:
+            dict[str, np.ndarray]: Time serie in columnar mode (see parse_pos_file).
+
+        Examples:
+            >>> data = store.read("NSK1", datetime(2022, 1, 1), datetime(2023, 1, 1), columns=["height", "Q"])
+        """
+        meta = self.__station(station)
+        columns = meta["columns"] if columns is None else ["time"] + [c for c in columns if c != "time"]
+        for column in columns:
+            if column not in meta["columns"]:
+                raise ValueError(f"Column {column} is not found in the store.")
+        start = None if start is None else np.datetime64(start, "ns")
+        end = None if end is None else np.datetime64(end, "ns")
+
+        parts = []
+        for year in sorted(meta["chunks"], key=int):
+            chunk = meta["chunks"][year]
+            if ((start is not None and np.datetime64(chunk["end"], "ns") < start) or
+                    (end is not None and np.datetime64(chunk["start"], "ns") >= end)):
+                continue
+            data = self.__open_chunk(station, year, columns)
+            lo = 0 if start is None else np.searchsorted(data["time"], start, side="left")
+            hi = len(data["time"]) if end is None else np.searchsorted(data["time"], end, side="left")
+            parts.append({key: value[lo:hi] for key, value in data.items()})
+
+        if len(parts) == 1:
+            return parts[0]
+        dtypes = dict(zip(meta["columns"], meta["dtypes"]))
+        return {key: np.concatenate([part[key] for part in parts]) if parts else np.zeros(0, dtype=dtypes[key])
+                for key in columns}
+
+    @typechecked
+    def read_stations(self,
+                      stations: list[str] | None = None,
+                      start: datetime | np.datetime64 | None = None,
+                      end: datetime | np.datetime64 | None = None,
+                      columns: list[str] | None = None) -> dict[str, dict[str, np.ndarray]]:
+        """Read epochs of many stations in the time window, see read.
+
+        Args:
+            stations (list[str] | None, optional): Names of stations. Defaults to None (all).
+            start (datetime | np.datetime64 | None, optional): Start of the window. Defaults to None.
+            end (datetime | np.datetime64 | None, optional): End of the window. Defaults to None.
+            columns (list[str] | None, optional): Columns to read. Defaults to None (all).
+
+        Raises:
+            ValueError: Station {station} is not found in the store.
+            ValueError: Column {column} is not found in the store.
+
+        Returns:
+            dict[str, dict[str, np.ndarray]]: Time series of stations, e.g. input of remove_outliers.
+
+        Examples:
+            >>> series = store.read_stations(start=datetime(2015, 1, 1), columns=["e", "n", "u"])
+        """
+        stations = self.stations if stations is None else stations
+        return {station: self.read(station, start, end, columns) for station in stations}
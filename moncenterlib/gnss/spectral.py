@@ -0,0 +1,220 @@
+"""
+This module is designed for spectral analysis of GNSS coordinate time series.
+- Lomb-Scargle periodogram for series with gaps and uneven sampling;
+- FFT periodogram for evenly spaced series without gaps (e.g. after aggregate_pos_series).
+
+Both return the one-sided power spectral density in unit^2 / cpy against frequency in cycles per year (cpy),
+so the annual signal is at 1 cpy and spectra of both methods are comparable.
+Many stations and components are processed in one call, the work is vectorized over frequencies.
+"""
+
+
+import numpy as np
+from typeguard import typechecked
+from moncenterlib.gnss.time_series_analysis import time2mjd, DAYS_IN_YEAR
+
+
+# Maximum number of epochs * frequencies in one block of Lomb-Scargle, it limits the memory
+_BLOCK_ELEMENTS = 1 << 22
+# Oversampling of the FFT grid and the order of extirpolation of the fast Lomb-Scargle, relative error is about 1e-5
+_OVERSAMPLING_FFT = 10
+_EXTIRPOLATION_ORDER = 6
+
+
+def _prepare(series: dict[str, dict[str, np.ndarray]],
+             components: tuple[str, ...]) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Time in years and values (components, epochs) without the mean and the linear trend."""
+    output = {}
+    for station, data in series.items():
+        for component in ("time",) + components:
+            if component not in data:
+                raise ValueError(f"Component {component} is not found in time serie of station {station}.")
+
+        years = time2mjd(data["time"]) / DAYS_IN_YEAR
+        values = np.array([data[component] for component in components], dtype=np.float64).reshape(len(components), -1)
+        valid = np.isfinite(values)
+        for j in range(len(components)):
+            t, y = years[valid[j]], values[j, valid[j]]
+            if len(y) > 1:
+                values[j] -= np.polyval(np.polyfit(t - t.mean(), y, 1), years - t.mean())
+        output[station] = (years, values)
+    return output
+
+
+def _default_frequencies(years: np.ndarray, oversampling: int) -> np.ndarray:
+    """From 1 / span to the Nyquist frequency of the median step."""
+    span = years.max() - years.min() if len(years) > 1 else 0
+    steps = np.diff(np.sort(years))
+    step = np.median(steps[steps > 0]) if np.any(steps > 0) else 0
+    if span <= 0 or step <= 0:
+        return np.zeros(0)
+    resolution = 1 / (oversampling * span)
+    return np.arange(1, int(0.5 / step / resolution) + 1) * resolution
+
+
+def _extirpolate(x: np.ndarray, y: np.ndarray, size: int, order: int) -> np.ndarray:
+    """Spread values y at the positions x onto the regular grid by Lagrange polynomials (Press & Rybicki 1989)."""
+    result = np.zeros(size, dtype=y.dtype)
+    integers = x % 1 == 0
+    np.add.at(result, x[integers].astype(np.int64), y[integers])
+    x, y = x[~integers], y[~integers]
+
+    lo = np.clip((x - order // 2).astype(np.int64), 0, size - order)
+    numerator = y * np.prod(x - lo - np.arange(order)[:, None], axis=0)
+    denominator = float(np.prod(np.arange(1, order)))
+    for j in range(order):
+        if j > 0:
+            denominator *= j / (j - order)
+        index = lo + (order - 1 - j)
+        np.add.at(result, index, numerator / (denominator * (x - index)))
+    return result
+
+
+def _trig_sums(t: np.ndarray, h: np.ndarray, f0: float, df: float, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Sums of h * sin(2 pi f t) and h * cos(2 pi f t) for f = f0 + df * k, k < n, by FFT of the extirpolated grid."""
+    size = 1 << int(np.ceil(np.log2(max(n * _OVERSAMPLING_FFT, 2 * _EXTIRPOLATION_ORDER))))
+    t0 = t.min()
+    h = h * np.exp(2j * np.pi * f0 * (t - t0))
+    grid = _extirpolate(((t - t0) * size * df) % size, h.astype(np.complex128), size, _EXTIRPOLATION_ORDER)
+    sums = np.fft.ifft(grid)[:n] * size * np.exp(2j * np.pi * t0 * (f0 + df * np.arange(n)))
+    return sums.imag, sums.real
+
+
+def _power_fast(t: np.ndarray, y: np.ndarray, f0: float, df: float, n: int) -> np.ndarray:
+    """Lomb-Scargle power in O(N log N) (Press & Rybicki 1989) for the regular grid of frequencies."""
+    sin_y, cos_y = _trig_sums(t, y, f0, df, n)
+    sin_2, cos_2 = _trig_sums(t, np.ones_like(y), 2 * f0, 2 * df, n)
+
+    # sin and cos of 2 omega tau and of omega tau
+    norm = np.hypot(sin_2, cos_2)
+    sin_2tau, cos_2tau = sin_2 / norm, cos_2 / norm
+    cos_tau = np.sqrt(0.5 * (1 + cos_2tau))
+    sin_tau = np.sign(sin_2tau) * np.sqrt(0.5 * (1 - cos_2tau))
+
+    yc = cos_y * cos_tau + sin_y * sin_tau
+    ys = sin_y * cos_tau - cos_y * sin_tau
+    cc = 0.5 * (len(t) + cos_2 * cos_2tau + sin_2 * sin_2tau)
+    ss = 0.5 * (len(t) - cos_2 * cos_2tau - sin_2 * sin_2tau)
+    return 0.5 * (yc ** 2 / cc + ys ** 2 / ss)
+
+
+def _power_direct(t: np.ndarray, y: np.ndarray, frequencies: np.ndarray) -> np.ndarray:
+    """Classical Lomb-Scargle power for any frequencies, in blocks of frequencies."""
+    power = np.empty(len(frequencies))
+    block = max(1, _BLOCK_ELEMENTS // len(t))
+    for start in range(0, len(frequencies), block):
+        omega = 2 * np.pi * frequencies[start:start + block, None]
+        tau = np.arctan2(np.sin(2 * omega * t).sum(axis=1), np.cos(2 * omega * t).sum(axis=1)) / (2 * omega[:, 0])
+        phase = omega * (t - tau[:, None])
+        cos, sin = np.cos(phase), np.sin(phase)
+        power[start:start + block] = 0.5 * ((cos @ y) ** 2 / (cos ** 2).sum(axis=1)
+                                            + (sin @ y) ** 2 / (sin ** 2).sum(axis=1))
+    return power
+
+
+def _lomb_scargle(years: np.ndarray, values: np.ndarray, frequencies: np.ndarray) -> np.ndarray:
+    """One-sided PSD by Lomb-Scargle (components, frequencies) for one station."""
+    psd = np.full((len(values), len(frequencies)), np.nan)
+    steps = np.diff(frequencies)
+    regular = len(frequencies) > 1 and np.allclose(steps, steps[0], rtol=1e-9, atol=0)
+    for j, row in enumerate(values):
+        valid = np.isfinite(row)
+        t, y = years[valid], row[valid]
+        if len(y) < 3 or len(frequencies) == 0:
+            continue
+        t = t - t.mean()
+        if regular:
+            power = _power_fast(t, y, frequencies[0], steps[0], len(frequencies))
+        else:
+            power = _power_direct(t, y, frequencies)
+        # 2 * power * mean step
+        psd[j] = 2 * power * (t.max() - t.min()) / (len(y) - 1)
+    return psd
+
+
+@typechecked
+def lomb_scargle(series: dict[str, dict[str, np.ndarray]],
+                 components: tuple[str, ...] = ("e", "n", "u"),
+                 frequencies: np.ndarray | None = None,
+                 oversampling: int = 4) -> dict[str, dict[str, np.ndarray]]:
+    """Lomb-Scargle periodogram of time series with gaps (NaN or missing epochs) and uneven sampling.
+    The mean and the linear trend are removed before. For the regular grid of frequencies the fast method of
+    Press & Rybicki (1989) is used: data are extirpolated onto the regular grid and all frequencies are computed
+    by FFT in O(N log N). Other frequencies are computed directly, vectorized over blocks of frequencies.
+    The power is scaled to the one-sided PSD.
+
+    Args:
+        series (dict[str, dict[str, np.ndarray]]): Time series of stations in columnar mode,
+            e.g. from remove_outliers. Each serie must have key "time" (datetime64 or MJD).
+        components (tuple[str, ...], optional): Components to analyze. Defaults to ("e", "n", "u").
+        frequencies (np.ndarray | None, optional): Frequencies (cpy). If None, the grid from 1 / span to
+            the Nyquist frequency of the median step with the step 1 / (oversampling * span) is used for every station.
+            Defaults to None.
+        oversampling (int, optional): Oversampling of the default grid. Defaults to 4.
+
+    Raises:
+        ValueError: Oversampling must be positive.
+        ValueError: Frequencies must be positive.
+        ValueError: Component {component} is not found in time serie of station {station}.
+
+    Returns:
+        dict[str, dict[str, np.ndarray]]: For every station "frequency" (cpy) and PSD of components (unit^2 / cpy).
+            PSD is NaN for components with less than 3 epochs.
+
+    Examples:
+        >>> spectra = lomb_scargle(cleaned, frequencies=np.linspace(0.1, 10, 1000))
+        >>> spectra["NSK1"]["frequency"][np.argmax(spectra["NSK1"]["u"])]
+        1.0
+    """
+    if oversampling <= 0:
+        raise ValueError("Oversampling must be positive.")
+    if frequencies is not None and np.any(frequencies <= 0):
+        raise ValueError("Frequencies must be positive.")
+
+    output = {}
+    for station, (years, values) in _prepare(series, components).items():
+        station_frequencies = _default_frequencies(years, oversampling) if frequencies is None else frequencies
+        power = _lomb_scargle(years, values, station_frequencies)
+        output[station] = {"frequency": station_frequencies}
+        output[station].update({component: power[j] for j, component in enumerate(components)})
+    return output
+
+
+@typechecked
+def fft_periodogram(series: dict[str, dict[str, np.ndarray]],
+                    components: tuple[str, ...] = ("e", "n", "u")) -> dict[str, dict[str, np.ndarray]]:
+    """FFT periodogram of evenly spaced time series without gaps, e.g. daily positions of aggregate_pos_series.
+    The mean and the linear trend are removed before. All components of the station are transformed together.
+
+    Args:
+        series (dict[str, dict[str, np.ndarray]]): Time series of stations in columnar mode.
+            Each serie must have key "time" (datetime64 or MJD).
+        components (tuple[str, ...], optional): Components to analyze. Defaults to ("e", "n", "u").
+
+    Raises:
+        ValueError: Component {component} is not found in time serie of station {station}.
+        ValueError: Serie of station {station} isn't evenly spaced or has gaps. Use lomb_scargle.
+
+    Returns:
+        dict[str, dict[str, np.ndarray]]: For every station "frequency" (cpy, without zero frequency)
+            and PSD of components (unit^2 / cpy).
+
+    Examples:
+        >>> daily = {station: aggregate_pos_series(iter_pos_file(path)) for station, path in files.items()}
+        >>> spectra = fft_periodogram(daily, components=("height_wmean",))
+    """
+    output = {}
+    for station, (years, values) in _prepare(series, components).items():
+        steps = np.diff(years)
+        if len(years) < 3 or np.any(~np.isfinite(values)) or np.ptp(steps) > 1e-3 * np.mean(steps):
+            raise ValueError(f"Serie of station {station} isn't evenly spaced or has gaps. Use lomb_scargle.")
+
+        step = (years[-1] - years[0]) / (len(years) - 1)
+        spectrum = np.fft.rfft(values, axis=-1)[:, 1:]
+        output[station] = {"frequency": np.fft.rfftfreq(len(years), step)[1:]}
+        psd = 2 * step * np.abs(spectrum) ** 2 / len(years)
+        if len(years) % 2 == 0:
+            # the Nyquist bin has no negative-frequency twin, it isn't doubled
+            psd[:, -1] /= 2
+        output[station].update({component: psd[j] for j, component in enumerate(components)})
+    return output
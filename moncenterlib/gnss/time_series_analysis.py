@@ -0,0 +1,977 @@
+"""
+This module is designed for the analysis of GNSS coordinate time series without external programs.
+It works with columnar time series, e.g. from assemble_station_series and series2enu.
+- Remove outliers like removeoutliers of Hector (see conf/removeoutliers.ctl);
+- Estimate trend, seasonal signals and offsets like estimatetrend of Hector (see conf/estimatetrend.ctl);
+- Estimate power-law plus white noise and realistic velocity uncertainties by maximum likelihood;
+- Detect offsets for estimateoffsets;
+- Filter the common-mode error of the network by stacking or PCA;
+- Sidereal filtering of multipath in high-rate kinematic series.
+
+Many stations and components are processed in one call. Series of stations are grouped in blocks of similar length,
+padded to a common length and all least squares problems of a block are solved at once with NumPy.
+Missing epochs are NaN.
+"""
+
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from typeguard import typechecked
+
+
+# Epoch of Modified Julian Date and the length of the Julian year in days
+MJD_EPOCH = np.datetime64("1858-11-17T00:00:00", "ns")
+DAYS_IN_YEAR = 365.25
+# Reference epoch of seasonal terms (J2000, MJD 51544), so their phases are comparable between stations
+_SEASONAL_EPOCH = 51544.0
+# Number of stations which are solved together. It limits the memory of padded arrays.
+_BLOCK_SIZE = 64
+# Number of epochs in blocks of network matrices
+_EPOCH_BLOCK = 4096
+# Number of elements of one chunk of diagonals of the inverse Toeplitz matrix (noise model with gaps)
+_DIAGONAL_CHUNK = 1 << 22
+# Gaps of the noise model are taken from rows of Gohberg-Semencul factors while gaps^2 < _ROWS_FACTOR * epochs,
+# BLAS products are faster than cumulative sums along diagonals for few gaps
+_ROWS_FACTOR = 32
+# Bounds of the spectral index of power-law noise: from random walk to slightly anticorrelated noise
+_KAPPA_BOUNDS = (-2.0, 1.0)
+
+
+@typechecked
+def time2mjd(time: np.ndarray) -> np.ndarray:
+    """Convert time of the serie into float Modified Julian Date.
+
+    Args:
+        time (np.ndarray): Array of datetime64. Numeric time is considered as MJD already (e.g. Hector .mom files).
+
+    Returns:
+        np.ndarray: Array of float64 MJD. Years since MJD epoch are time2mjd(time) / DAYS_IN_YEAR.
+
+    Examples:
+        >>> time2mjd(np.array(["2022-01-01T12:00:00"], dtype="datetime64[ns]"))
+        array([59580.5])
+    """
+    if np.issubdtype(time.dtype, np.datetime64):
+        return (time.astype("datetime64[ns]") - MJD_EPOCH) / np.timedelta64(1, "D")
+    return time.astype(np.float64)
+
+
+def _parameter_names(seasonal: bool, half_seasonal: bool, n_offsets: int) -> list[str]:
+    names = ["bias", "trend"]
+    if seasonal:
+        names += ["annual_cos", "annual_sin"]
+    if half_seasonal:
+        names += ["semiannual_cos", "semiannual_sin"]
+    return names + [f"offset_{i}" for i in range(n_offsets)]
+
+
+def _design_matrix(mjd: np.ndarray, center: np.ndarray, seasonal: bool, half_seasonal: bool,
+                   offsets: np.ndarray | None = None) -> np.ndarray:
+    """Columns: bias, trend (per year), annual cos/sin, semi-annual cos/sin, offsets.
+    Shape (stations, epochs, parameters). Offsets (stations, k) in MJD are padded by NaN, their columns are zero.
+    The trend is centered on center, seasonal terms are measured from _SEASONAL_EPOCH."""
+    t = (mjd - center[..., None]) / DAYS_IN_YEAR
+    columns = [np.ones_like(t), t]
+    if seasonal or half_seasonal:
+        phase = 2 * np.pi * (mjd - _SEASONAL_EPOCH) / DAYS_IN_YEAR
+    if seasonal:
+        columns += [np.cos(phase), np.sin(phase)]
+    if half_seasonal:
+        columns += [np.cos(2 * phase), np.sin(2 * phase)]
+    if offsets is not None:
+        columns += list(np.moveaxis(mjd[..., None] >= offsets[:, None, :], -1, 0).astype(np.float64))
+    return np.stack(columns, axis=-1)
+
+
+def _iter_blocks(series: dict[str, dict[str, np.ndarray]],
+                 components: tuple[str, ...]) -> list[list[str]]:
+    """Check series and split stations into blocks of similar length."""
+    for station, data in series.items():
+        for component in ("time",) + components:
+            if component not in data:
+                raise ValueError(f"Component {component} is not found in time serie of station {station}.")
+
+    stations = sorted(series, key=lambda station: len(series[station]["time"]))
+    return [stations[i:i + _BLOCK_SIZE] for i in range(0, len(stations), _BLOCK_SIZE)]
+
+
+def _stack_series(series: list[dict[str, np.ndarray]],
+                  components: tuple[str, ...]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pad series of stations to a common length.
+
+    Returns:
+        mjd (stations, epochs), values (stations, components, epochs), filled (stations, epochs).
+    """
+    length = max(len(data["time"]) for data in series)
+    mjd = np.zeros((len(series), length))
+    values = np.full((len(series), len(components), length), np.nan)
+    filled = np.zeros((len(series), length), dtype=bool)
+    for i, data in enumerate(series):
+        size = len(data["time"])
+        mjd[i, :size] = time2mjd(data["time"])
+        mjd[i, size:] = mjd[i, size - 1] if size else 0
+        filled[i, :size] = True
+        for j, component in enumerate(components):
+            values[i, j, :size] = data[component]
+    return mjd, values, filled
+
+
+def _stack_offsets(offsets: dict[str, np.ndarray], stations: list[str], mjd: np.ndarray,
+                   filled: np.ndarray) -> tuple[np.ndarray, list[int]]:
+    """Offsets of stations in MJD (stations, k) padded by NaN and the number of offsets of every station.
+    An offset out of the serie is the bias or nothing, it's NaN too and isn't estimated."""
+    station_offsets = [time2mjd(np.asarray(offsets.get(station, np.array([])))) for station in stations]
+    offsets_mjd = np.full((len(stations), max(len(value) for value in station_offsets)), np.nan)
+    for i, value in enumerate(station_offsets):
+        offsets_mjd[i, :len(value)] = value
+
+    first = np.where(filled, mjd, np.inf).min(axis=-1, keepdims=True)
+    last = np.where(filled, mjd, -np.inf).max(axis=-1, keepdims=True)
+    offsets_mjd[(offsets_mjd <= first) | (offsets_mjd > last)] = np.nan
+    return offsets_mjd, [len(value) for value in station_offsets]
+
+
+def _center(mjd: np.ndarray, filled: np.ndarray) -> np.ndarray:
+    count = filled.sum(axis=-1)
+    return np.where(count > 0, (mjd * filled).sum(axis=-1) / np.maximum(count, 1), 0)
+
+
+def _solve(design: np.ndarray, values: np.ndarray,
+           valid: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Least squares for every station and component at once.
+
+    Returns:
+        coefficients (stations, components, parameters), inverse of normal matrix (stations, components, p, p),
+        residuals (stations, components, epochs) with NaN for invalid epochs.
+    """
+    # (stations, components, parameters, epochs), matmul goes to BLAS unlike einsum
+    weighted = np.swapaxes(design, -1, -2)[:, None] * valid[:, :, None]
+    normal = weighted @ design[:, None]
+    rhs = weighted @ np.where(valid, values, 0)[..., None]
+    # pinv keeps short series and unused offset columns with the singular normal matrix going
+    normal_inv = np.linalg.pinv(normal, hermitian=True)
+    coefficients = normal_inv @ rhs
+    model = (design[:, None] @ coefficients)[..., 0]
+    return coefficients[..., 0], normal_inv, np.where(valid, values - model, np.nan)
+
+
+def _nanquantiles(values: np.ndarray, quantiles: tuple[float, ...]) -> list[np.ndarray]:
+    """Linear quantiles along the last axis ignoring NaN. np.nanpercentile loops over rows in Python."""
+    ordered = np.sort(values, axis=-1)  # NaN are sorted to the end
+    count = np.isfinite(values).sum(axis=-1, keepdims=True)
+    output = []
+    for quantile in quantiles:
+        position = quantile * np.maximum(count - 1, 0)
+        lo = np.floor(position).astype(np.int64)
+        hi = np.minimum(lo + 1, np.maximum(count - 1, 0))
+        value_lo = np.take_along_axis(ordered, lo, axis=-1)
+        value_hi = np.take_along_axis(ordered, hi, axis=-1)
+        output.append(np.where(count > 0, value_lo + (value_hi - value_lo) * (position - lo), np.nan))
+    return output
+
+
+@typechecked
+def remove_outliers(series: dict[str, dict[str, np.ndarray]],
+                    components: tuple[str, ...] = ("e", "n", "u"),
+                    iq_factor: float = 3.0,
+                    seasonal: bool = True,
+                    half_seasonal: bool = True,
+                    max_iterations: int = 20) -> tuple[dict[str, dict[str, np.ndarray]], dict[str, dict[str, np.ndarray]]]:
+    """Remove outliers from time series of stations like removeoutliers of Hector.
+    The trend, annual and semi-annual signals are fitted by least squares. An epoch is an outlier
+    if its residual differs from the median of residuals by more than iq_factor times interquartile range.
+    The fit is repeated without outliers until no new outliers are found.
+    Every component of every station is processed separately, but all of them are computed in one pass.
+
+    Args:
+        series (dict[str, dict[str, np.ndarray]]): Time series of stations in columnar mode,
+            e.g. from assemble_station_series. Each serie must have key "time" (datetime64 or MJD).
+        components (tuple[str, ...], optional): Components to check. Defaults to ("e", "n", "u").
+        iq_factor (float, optional): IQ_factor of Hector. Defaults to 3.0.
+        seasonal (bool, optional): Fit the annual signal. Defaults to True.
+        half_seasonal (bool, optional): Fit the semi-annual signal. Defaults to True.
+        max_iterations (int, optional): Maximum number of fits. Defaults to 20.
+
+    Raises:
+        ValueError: IQ factor must be positive.
+        ValueError: Number of iterations must be positive.
+        ValueError: Component {component} is not found in time serie of station {station}.
+
+    Returns:
+        tuple[dict[str, dict[str, np.ndarray]], dict[str, dict[str, np.ndarray]]]: The first dictionary is
+            time series with NaN instead of outliers in the components. The second dictionary is bool masks
+            of outliers for each station and component.
+
+    Examples:
+        >>> series, errors = assemble_station_series("/path/to/pos_dir")
+        >>> enu = {station: series2enu(data, ref[station]) for station, data in series.items()}
+        >>> cleaned, outliers = remove_outliers(enu)
+        >>> outliers["NSK1"]["u"].sum()
+        3
+    """
+    if iq_factor <= 0:
+        raise ValueError("IQ factor must be positive.")
+    if max_iterations <= 0:
+        raise ValueError("Number of iterations must be positive.")
+
+    cleaned, masks = {}, {}
+    for stations in _iter_blocks(series, components):
+        mjd, values, filled = _stack_series([series[station] for station in stations], components)
+        design = _design_matrix(mjd, _center(mjd, filled), seasonal, half_seasonal) * filled[..., None]
+
+        valid = np.isfinite(values)
+        outliers = np.zeros_like(valid)
+        for _ in range(max_iterations):
+            _, _, residuals = _solve(design, values, valid)
+            q1, median, q3 = _nanquantiles(residuals, (0.25, 0.5, 0.75))
+            bad = valid & (np.abs(residuals - median) > iq_factor * (q3 - q1))
+            if not bad.any():
+                break
+            outliers |= bad
+            valid &= ~bad
+
+        for i, station in enumerate(stations):
+            data = series[station]
+            size = len(data["time"])
+            cleaned[station] = dict(data)
+            masks[station] = {}
+            for j, component in enumerate(components):
+                masks[station][component] = outliers[i, j, :size].copy()
+                cleaned[station][component] = np.where(masks[station][component], np.nan, data[component])
+
+    # keep the order of input stations
+    return {station: cleaned[station] for station in series}, {station: masks[station] for station in series}
+
+
+@typechecked
+def estimate_trend(series: dict[str, dict[str, np.ndarray]],
+                   components: tuple[str, ...] = ("e", "n", "u"),
+                   seasonal: bool = True,
+                   half_seasonal: bool = False,
+                   offsets: dict[str, np.ndarray] | None = None) -> dict[str, dict[str, dict[str, float]]]:
+    """Estimate the deterministic model of estimatetrend of Hector by least squares:
+    bias, linear trend, annual and semi-annual signals and offsets at given epochs.
+    Formal errors are computed for white noise (sigma0 of residuals).
+    All components of all stations are solved as stacked least squares problems.
+
+    Args:
+        series (dict[str, dict[str, np.ndarray]]): Time series of stations in columnar mode,
+            e.g. from remove_outliers. Each serie must have key "time" (datetime64 or MJD). NaN are skipped.
+        components (tuple[str, ...], optional): Components to estimate. Defaults to ("e", "n", "u").
+        seasonal (bool, optional): Estimate the annual signal. Defaults to True.
+        half_seasonal (bool, optional): Estimate the semi-annual signal. Defaults to False.
+        offsets (dict[str, np.ndarray] | None, optional): Epochs of offsets for stations (datetime64 or MJD).
+            The offset is a step since this epoch. Defaults to None.
+
+    Raises:
+        ValueError: Component {component} is not found in time serie of station {station}.
+
+    Returns:
+        dict[str, dict[str, dict[str, float]]]: Results for each station and component.
+            Keys: "bias" (at the mean epoch), "trend" (unit per year), "annual_cos", "annual_sin", "semiannual_cos",
+            "semiannual_sin" (phases from J2000, 2000-01-01 MJD 51544), "offset_0", ... (in the order of offsets), each with the formal error in
+            key with suffix "_sigma". Also "sigma0" (a posteriori sigma of residuals) and "count" (number of used epochs).
+            Values are NaN if the serie is too short.
+
+    Examples:
+        >>> cleaned, outliers = remove_outliers(enu)
+        >>> result = estimate_trend(cleaned, offsets={"NSK1": np.array(["2021-05-01"], dtype="datetime64[ns]")})
+        >>> result["NSK1"]["u"]["trend"], result["NSK1"]["u"]["trend_sigma"]
+        (0.0031, 0.0001)
+    """
+    offsets = offsets or {}
+    output = {}
+    for stations in _iter_blocks(series, components):
+        mjd, values, filled = _stack_series([series[station] for station in stations], components)
+
+        offsets_mjd, n_station_offsets = _stack_offsets(offsets, stations, mjd, filled)
+        n_offsets = offsets_mjd.shape[-1]
+
+        center = _center(mjd, filled)
+        design = _design_matrix(mjd, center, seasonal, half_seasonal, offsets_mjd) * filled[..., None]
+        valid = np.isfinite(values)
+        coefficients, normal_inv, residuals = _solve(design, values, valid)
+
+        count = valid.sum(axis=-1)
+        estimated = np.concatenate([np.ones((len(stations), design.shape[-1] - n_offsets), dtype=bool),
+                                    np.isfinite(offsets_mjd)], axis=-1)
+        # all estimated parameters must be determined and the serie must be longer
+        rank = np.linalg.matrix_rank(normal_inv, hermitian=True)
+        solvable = (rank == estimated.sum(axis=-1, keepdims=True)) & (count > rank)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.where(solvable, np.nansum(residuals ** 2, axis=-1) / (count - rank), np.nan)
+        sigmas = np.sqrt(variance[..., None] * np.diagonal(normal_inv, axis1=-2, axis2=-1))
+        estimated = solvable[..., None] & estimated[:, None]
+        coefficients = np.where(estimated, coefficients, np.nan)
+        sigmas = np.where(estimated, sigmas, np.nan)
+
+        names = _parameter_names(seasonal, half_seasonal, n_offsets)
+        for i, station in enumerate(stations):
+            output[station] = {}
+            n_params = len(names) - n_offsets + n_station_offsets[i]
+            for j, component in enumerate(components):
+                result = {}
+                for k, name in enumerate(names[:n_params]):
+                    result[name] = float(coefficients[i, j, k])
+                    result[f"{name}_sigma"] = float(sigmas[i, j, k])
+                result["sigma0"] = float(np.sqrt(variance[i, j]))
+                result["count"] = int(count[i, j])
+                output[station][component] = result
+
+    return {station: output[station] for station in series}
+
+
+def _powerlaw_acv(kappa: float, n: int) -> np.ndarray:
+    """Autocovariance (lags 0..n-1) of power-law noise with unit driving noise. The impulse response
+    h_k = h_(k-1) * (k - 1 + d) / k, d = -kappa / 2 (Hosking 1981, Williams 2003) is truncated to n samples,
+    it gives a Toeplitz covariance matrix for any kappa as in Hector."""
+    k = np.arange(1, n)
+    h = np.concatenate([[1.0], np.cumprod((k - 1 - kappa / 2) / k)])
+    spectrum = np.fft.rfft(h, 2 * n)
+    return np.fft.irfft(np.abs(spectrum) ** 2, 2 * n)[:n]
+
+
+def _durbin(acv: np.ndarray) -> tuple[np.ndarray, float, float]:
+    """Durbin recursion of the Toeplitz matrix T with the first column acv. Only the autocovariance is recursed,
+    so one evaluation costs O(n^2) without any columns of data.
+
+    Returns:
+        the first column of T^-1, log|T|, the first element of the column.
+    """
+    size = len(acv)
+    phi = np.zeros(size)
+    variances = np.empty(size)
+    variance = variances[0] = acv[0]
+    for t in range(1, size):
+        k = (acv[t] - phi[:t - 1] @ acv[t - 1:0:-1]) / variance
+        phi[:t - 1] = phi[:t - 1] - k * phi[:t - 1][::-1]
+        phi[t - 1] = k
+        variance *= 1 - k * k
+        variances[t] = variance
+    first = np.concatenate([[1.0], -phi[:size - 1]]) / variance
+    return first, float(np.sum(np.log(variances))), float(first[0])
+
+
+class _NoiseProblem:
+    """Parts of the likelihood of one serie which don't depend on the noise parameters, they are computed once
+    for all evaluations of Nelder-Mead.
+
+    Toeplitz mode (evenly spaced grid, missing epochs are zero): P = T^-1 of the whole grid is given by
+    the Gohberg-Semencul formula P = (L(a) L(a)^T - L(b) L(b)^T) / a_0, where L(.) are lower triangular
+    Toeplitz matrices of the first column a of P and b = (0, a_(n-1), ..., a_1). Products with them are FFT
+    convolutions, the spectrum of the data is cached. Missing epochs m are removed by the Schur complement:
+    C_oo^-1 = P_oo - P_om P_mm^-1 P_mo and log|C_oo| = log|T| + log|P_mm|. Element (i, j), i >= j, of P is
+    the cumulative sum of a_(i-j+s) a_s - b_(i-j+s) b_s over s <= j, so for many gaps P_mm is taken from
+    cumulative sums along diagonals in O(n^2), for few gaps from products of rows of L(a) and L(b) in O(g^2 * n).
+    Dense mode: Cholesky of the covariance of observed epochs.
+    """
+
+    def __init__(self, design: np.ndarray, y: np.ndarray, index: np.ndarray, dense: bool) -> None:
+        self.size = int(index[-1]) + 1
+        self.count = len(y)
+        self.n_parameters = design.shape[1]
+        data = np.column_stack([design, y])
+        self.dense = dense
+        if dense:
+            self.lags = np.abs(index[:, None] - index[None, :])
+            self.data = data
+            return
+
+        filled = np.zeros((self.size, data.shape[1]))
+        filled[index] = data
+        self.n_fft = 1 << (2 * self.size - 1).bit_length()
+        # L^T x is the reversed convolution of the column of L with reversed x
+        self.spectrum = np.fft.rfft(filled[::-1], self.n_fft, axis=0)
+        self.missing = np.setdiff1d(np.arange(self.size), index)
+        # few gaps: P_mm = (A A^T - B B^T) / a_0 of rows of L(a), L(b) at missing epochs by BLAS in O(g^2 * n)
+        self.by_rows = len(self.missing) ** 2 < _ROWS_FACTOR * self.size
+        if self.by_rows:
+            return
+
+        # pairs (i >= j) of missing epochs sorted by the diagonal i - j
+        rows, columns = np.tril_indices(len(self.missing))
+        diagonal = self.missing[rows] - self.missing[columns]
+        order = np.argsort(diagonal, kind="stable")
+        self.pairs = rows[order], columns[order]
+        self.pair_diagonal, self.pair_column = diagonal[order], self.missing[columns[order]]
+        self.chunk = max(1, _DIAGONAL_CHUNK // self.size)
+        self.bounds = np.searchsorted(self.pair_diagonal, np.arange(0, self.pair_diagonal[-1] + self.chunk + 1,
+                                                                    self.chunk))
+
+    def __convolve(self, column: np.ndarray, data: np.ndarray) -> np.ndarray:
+        """L(column) @ data by FFT."""
+        spectrum = np.fft.rfft(column, self.n_fft)[:, None] * np.fft.rfft(data, self.n_fft, axis=0)
+        return np.fft.irfft(spectrum, self.n_fft, axis=0)[:self.size]
+
+    def __lower_transpose(self, column: np.ndarray) -> np.ndarray:
+        """L(column)^T @ data of the serie by the cached spectrum."""
+        product = np.fft.irfft(np.fft.rfft(column, self.n_fft)[:, None] * self.spectrum, self.n_fft, axis=0)
+        return product[:self.size][::-1]
+
+    def __rows(self, column: np.ndarray) -> np.ndarray:
+        """Rows of L(column) at missing epochs: row i is (c_i, c_(i-1), ..., c_0, 0, ..., 0)."""
+        padded = np.concatenate([column[::-1], np.zeros(self.size)])
+        return np.lib.stride_tricks.sliding_window_view(padded, self.size)[self.size - 1 - self.missing]
+
+    def __inverse_missing(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """Block of missing epochs of T^-1 * a_0 by cumulative sums along diagonals, chunk by chunk."""
+        zeros = np.zeros(self.size)
+        shifted_first = np.lib.stride_tricks.sliding_window_view(np.concatenate([first, zeros]), self.size)
+        shifted_second = np.lib.stride_tricks.sliding_window_view(np.concatenate([second, zeros]), self.size)
+        values = np.empty(len(self.pair_diagonal))
+        for i in range(len(self.bounds) - 1):
+            low, high = self.bounds[i], self.bounds[i + 1]
+            if low == high:
+                continue
+            begin = i * self.chunk
+            end = int(self.pair_diagonal[high - 1]) + 1
+            # i = j + d < n, only columns j < n - begin are needed
+            width = self.size - begin
+            sums = shifted_first[begin:end, :width] * first[:width]
+            sums -= shifted_second[begin:end, :width] * second[:width]
+            np.cumsum(sums, axis=1, out=sums)
+            values[low:high] = sums[self.pair_diagonal[low:high] - begin, self.pair_column[low:high]]
+
+        block = np.empty((len(self.missing), len(self.missing)))
+        block[self.pairs] = values
+        block[self.pairs[::-1]] = values
+        return block
+
+    def quadratic(self, acv: np.ndarray) -> tuple[np.ndarray, float]:
+        """X^T C^-1 X of columns (design, y) of observed epochs and log|C| for C with autocovariance acv."""
+        if self.dense:
+            cholesky = np.linalg.cholesky(acv[self.lags])
+            white = np.linalg.solve(cholesky, self.data)
+            return white.T @ white, 2 * float(np.sum(np.log(np.diagonal(cholesky))))
+
+        first, log_det, scale = _durbin(acv)
+        second = np.concatenate([[0.0], first[:0:-1]])
+        u_first, u_second = self.__lower_transpose(first), self.__lower_transpose(second)
+        quadratic = (u_first.T @ u_first - u_second.T @ u_second) / scale
+        if len(self.missing):
+            p_data = (self.__convolve(first, u_first) - self.__convolve(second, u_second))[self.missing] / scale
+            if self.by_rows:
+                rows_first, rows_second = self.__rows(first), self.__rows(second)
+                p_missing = rows_first @ rows_first.T - rows_second @ rows_second.T
+            else:
+                p_missing = self.__inverse_missing(first, second)
+            cholesky = np.linalg.cholesky(p_missing / scale)
+            correction = np.linalg.solve(cholesky, p_data)
+            quadratic -= correction.T @ correction
+            log_det += 2 * float(np.sum(np.log(np.diagonal(cholesky))))
+        return quadratic, log_det
+
+
+def _noise_likelihood(fraction: float, kappa: float,
+                      problem: _NoiseProblem) -> tuple[float, np.ndarray, np.ndarray, float]:
+    """Log-likelihood of C = sigma^2 * (fraction * powerlaw + (1 - fraction) * I) with sigma and
+    the deterministic model estimated by generalized least squares.
+
+    Returns:
+        log-likelihood, coefficients, covariance of coefficients, sigma^2.
+    """
+    acv = fraction * _powerlaw_acv(kappa, problem.size)
+    acv[0] += 1 - fraction
+    quadratic, log_det = problem.quadratic(acv)
+
+    p = problem.n_parameters
+    normal_inv = np.linalg.inv(quadratic[:p, :p])
+    coefficients = normal_inv @ quadratic[:p, p]
+    variance = max(quadratic[p, p] - quadratic[:p, p] @ coefficients, 0.0) / problem.count
+    log_likelihood = -0.5 * (problem.count * np.log(2 * np.pi * variance) + log_det + problem.count)
+    return log_likelihood, coefficients, variance * normal_inv, variance
+
+
+def _nelder_mead(func, x0: np.ndarray, step: float = 0.5, tolerance: float = 1e-4,
+                 max_evaluations: int = 200) -> np.ndarray:
+    """Minimal Nelder-Mead minimizer. NumPy has no optimizer and the noise model has only two parameters."""
+    simplex = np.vstack([x0, x0 + step * np.eye(len(x0))])
+    values = np.array([func(x) for x in simplex])
+    evaluations = len(values)
+    while evaluations < max_evaluations:
+        order = np.argsort(values)
+        simplex, values = simplex[order], values[order]
+        if values[-1] - values[0] < tolerance:
+            break
+        centroid = simplex[:-1].mean(axis=0)
+        reflected = centroid + (centroid - simplex[-1])
+        value = func(reflected)
+        evaluations += 1
+        if value < values[0]:
+            expanded = centroid + 2 * (centroid - simplex[-1])
+            expanded_value = func(expanded)
+            evaluations += 1
+            simplex[-1], values[-1] = (expanded, expanded_value) if expanded_value < value else (reflected, value)
+        elif value < values[-2]:
+            simplex[-1], values[-1] = reflected, value
+        else:
+            contracted = centroid + 0.5 * (simplex[-1] - centroid)
+            contracted_value = func(contracted)
+            evaluations += 1
+            if contracted_value < values[-1]:
+                simplex[-1], values[-1] = contracted, contracted_value
+            else:
+                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+                values[1:] = [func(x) for x in simplex[1:]]
+                evaluations += len(simplex) - 1
+    return simplex[np.argmin(values)]
+
+
+def _unpack_noise(u: np.ndarray) -> tuple[float, float]:
+    """Unbounded parameters of Nelder-Mead -> fraction of power-law noise in (0, 1) and kappa in _KAPPA_BOUNDS."""
+    fraction, position = 1 / (1 + np.exp(-u))
+    return float(fraction), float(_KAPPA_BOUNDS[0] + (_KAPPA_BOUNDS[1] - _KAPPA_BOUNDS[0]) * position)
+
+
+def _noise_worker(task: tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]) -> dict[str, float]:
+    """Estimate power-law + white noise and the deterministic model for one component of one station."""
+    mjd, y, design, names = task
+    result = {name: np.nan for name in names}
+    result.update({f"{name}_sigma": np.nan for name in names})
+    result.update({"kappa": np.nan, "fraction": np.nan, "sigma_white": np.nan, "sigma_powerlaw": np.nan,
+                   "powerlaw_amplitude": np.nan, "log_likelihood": np.nan, "count": len(y)})
+    if len(y) <= design.shape[1] + 2:
+        return result
+
+    interval = np.median(np.diff(mjd))
+    index = np.round((mjd - mjd[0]) / interval).astype(np.int64)
+    size = int(index[-1]) + 1
+    # epochs on one node of the grid need the dense covariance, Cholesky is also cheaper if most of the grid is missing
+    dense = bool(np.any(np.diff(index) <= 0)) or len(y) ** 3 < 16 * size ** 2
+    problem = _NoiseProblem(design, y, index, dense)
+
+    def cost(u: np.ndarray) -> float:
+        return -_noise_likelihood(*_unpack_noise(u), problem)[0]
+
+    # coarse grid for the start point, fraction 0.25/0.5/0.75 and kappa of flicker and between
+    grid = [np.array([a, b]) for a in (-1.1, 0.0, 1.1) for b in (-0.7, 0.0, 0.7)]
+    u = _nelder_mead(cost, min(grid, key=cost))
+    fraction, kappa = _unpack_noise(u)
+    log_likelihood, coefficients, covariance, variance = _noise_likelihood(fraction, kappa, problem)
+
+    for name, value, sigma in zip(names, coefficients, np.sqrt(np.diagonal(covariance))):
+        result[name], result[f"{name}_sigma"] = float(value), float(sigma)
+    sigma_powerlaw = np.sqrt(variance * fraction)
+    result.update({
+        "kappa": kappa,
+        "fraction": fraction,
+        "sigma_white": float(np.sqrt(variance * (1 - fraction))),
+        "sigma_powerlaw": float(sigma_powerlaw),
+        # Williams (2003): C = b^2 * dT^(-kappa/2) * J, dT in years
+        "powerlaw_amplitude": float(sigma_powerlaw * (interval / DAYS_IN_YEAR) ** (kappa / 4)),
+        "log_likelihood": float(log_likelihood)
+    })
+    return result
+
+
+@typechecked
+def estimate_noise(series: dict[str, dict[str, np.ndarray]],
+                   components: tuple[str, ...] = ("e", "n", "u"),
+                   seasonal: bool = True,
+                   half_seasonal: bool = False,
+                   offsets: dict[str, np.ndarray] | None = None,
+                   workers: int = 1) -> dict[str, dict[str, dict[str, float]]]:
+    """Estimate power-law plus white noise (NoiseModels Powerlaw White of estimatetrend.ctl) by maximum likelihood
+    together with the deterministic model of estimate_trend. Velocities get realistic formal errors.
+
+    The covariance is C = sigma^2 * (fraction * P(kappa) + (1 - fraction) * I), where P is the Toeplitz covariance
+    of power-law noise. The deterministic model and sigma are estimated by generalized least squares for every
+    fraction and kappa, which are found by Nelder-Mead. For a serie on the regular grid only the autocovariance
+    is recursed by Durbin in O(n^2), the data are whitened by FFT with the Gohberg-Semencul formula of the inverse
+    Toeplitz matrix and the spectrum of the data is computed once for all evaluations. Gaps (missing epochs or NaN)
+    are removed by the Schur complement of the inverse, O(g^2 * n) for g missing epochs. Only if most of the grid
+    is missing or several epochs fall on one node of the grid, the covariance of observed epochs is decomposed
+    by Cholesky in O(m^3), which is cheaper then.
+    The sampling interval is the median step of the serie.
+    Components of stations are independent and are computed in parallel processes.
+
+    Args:
+        series (dict[str, dict[str, np.ndarray]]): Time series of stations in columnar mode,
+            e.g. from remove_outliers. Each serie must have key "time" (datetime64 or MJD). NaN are skipped.
+        components (tuple[str, ...], optional): Components to estimate. Defaults to ("e", "n", "u").
+        seasonal (bool, optional): Estimate the annual signal. Defaults to True.
+        half_seasonal (bool, optional): Estimate the semi-annual signal. Defaults to False.
+        offsets (dict[str, np.ndarray] | None, optional): Epochs of offsets for stations (datetime64 or MJD).
+            The offset is a step since this epoch. Defaults to None.
+        workers (int, optional): The number of parallel processes. Defaults to 1.
+
+    Raises:
+        ValueError: Number of workers must be positive.
+        ValueError: Component {component} is not found in time serie of station {station}.
+
+    Returns:
+        dict[str, dict[str, dict[str, float]]]: Results for each station and component. Keys of the deterministic
+            model are the same as in estimate_trend. Keys of noise: "kappa" (spectral index), "fraction"
+            (of power-law noise in variance), "sigma_white", "sigma_powerlaw" (unit), "powerlaw_amplitude"
+            (unit/year^(-kappa/4)), "log_likelihood". Also "count" (number of used epochs).
+            Values are NaN if the serie is too short.
+
+    Examples:
+        >>> cleaned, outliers = remove_outliers(enu)
+        >>> result = estimate_noise(cleaned, workers=8)
+        >>> result["NSK1"]["u"]["trend"], result["NSK1"]["u"]["trend_sigma"], result["NSK1"]["u"]["kappa"]
+        (0.0031, 0.0004, -0.93)
+    """
+    if workers <= 0:
+        raise ValueError("Number of workers must be positive.")
+
+    offsets = offsets or {}
+    tasks, keys = [], []
+    for stations in _iter_blocks(series, components):
+        for station in stations:
+            mjd, values, filled = _stack_series([series[station]], components)
+            offsets_mjd, n_station_offsets = _stack_offsets(offsets, [station], mjd, filled)
+            design = _design_matrix(mjd, _center(mjd, filled), seasonal, half_seasonal, offsets_mjd)[0]
+            names = _parameter_names(seasonal, half_seasonal, n_station_offsets[0])
+            # offsets out of the serie aren't estimated
+            used = np.concatenate([np.ones(design.shape[1] - offsets_mjd.shape[1], dtype=bool),
+                                   np.isfinite(offsets_mjd[0])])
+            for j, component in enumerate(components):
+                valid = np.isfinite(values[0, j])
+                tasks.append((mjd[0, valid], values[0, j, valid], design[valid][:, used],
+                              [name for name, flag in zip(names, used) if flag]))
+                keys.append((station, component, names))
+
+    if workers == 1:
+        results = [_noise_worker(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_noise_worker, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    output = {station: {} for station in series}
+    for (station, component, names), result in zip(keys, results):
+        # unused offsets are NaN in the order of names
+        output[station][component] = {}
+        for name in names:
+            output[station][component][name] = result.get(name, np.nan)
+            output[station][component][f"{name}_sigma"] = result.get(f"{name}_sigma", np.nan)
+        for key, value in result.items():
+            output[station][component].setdefault(key, value)
+    return output
+
+
+def _window_difference(mjd: np.ndarray, values: np.ndarray, window: float,
+                       min_epochs: int) -> np.ndarray:
+    """Difference of means of values in [t + 0, t + window) and [t - window, t) for every epoch t by cumulative sums.
+    values (components, epochs). NaN where one of windows has less than min_epochs epochs."""
+    valid = np.isfinite(values)
+    sums = np.concatenate([np.zeros((len(values), 1)), np.cumsum(np.where(valid, values, 0), axis=-1)], axis=-1)
+    counts = np.concatenate([np.zeros((len(values), 1)), np.cumsum(valid, axis=-1)], axis=-1)
+    current = np.arange(len(mjd))
+    lo = np.searchsorted(mjd, mjd - window, side="left")
+    hi = np.searchsorted(mjd, mjd + window, side="left")
+
+    count_left, count_right = counts[:, current] - counts[:, lo], counts[:, hi] - counts[:, current]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        difference = ((sums[:, hi] - sums[:, current]) / count_right
+                      - (sums[:, current] - sums[:, lo]) / count_left)
+    return np.where((count_left >= min_epochs) & (count_right >= min_epochs), difference, np.nan)
+
+
+@typechecked
+def detect_offsets(series: dict[str, dict[str, np.ndarray]],
+                   components: tuple[str, ...] = ("e", "n", "u"),
+                   window: float = 30.0,
+                   threshold: float = 5.0,
+                   min_epochs: int = 10,
+                   seasonal: bool = True,
+                   half_seasonal: bool = False) -> dict[str, np.ndarray]:
+    """Detect offsets (steps) in time series of stations, e.g. from changes of equipment or earthquakes.
+    The trend and seasonal signals are removed by least squares (as in estimate_trend, all stations at once).
+    Then for every epoch the mean of residuals in the window after the epoch is compared with the mean
+    in the window before it. The difference is normalized by its own robust scale (MAD over the serie), so
+    colored noise doesn't produce false steps as easy as with the formal errors. The score of an epoch is
+    the norm of the normalized differences of all components. Epochs with the score greater than threshold,
+    which are the maximum within the window, are offsets.
+    The cost is O(n log n) for the serie of n epochs by cumulative sums.
+
+    Args:
+        series (dict[str, dict[str, np.ndarray]]): Time series of stations in columnar mode,
+            e.g. from remove_outliers. Each serie must have key "time" (datetime64 or MJD). NaN are skipped.
+        components (tuple[str, ...], optional): Components to check. Defaults to ("e", "n", "u").
+        window (float, optional): Length of windows before and after the epoch (days). Defaults to 30.0.
+        threshold (float, optional): Minimum score of the offset. Defaults to 5.0.
+        min_epochs (int, optional): Minimum number of epochs in every window. Defaults to 10.
+        seasonal (bool, optional): Remove the annual signal. Defaults to True.
+        half_seasonal (bool, optional): Remove the semi-annual signal. Defaults to False.
+
+    Raises:
+        ValueError: Window must be positive.
+        ValueError: Threshold must be positive.
+        ValueError: Component {component} is not found in time serie of station {station}.
+
+    Returns:
+        dict[str, np.ndarray]: Epochs of offsets for every station (the first epoch after the step, in the type of
+            "time" of the serie). It can be passed as offsets to estimate_trend and estimate_noise.
+
+    Examples:
+        >>> cleaned, outliers = remove_outliers(enu)
+        >>> offsets = detect_offsets(cleaned)
+        >>> offsets["NSK1"]
+        array(['2021-05-01T00:00:00.000000000'], dtype='datetime64[ns]')
+        >>> result = estimate_trend(cleaned, offsets=offsets)
+    """
+    if window <= 0:
+        raise ValueError("Window must be positive.")
+    if threshold <= 0:
+        raise ValueError("Threshold must be positive.")
+
+    output = {}
+    for stations in _iter_blocks(series, components):
+        mjd, values, filled = _stack_series([series[station] for station in stations], components)
+        design = _design_matrix(mjd, _center(mjd, filled), seasonal, half_seasonal) * filled[..., None]
+        _, _, residuals = _solve(design, values, np.isfinite(values))
+
+        for i, station in enumerate(stations):
+            size = len(series[station]["time"])
+            difference = _window_difference(mjd[i, :size], residuals[i, :, :size], window, min_epochs)
+            median, = _nanquantiles(difference, (0.5,))
+            scale, = _nanquantiles(np.abs(difference - median), (0.5,))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                score = np.sqrt(np.nansum(((difference - median) / (1.4826 * scale)) ** 2, axis=0))
+
+            # the step raises the score of all epochs around it, keep the maxima
+            epochs = []
+            for candidate in np.argsort(-score):
+                if not score[candidate] > threshold:
+                    break
+                if all(abs(mjd[i, candidate] - mjd[i, epoch]) >= window for epoch in epochs):
+                    epochs.append(candidate)
+            output[station] = series[station]["time"][np.sort(np.array(epochs, dtype=np.int64))]
+
+    return {station: output[station] for station in series}
+
+
+def _network_residuals(series: dict[str, dict[str, np.ndarray]], components: tuple[str, ...], seasonal: bool,
+                       half_seasonal: bool, offsets: dict[str, np.ndarray]) -> tuple[np.ndarray, list[np.ndarray], np.ndarray]:
+    """Residuals of trend, seasonal signals and offsets aligned on the union of epochs of all stations.
+
+    Returns:
+        epochs (in the type of "time"), positions of epochs of every station in epochs,
+        residuals (components, stations, epochs).
+    """
+    stations = list(series)
+    times = [series[station]["time"] for station in stations]
+    epochs = np.unique(np.concatenate(times)) if times else np.zeros(0)
+    positions = [np.searchsorted(epochs, time) for time in times]
+    residuals = np.full((len(components), len(stations), len(epochs)), np.nan)
+
+    order = {station: i for i, station in enumerate(stations)}
+    for block in _iter_blocks(series, components):
+        mjd, values, filled = _stack_series([series[station] for station in block], components)
+        offsets_mjd, _ = _stack_offsets(offsets, block, mjd, filled)
+        design = _design_matrix(mjd, _center(mjd, filled), seasonal, half_seasonal, offsets_mjd) * filled[..., None]
+        _, _, block_residuals = _solve(design, values, np.isfinite(values))
+        for i, station in enumerate(block):
+            k = order[station]
+            residuals[:, k, positions[k]] = block_residuals[i, :, :len(positions[k])]
+    return epochs, positions, residuals
+
+
+def _stacking(residuals: np.ndarray, min_stations: int) -> tuple[np.ndarray, np.ndarray]:
+    """Weighted stacking (Wdowinski et al. 1997), weights are 1 / variance of residuals of stations."""
+    valid = np.isfinite(residuals)
+    filled = np.where(valid, residuals, 0)
+    count = valid.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = filled.sum(axis=1) / count
+        weights = count / np.sum(np.where(valid, residuals - mean[:, None], 0) ** 2, axis=1)
+    weights = np.where(np.isfinite(weights), weights, 0)
+    mode = np.full(residuals.shape[1], np.nan)
+    for start in range(0, residuals.shape[1], _EPOCH_BLOCK):
+        block = slice(start, start + _EPOCH_BLOCK)
+        block_valid = valid[:, block] & (weights[:, None] > 0)
+        weights_sum = (block_valid * weights[:, None]).sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mode[block] = np.where(block_valid, filled[:, block], 0).T @ weights / weights_sum
+        mode[block][block_valid.sum(axis=0) < min_stations] = np.nan
+    return mode[:, None], np.ones((residuals.shape[0], 1))
+
+
+def _pca(residuals: np.ndarray, n_modes: int, min_stations: int) -> tuple[np.ndarray, np.ndarray]:
+    """PCA (Dong et al. 2006) with missing epochs. The covariance of stations is accumulated by blocks of epochs
+    over common epochs of every pair. Principal components are fitted at every epoch to available stations."""
+    valid = np.isfinite(residuals)
+    filled = np.where(valid, residuals, 0)
+    products = np.zeros((residuals.shape[0], residuals.shape[0]))
+    counts = np.zeros_like(products)
+    for start in range(0, residuals.shape[1], _EPOCH_BLOCK):
+        block = slice(start, start + _EPOCH_BLOCK)
+        products += filled[:, block] @ filled[:, block].T
+        counts += valid[:, block].astype(np.float64) @ valid[:, block].T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = np.where(counts > 0, products / counts, 0)
+
+    _, vectors = np.linalg.eigh(covariance)
+    response = vectors[:, ::-1][:, :n_modes]
+    response *= np.where(response.sum(axis=0) < 0, -1, 1)
+
+    modes = np.full((residuals.shape[1], n_modes), np.nan)
+    outer = (response[:, :, None] * response[:, None, :]).reshape(len(response), -1)
+    for start in range(0, residuals.shape[1], _EPOCH_BLOCK):
+        block = slice(start, start + _EPOCH_BLOCK)
+        normal = (valid[:, block].T.astype(np.float64) @ outer).reshape(-1, n_modes, n_modes)
+        rhs = filled[:, block].T @ response
+        enough = valid[:, block].sum(axis=0) >= max(min_stations, n_modes)
+        block_modes = np.full((normal.shape[0], n_modes), np.nan)
+        if enough.any():
+            block_modes[enough] = np.linalg.solve(normal[enough], rhs[enough][..., None])[..., 0]
+        modes[block] = block_modes
+    return modes, response
+
+
+@typechecked
+def filter_common_mode(series: dict[str, dict[str, np.ndarray]],
+                       components: tuple[str, ...] = ("e", "n", "u"),
+                       method: str = "stacking",
+                       n_modes: int = 1,
+                       min_stations: int = 3,
+                       seasonal: bool = True,
+                       half_seasonal: bool = False,
+                       offsets: dict[str, np.ndarray] | None = None
+                       ) -> tuple[dict[str, dict[str, np.ndarray]], dict[str, np.ndarray]]:
+    """Estimate and remove the common-mode error of the network of stations.
+    Series are aligned on the union of their epochs, the trend, seasonal signals and offsets are removed by
+    least squares (as in estimate_trend) and the common mode is estimated from residuals:
+
+    - stacking: weighted mean of residuals of all stations at every epoch (Wdowinski et al. 1997),
+      weights are 1 / variance of residuals of station;
+    - pca: the first n_modes principal components of the covariance of residuals (Dong et al. 2006).
+      The covariance is computed over common epochs of every pair of stations, principal components
+      are fitted at every epoch to available stations, so missing epochs are allowed.
+
+    Matrices are accumulated by blocks of epochs, so memory is O(stations^2 + stations * epochs).
+
+    Args:
+        series (dict[str, dict[str, np.ndarray]]): Time series of stations in columnar mode,
+            e.g. from remove_outliers. Each serie must have key "time" (datetime64 or MJD). NaN are skipped.
+        components (tuple[str, ...], optional): Components to filter. Defaults to ("e", "n", "u").
+        method (str, optional): "stacking" or "pca". Defaults to "stacking".
+        n_modes (int, optional): Number of principal components for pca. Defaults to 1.
+        min_stations (int, optional): Minimum number of stations at the epoch to estimate the common mode.
+            Epochs with fewer stations aren't filtered. Defaults to 3.
+        seasonal (bool, optional): Remove the annual signal before the estimation. Defaults to True.
+        half_seasonal (bool, optional): Remove the semi-annual signal before the estimation. Defaults to False.
+        offsets (dict[str, np.ndarray] | None, optional): Epochs of offsets for stations, see estimate_trend.
+            Defaults to None.
+
+    Raises:
+        ValueError: Method must be stacking or pca.
+        ValueError: Number of modes must be positive.
+        ValueError: Component {component} is not found in time serie of station {station}.
+
+    Returns:
+        tuple[dict[str, dict[str, np.ndarray]], dict[str, np.ndarray]]: The first dictionary is filtered time series.
+            The second dictionary is the common mode: "time" (union of epochs), "stations" and for every component
+            "{component}_modes" (epochs, n_modes) and "{component}_response" (stations, n_modes).
+            The common mode of the station is response @ modes.T. It's NaN at epochs with few stations.
+
+    Examples:
+        >>> cleaned, outliers = remove_outliers(enu)
+        >>> filtered, common_mode = filter_common_mode(cleaned, method="pca", n_modes=2)
+        >>> result = estimate_noise(filtered, workers=8)
+    """
+    if method not in ("stacking", "pca"):
+        raise ValueError("Method must be stacking or pca.")
+    if n_modes <= 0:
+        raise ValueError("Number of modes must be positive.")
+
+    epochs, positions, residuals = _network_residuals(series, components, seasonal, half_seasonal, offsets or {})
+
+    stations = list(series)
+    filtered = {station: dict(data) for station, data in series.items()}
+    common_mode = {"time": epochs, "stations": np.array(stations)}
+    for j, component in enumerate(components):
+        if method == "stacking":
+            modes, response = _stacking(residuals[j], min_stations)
+        else:
+            modes, response = _pca(residuals[j], n_modes, min_stations)
+        common_mode[f"{component}_modes"] = modes
+        common_mode[f"{component}_response"] = response
+
+        for k, station in enumerate(stations):
+            signal = modes[positions[k]] @ response[k]
+            filtered[station][component] = series[station][component] - np.where(np.isfinite(signal), signal, 0)
+    return filtered, common_mode
+
+
+@typechecked
+def sidereal_filter(series: dict[str, dict[str, np.ndarray]],
+                    components: tuple[str, ...] = ("e", "n", "u"),
+                    n_days: int = 1,
+                    period: float = 86154.0) -> tuple[dict[str, dict[str, np.ndarray]], dict[str, dict[str, np.ndarray]]]:
+    """Sidereal filtering of high-rate kinematic time series (e.g. 1 Hz solutions of RtkLibPost).
+    Multipath repeats with the period of GPS constellation (about 86154 s). The template of the epoch is
+    the mean of values at the same epoch of N previous periods, after the mean of every period is removed.
+    The template is subtracted from values, so the daily position is kept.
+    Epochs of previous periods are aligned by binary search on the time arrays, there is no loop over epochs.
+
+    Args:
+        series (dict[str, dict[str, np.ndarray]]): Time series of stations in columnar mode sorted by time,
+            e.g. from assemble_station_series. Each serie must have key "time" (datetime64). NaN are skipped.
+        components (tuple[str, ...], optional): Components to filter. Defaults to ("e", "n", "u").
+        n_days (int, optional): Number of previous periods in the template. Defaults to 1.
+        period (float, optional): Repeat period (s). Defaults to 86154.0.
+
+    Raises:
+        ValueError: Number of days must be positive.
+        ValueError: Period must be positive.
+        ValueError: Component {component} is not found in time serie of station {station}.
+
+    Returns:
+        tuple[dict[str, dict[str, np.ndarray]], dict[str, dict[str, np.ndarray]]]: The first dictionary is
+            filtered time series. The second dictionary is templates of stations with keys "time" and components.
+            The template is NaN at epochs without previous periods, these epochs aren't changed
+            (e.g. the first day of the serie).
+
+    Examples:
+        >>> series, errors = assemble_station_series("/path/to/dir_pos_1hz")
+        >>> enu = {station: series2enu(data, ref[station]) for station, data in series.items()}
+        >>> filtered, templates = sidereal_filter(enu, n_days=3)
+    """
+    if n_days <= 0:
+        raise ValueError("Number of days must be positive.")
+    if period <= 0:
+        raise ValueError("Period must be positive.")
+    _iter_blocks(series, components)
+
+    filtered, templates = {}, {}
+    period_ns = int(round(period * 1e9))
+    for station, data in series.items():
+        time = data["time"].astype("datetime64[ns]").astype(np.int64)
+        values = np.array([data[component] for component in components], dtype=np.float64).reshape(len(components), -1)
+        valid = np.isfinite(values)
+        filled = np.where(valid, values, 0)
+
+        filtered[station] = dict(data)
+        templates[station] = {"time": data["time"]}
+        if len(time) == 0:
+            templates[station].update({component: values[j] for j, component in enumerate(components)})
+            continue
+
+        # remove the mean of every period
+        periods = (time - time[0]) // period_ns
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.array([np.bincount(periods, weights=row) / np.bincount(periods, weights=mask)
+                              for row, mask in zip(filled, valid)]).reshape(len(components), -1)
+        residuals = values - means[:, periods]
+
+        tolerance = np.median(np.diff(time)) // 2 if len(time) > 1 else 0
+        sums = np.zeros_like(values)
+        counts = np.zeros_like(values)
+        for day in range(1, n_days + 1):
+            target = time - day * period_ns
+            right = np.minimum(np.searchsorted(time, target), len(time) - 1)
+            left = np.maximum(right - 1, 0)
+            nearest = np.where(np.abs(time[left] - target) < np.abs(time[right] - target), left, right)
+            previous = residuals[:, nearest]
+            found = (np.abs(time[nearest] - target) <= tolerance) & np.isfinite(previous)
+            sums += np.where(found, previous, 0)
+            counts += found
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            template = sums / counts
+        for j, component in enumerate(components):
+            filtered[station][component] = values[j] - np.where(np.isfinite(template[j]), template[j], 0)
+            templates[station][component] = template[j]
+    return filtered, templates
@@ -1,65 +1,229 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import TextIO
 from typeguard import typechecked
 
 
+@dataclass
+class RinexHeader:
+    """Header of RINEX 2 or 3 file. Fields which aren't in the header are empty or None.
+
+    Attributes:
+        version (str): Version of RINEX, e.g. "3.04".
+        file_type (str): Type of the file, e.g. "O" (observation), "N" (navigation).
+        system (str): Satellite system of the file, e.g. "M" (mixed), "G".
+        marker_name (str | None): Name of the marker, None if the header has no MARKER NAME.
+        marker_number (str): Number of the marker.
+        receiver_number (str): Serial number of the receiver.
+        receiver_type (str): Type of the receiver.
+        receiver_version (str): Firmware version of the receiver.
+        antenna_number (str): Serial number of the antenna.
+        antenna_type (str): Type of the antenna and the radome.
+        approx_position (tuple[float, float, float] | None): Approximate position XYZ of the marker (m).
+        interval (float | None): Observation interval (s).
+        time_first_obs (datetime | None): Time of the first observation.
+        time_last_obs (datetime | None): Time of the last observation.
+        time_system (str): Time system of the first observation, e.g. "GPS".
+        obs_types (dict[str, list[str]]): Types of observations by satellite system, e.g. {"G": ["C1C", "L1C"]}.
+            RINEX 2 has one list, its key is the satellite system of the file.
+        invalid (dict[str, str]): Values of the header lines which can't be converted by their labels,
+            e.g. {"INTERVAL": ""}. These fields are None.
+    """
+    version: str = ""
+    file_type: str = ""
+    system: str = ""
+    marker_name: str | None = None
+    marker_number: str = ""
+    receiver_number: str = ""
+    receiver_type: str = ""
+    receiver_version: str = ""
+    antenna_number: str = ""
+    antenna_type: str = ""
+    approx_position: tuple[float, float, float] | None = None
+    interval: float | None = None
+    time_first_obs: datetime | None = None
+    time_last_obs: datetime | None = None
+    time_system: str = ""
+    obs_types: dict[str, list[str]] = field(default_factory=dict)
+    invalid: dict[str, str] = field(default_factory=dict)
+
+
+def _parse_header_time(value: str) -> datetime:
+    fields = value.split()
+    if len(fields) < 6:
+        raise ValueError(f"Time {value.strip()} is incomplete.")
+    year, month, day, hour, minute, second = fields[:6]
+    return datetime(int(year), int(month), int(day), int(hour), int(minute)) + timedelta(seconds=float(second))
+
+
+@typechecked
+def parse_rinex_header(f: TextIO) -> tuple[RinexHeader, bool]:
+    """This function reads the header of RINEX 2 or 3 file from the open file, e.g. to read the first records
+    after the header. The file stays at the first line after END OF HEADER.
+
+    Args:
+        f (TextIO): RINEX file opened in text mode at its first line.
+
+    Raises:
+        ValueError: Unknown version rinex {version}.
+
+    Returns:
+        tuple[RinexHeader, bool]: Header of the file and False if the file has no END OF HEADER.
+            Values which can't be converted are kept in RinexHeader.invalid, so other fields can still be used.
+
+    Examples:
+        >>> with open("/path/to/brdc0010.22n", 'r', encoding="utf-8") as f:
+        ...     header, is_end = parse_rinex_header(f)
+        ...     first_record = f.readline()
+    """
+    header = RinexHeader()
+    obs_system = ""
+    for line in f:
+        value, label = line[:60], line[60:].strip()
+        if label == "END OF HEADER":
+            return header, True
+
+        if label == "RINEX VERSION / TYPE":
+            header.version = (value.split() or [""])[0]
+            if not (header.version.startswith("2") or header.version.startswith("3")):
+                raise ValueError(f"Unknown version rinex {header.version}")
+            header.file_type = value[20:21].strip()
+            header.system = value[40:41].strip()
+        elif label == "MARKER NAME":
+            header.marker_name = value.strip()
+        elif label == "MARKER NUMBER":
+            header.marker_number = value.strip()
+        elif label == "REC # / TYPE / VERS":
+            header.receiver_number = value[:20].strip()
+            header.receiver_type = value[20:40].strip()
+            header.receiver_version = value[40:60].strip()
+        elif label == "ANT # / TYPE":
+            header.antenna_number = value[:20].strip()
+            header.antenna_type = value[20:40].strip()
+        elif label in ("APPROX POSITION XYZ", "INTERVAL", "TIME OF FIRST OBS", "TIME OF LAST OBS"):
+            try:
+                if label == "APPROX POSITION XYZ":
+                    x, y, z = value.split()[:3]
+                    header.approx_position = (float(x), float(y), float(z))
+                elif label == "INTERVAL":
+                    header.interval = float((value.split() or [""])[0])
+                elif label == "TIME OF FIRST OBS":
+                    header.time_first_obs = _parse_header_time(value)
+                    header.time_system = value[48:51].strip()
+                else:
+                    header.time_last_obs = _parse_header_time(value)
+            except ValueError:
+                header.invalid[label] = value.strip()
+        elif label == "SYS / # / OBS TYPES":
+            # continuation lines have no system and number of types
+            if value[:1].strip():
+                obs_system = value[:1]
+                header.obs_types[obs_system] = []
+            header.obs_types[obs_system] += value[6:].split()
+        elif label == "# / TYPES OF OBSERV":
+            header.obs_types.setdefault(header.system or "G", []).extend(value[6:].split())
+    return header, False
+
+
+@typechecked
+def read_rinex_header(file: str) -> RinexHeader:
+    """This function reads the header of RINEX 2 or 3 file. Only lines up to END OF HEADER are read,
+    so the size of the file doesn't matter.
+
+    Args:
+        file (str): Path to RINEX file.
+
+    Raises:
+        ValueError: Unknown version rinex {version}.
+
+    Returns:
+        RinexHeader: Header of the file.
+
+    Examples:
+        >>> header = read_rinex_header("/path/to/NOVM0010.22o")
+        >>> header.marker_name, header.time_first_obs
+        ('NOVM', datetime.datetime(2022, 1, 1, 0, 0))
+    """
+    with open(file, 'r', encoding="utf-8") as f:
+        header, _ = parse_rinex_header(f)
+    return header
+
+
+@typechecked
+def get_start_date(header: RinexHeader) -> str:
+    """This function returns the date of the first observation of the header.
+
+    Args:
+        header (RinexHeader): Header of observation file (see read_rinex_header).
+
+    Raises:
+        ValueError: Value '{value}' of TIME OF FIRST OBS can't be converted.
+
+    Returns:
+        str: Date as "YYYY-MM-DD" or "" if the header has no TIME OF FIRST OBS.
+
+    Examples:
+        >>> get_start_date(read_rinex_header("/path/to/NOVM0010.22o"))
+        '2022-01-01'
+    """
+    if "TIME OF FIRST OBS" in header.invalid:
+        raise ValueError(f"Value '{header.invalid['TIME OF FIRST OBS']}' of TIME OF FIRST OBS can't be converted.")
+    if header.time_first_obs is None:
+        return ""
+    return header.time_first_obs.strftime("%Y-%m-%d")
+
+
+@typechecked
+def get_marker(header: RinexHeader, file: str) -> str:
+    """This function returns the marker name of the header.
+
+    Args:
+        header (RinexHeader): Header of observation file (see read_rinex_header).
+        file (str): Path to the file, its name is used if the marker name is empty.
+
+    Returns:
+        str: The first word of the marker name, the name of the file if MARKER NAME is empty
+            or "" if the header has no MARKER NAME.
+
+    Examples:
+        >>> get_marker(read_rinex_header("/path/to/NOVM0010.22o"), "/path/to/NOVM0010.22o")
+        'NOVM'
+    """
+    if header.marker_name is None:
+        return ""
+    if header.marker_name == "":
+        return Path(file).name
+    return header.marker_name.split()[0]
+
+
 @typechecked
 def get_start_date_from_nav(file_nav: str) -> str:
-    date_nav: list[str] = []
     with open(file_nav, 'r', encoding="utf-8") as f_nav:
-        data = f_nav.readlines()
-        for i, line in enumerate(data):
-            if 'RINEX VERSION' in line:
-                rinex_v = line.split()[0]
-                if not (rinex_v.startswith("2") or rinex_v.startswith("3")):
-                    raise Exception(f"Unknown version rinex {rinex_v}")
-
-            if 'END OF HEADER' in line:
-                date_nav = data[i + 1].split()[1:4]
-
-                if len(date_nav[0]) == 2:
-                    # for rinex v1,2
-                    if 80 <= int(date_nav[0]) <= 99:
-                        date_nav[0] = "19" + date_nav[0]
-                    # for rinex v3
-                    elif 0 <= int(date_nav[0]) <= 79:
-                        date_nav[0] = "20" + date_nav[0]
-
-                date_nav[1] = date_nav[1].zfill(2)
-                date_nav[2] = date_nav[2].zfill(2)
-                break
+        _, is_end = parse_rinex_header(f_nav)
+        if not is_end:
+            return ""
+        # the date of the first record is after the satellite number
+        date_nav = f_nav.readline().split()[1:4]
+
+    if len(date_nav[0]) == 2:
+        # for rinex v1,2
+        if 80 <= int(date_nav[0]) <= 99:
+            date_nav[0] = "19" + date_nav[0]
+        # for rinex v3
+        elif 0 <= int(date_nav[0]) <= 79:
+            date_nav[0] = "20" + date_nav[0]
+
+    date_nav[1] = date_nav[1].zfill(2)
+    date_nav[2] = date_nav[2].zfill(2)
     return "-".join(date_nav)
 
 
 @typechecked
 def get_start_date_from_obs(file_obs: str) -> str:
-    date_obs = ""
-    with open(file_obs, 'r', encoding="utf-8") as f_obs:
-        for line_obs in f_obs:
-            if 'RINEX VERSION' in line_obs:
-                rinex_v = line_obs.split()[0]
-                if not (rinex_v.startswith("2") or rinex_v.startswith("3")):
-                    raise Exception(f"Unknown version rinex {rinex_v}")
-
-            if 'TIME OF FIRST OBS' in line_obs:
-                date_obs = line_obs.split()[:3]
-                date_obs[1] = date_obs[1].zfill(2)
-                date_obs[2] = date_obs[2].zfill(2)
-                date_obs = '-'.join(date_obs)
-    return date_obs
+    return get_start_date(read_rinex_header(file_obs))
 
 
 @typechecked
 def get_marker_name(file: str) -> str:
-    marker_name = ""
-    with open(file, 'r', encoding="utf-8") as f:
-        for line_obs in f:
-            if 'RINEX VERSION' in line_obs:
-                rinex_v = line_obs.split()[0]
-                if not (rinex_v.startswith("2") or rinex_v.startswith("3")):
-                    raise Exception(f"Unknown version rinex {rinex_v}")
-
-            if 'MARKER NAME' in line_obs:
-                marker_name = line_obs.split()[0]
-                if marker_name == "MARKER":
-                    marker_name = Path(file).name
-    return marker_name
+    return get_marker(read_rinex_header(file), file)
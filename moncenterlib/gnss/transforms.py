@@ -0,0 +1,285 @@
+"""
+This module is designed for vectorized transformations of coordinates of geodetic time series.
+- Geodetic (llh) <-> ECEF (xyz);
+- ECEF or geodetic -> local ENU displacements relative to a reference point;
+- Rotation of covariances (sd columns of .pos file) into ENU.
+
+All functions work with whole NumPy arrays at once, e.g. columns of parse_pos_file in columnar mode.
+Angles are in decimal degrees, lengths in meters.
+"""
+
+
+import numpy as np
+from typeguard import typechecked
+
+
+# semi-major axis (m) and flattening
+ELLIPSOIDS = {
+    "WGS84": (6378137.0, 1 / 298.257223563),
+    "GRS80": (6378137.0, 1 / 298.257222101)
+}
+
+
+def _get_ellipsoid(ellipsoid: str) -> tuple[float, float]:
+    if ellipsoid not in ELLIPSOIDS:
+        raise ValueError(f"Unknown ellipsoid {ellipsoid}")
+    a, f = ELLIPSOIDS[ellipsoid]
+    return a, f * (2 - f)
+
+
+def _rotation_enu(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Rotation matrices ECEF -> ENU, shape (..., 3, 3)."""
+    sin_lat, cos_lat = np.sin(np.radians(lat)), np.cos(np.radians(lat))
+    sin_lon, cos_lon = np.sin(np.radians(lon)), np.cos(np.radians(lon))
+    zero = np.zeros_like(sin_lat * sin_lon)
+    return np.stack([
+        np.stack([-sin_lon + zero, cos_lon + zero, zero], axis=-1),
+        np.stack([-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat + zero], axis=-1),
+        np.stack([cos_lat * cos_lon, cos_lat * sin_lon, sin_lat + zero], axis=-1)
+    ], axis=-2)
+
+
+def _sd2cov(sd: np.ndarray) -> np.ndarray:
+    """RTKLib writes covariances as sign(c) * sqrt(|c|)."""
+    return np.sign(sd) * sd ** 2
+
+
+def _cov2sd(cov: np.ndarray) -> np.ndarray:
+    return np.sign(cov) * np.sqrt(np.abs(cov))
+
+
+@typechecked
+def llh2xyz(lat: np.ndarray | float,
+            lon: np.ndarray | float,
+            height: np.ndarray | float,
+            ellipsoid: str = "WGS84") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert geodetic coordinates to ECEF.
+
+    Args:
+        lat (np.ndarray | float): Latitude (deg).
+        lon (np.ndarray | float): Longitude (deg).
+        height (np.ndarray | float): Ellipsoidal height (m).
+        ellipsoid (str, optional): Name of ellipsoid from ELLIPSOIDS. Defaults to "WGS84".
+
+    Raises:
+        ValueError: Unknown ellipsoid.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: x, y, z (m).
+
+    Examples:
+        >>> x, y, z = llh2xyz(data["lat"], data["lon"], data["height"])
+    """
+    a, e2 = _get_ellipsoid(ellipsoid)
+    lat, lon = np.radians(lat), np.radians(lon)
+    sin_lat = np.sin(lat)
+    radius = a / np.sqrt(1 - e2 * sin_lat ** 2)
+
+    x = (radius + height) * np.cos(lat) * np.cos(lon)
+    y = (radius + height) * np.cos(lat) * np.sin(lon)
+    z = (radius * (1 - e2) + height) * sin_lat
+    return np.asarray(x), np.asarray(y), np.asarray(z)
+
+
+@typechecked
+def xyz2llh(x: np.ndarray | float,
+            y: np.ndarray | float,
+            z: np.ndarray | float,
+            ellipsoid: str = "WGS84") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert ECEF coordinates to geodetic. The latitude is found by iterations for all points at once.
+
+    Args:
+        x (np.ndarray | float): X (m).
+        y (np.ndarray | float): Y (m).
+        z (np.ndarray | float): Z (m).
+        ellipsoid (str, optional): Name of ellipsoid from ELLIPSOIDS. Defaults to "WGS84".
+
+    Raises:
+        ValueError: Unknown ellipsoid.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Latitude (deg), longitude (deg), ellipsoidal height (m).
+
+    Examples:
+        >>> lat, lon, height = xyz2llh(data["x"], data["y"], data["z"])
+    """
+    a, e2 = _get_ellipsoid(ellipsoid)
+    x, y, z = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), np.asarray(z, dtype=np.float64)
+    p = np.hypot(x, y)
+
+    lat = np.arctan2(z, p * (1 - e2))
+    for _ in range(10):
+        sin_lat = np.sin(lat)
+        radius = a / np.sqrt(1 - e2 * sin_lat ** 2)
+        lat_new = np.arctan2(z + e2 * radius * sin_lat, p)
+        if np.all(np.abs(lat_new - lat) < 1e-14):
+            lat = lat_new
+            break
+        lat = lat_new
+
+    sin_lat = np.sin(lat)
+    radius = a / np.sqrt(1 - e2 * sin_lat ** 2)
+    # the height near the poles is computed by z
+    with np.errstate(divide="ignore", invalid="ignore"):
+        height = np.where(np.abs(np.cos(lat)) > 1e-10,
+                          p / np.cos(lat) - radius,
+                          np.abs(z) - radius * (1 - e2))
+    return np.asarray(np.degrees(lat)), np.asarray(np.degrees(np.arctan2(y, x))), np.asarray(height)
+
+
+@typechecked
+def xyz2enu(x: np.ndarray | float,
+            y: np.ndarray | float,
+            z: np.ndarray | float,
+            ref_xyz: tuple[float, float, float],
+            ellipsoid: str = "WGS84") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert ECEF coordinates to local ENU displacements relative to the reference point.
+
+    Args:
+        x (np.ndarray | float): X (m).
+        y (np.ndarray | float): Y (m).
+        z (np.ndarray | float): Z (m).
+        ref_xyz (tuple[float, float, float]): ECEF coordinates of the reference point (m),
+            e.g. x, y, z from RGSClient.get_station_info.
+        ellipsoid (str, optional): Name of ellipsoid from ELLIPSOIDS. Defaults to "WGS84".
+
+    Raises:
+        ValueError: Unknown ellipsoid.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: East, north, up (m).
+
+    Examples:
+        >>> info = RGSClient("your_api").get_station_info("NSK1")
+        >>> e, n, u = xyz2enu(data["x"], data["y"], data["z"], (info["x"], info["y"], info["z"]))
+    """
+    ref_lat, ref_lon, _ = xyz2llh(*ref_xyz, ellipsoid=ellipsoid)
+    rotation = _rotation_enu(ref_lat, ref_lon)
+    dxyz = np.stack(np.broadcast_arrays(np.asarray(x) - ref_xyz[0],
+                                        np.asarray(y) - ref_xyz[1],
+                                        np.asarray(z) - ref_xyz[2]))
+    e, n, u = np.tensordot(rotation, dxyz, axes=1)
+    return np.asarray(e), np.asarray(n), np.asarray(u)
+
+
+@typechecked
+def llh2enu(lat: np.ndarray | float,
+            lon: np.ndarray | float,
+            height: np.ndarray | float,
+            ref_llh: tuple[float, float, float],
+            ellipsoid: str = "WGS84") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert geodetic coordinates to local ENU displacements relative to the reference point.
+
+    Args:
+        lat (np.ndarray | float): Latitude (deg).
+        lon (np.ndarray | float): Longitude (deg).
+        height (np.ndarray | float): Ellipsoidal height (m).
+        ref_llh (tuple[float, float, float]): Latitude (deg), longitude (deg) and height (m) of the reference point.
+        ellipsoid (str, optional): Name of ellipsoid from ELLIPSOIDS. Defaults to "WGS84".
+
+    Raises:
+        ValueError: Unknown ellipsoid.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: East, north, up (m).
+    """
+    x, y, z = llh2xyz(lat, lon, height, ellipsoid)
+    ref_xyz = tuple(float(value) for value in llh2xyz(*ref_llh, ellipsoid=ellipsoid))
+    return xyz2enu(x, y, z, ref_xyz, ellipsoid)
+
+
+@typechecked
+def sd_xyz2enu(sdx: np.ndarray, sdy: np.ndarray, sdz: np.ndarray,
+               sdxy: np.ndarray, sdyz: np.ndarray, sdzx: np.ndarray,
+               lat: np.ndarray | float, lon: np.ndarray | float) -> dict[str, np.ndarray]:
+    """Rotate the ECEF covariance of .pos file (sdx, sdy, sdz, sdxy, sdyz, sdzx) into ENU.
+    Off-diagonal terms are in RTKLib form sign(c) * sqrt(|c|).
+
+    Args:
+        sdx (np.ndarray): sdx (m).
+        sdy (np.ndarray): sdy (m).
+        sdz (np.ndarray): sdz (m).
+        sdxy (np.ndarray): sdxy (m).
+        sdyz (np.ndarray): sdyz (m).
+        sdzx (np.ndarray): sdzx (m).
+        lat (np.ndarray | float): Latitude of the rotation (deg), a scalar of the reference point or an array.
+        lon (np.ndarray | float): Longitude of the rotation (deg).
+
+    Returns:
+        dict[str, np.ndarray]: Keys "sde", "sdn", "sdu", "sden", "sdnu", "sdue" in the same form.
+    """
+    cxx, cyy, czz = sdx ** 2, sdy ** 2, sdz ** 2
+    cxy, cyz, czx = _sd2cov(sdxy), _sd2cov(sdyz), _sd2cov(sdzx)
+    cov = np.stack([np.stack([cxx, cxy, czx], axis=-1),
+                    np.stack([cxy, cyy, cyz], axis=-1),
+                    np.stack([czx, cyz, czz], axis=-1)], axis=-2)
+
+    rotation = _rotation_enu(np.asarray(lat), np.asarray(lon))
+    cov_enu = rotation @ cov @ np.swapaxes(rotation, -1, -2)
+
+    return {
+        "sde": np.sqrt(cov_enu[..., 0, 0]),
+        "sdn": np.sqrt(cov_enu[..., 1, 1]),
+        "sdu": np.sqrt(cov_enu[..., 2, 2]),
+        "sden": _cov2sd(cov_enu[..., 0, 1]),
+        "sdnu": _cov2sd(cov_enu[..., 1, 2]),
+        "sdue": _cov2sd(cov_enu[..., 2, 0])
+    }
+
+
+@typechecked
+def series2enu(data: dict[str, np.ndarray],
+               ref_xyz: tuple[float, float, float] | dict,
+               ellipsoid: str = "WGS84") -> dict[str, np.ndarray]:
+    """Convert the time serie of parse_pos_file in columnar mode (xyz or llh) into ENU displacements
+    relative to the reference point. sd columns are rotated into ENU too.
+
+    Args:
+        data (dict[str, np.ndarray]): Time serie in columnar mode with "x", "y", "z" or "lat", "lon", "height".
+        ref_xyz (tuple[float, float, float] | dict): ECEF coordinates of the reference point or
+            the dictionary with keys "x", "y", "z" (e.g. from RGSClient.get_station_info).
+        ellipsoid (str, optional): Name of ellipsoid from ELLIPSOIDS. Defaults to "WGS84".
+
+    Raises:
+        ValueError: Unknown ellipsoid.
+        ValueError: Time serie has no xyz or llh coordinates.
+
+    Returns:
+        dict[str, np.ndarray]: Time serie with "e", "n", "u", "sde", "sdn", "sdu", "sden", "sdnu", "sdue"
+            instead of the coordinates and their sd columns. Other columns are kept.
+
+    Examples:
+        >>> header, data = parse_pos_file("/path/to/file.pos", columnar=True)
+        >>> enu = series2enu(data, RGSClient("your_api").get_station_info("NSK1"))
+        >>> enu["u"]
+        array([0.0123, 0.0119, ...])
+    """
+    if isinstance(ref_xyz, dict):
+        ref_xyz = (float(ref_xyz["x"]), float(ref_xyz["y"]), float(ref_xyz["z"]))
+
+    if all(key in data for key in ("x", "y", "z")):
+        e, n, u = xyz2enu(data["x"], data["y"], data["z"], ref_xyz, ellipsoid)
+        ref_lat, ref_lon, _ = xyz2llh(*ref_xyz, ellipsoid=ellipsoid)
+        sd_keys = ("sdx", "sdy", "sdz", "sdxy", "sdyz", "sdzx")
+        sd = sd_xyz2enu(*(data[key] for key in sd_keys), ref_lat, ref_lon) if all(key in data for key in sd_keys) else {}
+        coord_keys = ("x", "y", "z") + sd_keys
+    elif all(key in data for key in ("lat", "lon", "height")):
+        ref_llh = tuple(float(value) for value in xyz2llh(*ref_xyz, ellipsoid=ellipsoid))
+        e, n, u = llh2enu(data["lat"], data["lon"], data["height"], ref_llh, ellipsoid)
+        # sd of llh solution are already in the local frame of the point
+        sd_keys = ("sde", "sdn", "sdu", "sdne", "sdun", "sdeu")
+        sd = {}
+        if all(key in data for key in sd_keys):
+            sd = {"sde": data["sde"], "sdn": data["sdn"], "sdu": data["sdu"],
+                  "sden": data["sdne"], "sdnu": data["sdun"], "sdue": data["sdeu"]}
+        coord_keys = ("lat", "lon", "height") + sd_keys
+    else:
+        raise ValueError("Time serie has no xyz or llh coordinates.")
+
+    output = {"time": data["time"]} if "time" in data else {}
+    output.update({"e": e, "n": n, "u": u})
+    output.update(sd)
+    for key, value in data.items():
+        if key not in output and key not in coord_keys:
+            output[key] = value
+    return output
@@ -0,0 +1,24 @@
+import numpy as np
+
+
+def make_series(days: int,
+                seed: int,
+                start: str = "2020-01-01",
+                step: np.timedelta64 = np.timedelta64(1, "D"),
+                trend: float | tuple = 0.0,
+                annual: float | tuple = 0.0,
+                semiannual: float | tuple = 0.0,
+                noise: float | tuple = 0.002) -> dict[str, np.ndarray]:
+    """Synthetic ENU time serie for tests. Every component is trend * t + annual * sin(2 pi t + i)
+    + semiannual * cos(4 pi t) + white noise, where t is in years from the start and i is the index
+    of the component (e, n, u). Parameters are the same for all components or tuples of 3 values.
+    Noise is drawn for e, n and u in this order."""
+    rng = np.random.default_rng(seed)
+    epochs = np.arange(days)
+    t = epochs * (step / np.timedelta64(1, "D")) / 365.25
+    data = {"time": np.datetime64(start, "ns") + epochs * step}
+    for i, component in enumerate(("e", "n", "u")):
+        a, b, c, sigma = (np.broadcast_to(value, 3)[i] for value in (trend, annual, semiannual, noise))
+        data[component] = (a * t + b * np.sin(2 * np.pi * t + i) + c * np.cos(4 * np.pi * t)
+                           + rng.normal(0, sigma, days))
+    return data
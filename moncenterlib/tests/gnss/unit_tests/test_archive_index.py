@@ -0,0 +1,201 @@
+from datetime import datetime
+import logging
+import os
+import sqlite3
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+import moncenterlib.gnss.archive_index as archive_index
+from moncenterlib.gnss.archive_index import ArchiveIndex
+from moncenterlib.gnss.postprocessing import RtkLibPost
+from moncenterlib.gnss.quality_check import Anubis
+
+
+def header(*lines: tuple[str, str]) -> str:
+    return "".join(f"{value:<60}{label}\n" for value, label in lines + (("", "END OF HEADER"),))
+
+
+def obs(marker: str, day: int) -> str:
+    return header(("     3.04           OBSERVATION DATA    M", "RINEX VERSION / TYPE"),
+                  (marker, "MARKER NAME"),
+                  (f"  2022     1     {day}     0     0    0.0000000     GPS", "TIME OF FIRST OBS"),
+                  (f"  2022     1     {day}    23    59   30.0000000     GPS", "TIME OF LAST OBS")) + \
+        f"> 2022 01 0{day} 00 00  0.0000000  0 20\n"
+
+
+FILES = {
+    "obs/NSK10010.22o": obs("NSK1", 1),
+    "obs/2022/NSK10020.22o": obs("NSK1", 2),
+    "nav/brdc0010.22n": header(("     2.11           N: GPS NAV DATA", "RINEX VERSION / TYPE")) +
+    " 5 22  1  1  0  0  0.0-6.656209006906D-05-1.364242052659D-12 0.000000000000D+00\n",
+    "sp3/igs21906.sp3": "#cP2022  1  1  0  0  0.00000000     288 ORBIT IGS14 HLM  IGS\n"
+    "## 2190 518400.00000000   300.00000000 59580 0.0000000000000\n",
+    "clk/igs21906.clk": header(("     3.00           C", "RINEX VERSION / TYPE"),
+                               ("CLK ANT Z-OFFSET(M): II/IIA 1.023; IIR 0.000", "COMMENT"),
+                               ("GPS week: 2190   Day: 6   MJD: 59580", "COMMENT")),
+    "ionex/codg0010.22i": header(("     1.0            IONOSPHERE MAPS     GPS", "IONEX VERSION / TYPE"),
+                                 ("  2022     1     1     0     0     0", "EPOCH OF FIRST MAP"),
+                                 ("  2022     1     2     0     0     0", "EPOCH OF LAST MAP")),
+    "erp/igs21906.erp": "version 2\n" + "header\n" * 3 + " 59580.50  1\n 59581.50  2\n",
+    "dcb/CAS0MGXRAP_20220010000_01D_01D_DCB.BSX":
+        "%=BIA 1.00 CAS 22:002:00000 IGS 22:001:00000 22:002:00000 R 00000123\n",
+    "obs/readme.txt": "some text\n",
+}
+
+
+class TestArchiveIndex(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "archive")
+        for name, text in FILES.items():
+            path = os.path.join(self.path, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        self.path_db = os.path.join(self.temp_dir.name, "index.sqlite")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_refresh_and_files(self):
+        with ArchiveIndex(self.path_db) as index:
+            self.assertEqual({"added": 9, "changed": 0, "removed": 0, "unchanged": 0}, index.refresh(self.path))
+
+        index = ArchiveIndex(self.path_db)
+        files = {os.path.relpath(row["path"], self.path): row for row in index.files()}
+        self.assertEqual(sorted(FILES), sorted(files))
+
+        row = files["obs/NSK10010.22o"]
+        self.assertEqual(("obs", "3.04", "NSK1"), (row["type"], row["version"], row["marker"]))
+        self.assertEqual((datetime(2022, 1, 1), datetime(2022, 1, 1, 23, 59, 30)), (row["start"], row["end"]))
+        self.assertEqual(len(FILES["obs/NSK10010.22o"]), row["size"])
+
+        self.assertEqual(("nav", "2.11", datetime(2022, 1, 1), None),
+                         tuple(files["nav/brdc0010.22n"][key] for key in ("type", "version", "start", "end")))
+        self.assertEqual(("sp3", datetime(2022, 1, 1), datetime(2022, 1, 1, 23, 55)),
+                         tuple(files["sp3/igs21906.sp3"][key] for key in ("type", "start", "end")))
+        self.assertEqual(("clk", datetime(2022, 1, 1)),
+                         tuple(files["clk/igs21906.clk"][key] for key in ("type", "start")))
+        self.assertEqual(("ionex", datetime(2022, 1, 1), datetime(2022, 1, 2)),
+                         tuple(files["ionex/codg0010.22i"][key] for key in ("type", "start", "end")))
+        self.assertEqual(("erp", datetime(2022, 1, 1, 12), datetime(2022, 1, 2, 12)),
+                         tuple(files["erp/igs21906.erp"][key] for key in ("type", "start", "end")))
+        self.assertEqual(("dcb", datetime(2022, 1, 1), datetime(2022, 1, 2)),
+                         tuple(files["dcb/CAS0MGXRAP_20220010000_01D_01D_DCB.BSX"][key] for key in ("type", "start", "end")))
+        self.assertIsNone(files["obs/readme.txt"]["type"])
+
+        # filters
+        path_obs = os.path.join(self.path, "obs")
+        self.assertEqual(2, len(index.files(path_obs, "obs")))
+        self.assertEqual(1, len(index.files(path_obs, "obs", recursion=False)))
+        self.assertEqual(0, len(index.files(path_obs, "obs", marker="NOVM")))
+        self.assertEqual(["NSK10020.22o"], [os.path.basename(row["path"]) for row in
+                                            index.files(file_type="obs", start=datetime(2022, 1, 2))])
+        self.assertEqual(7, len(index.files(end=datetime(2022, 1, 2))))
+        # "obs2" isn't a subdirectory of "obs"
+        os.makedirs(os.path.join(self.path, "obs2"))
+        with open(os.path.join(self.path, "obs2", "NSK10030.22o"), "w", encoding="utf-8") as f:
+            f.write(obs("NSK1", 3))
+        index.refresh(self.path)
+        self.assertEqual(2, len(index.files(path_obs, "obs")))
+
+    def test_incremental_refresh(self):
+        index = ArchiveIndex(self.path_db)
+        index.refresh(self.path)
+
+        path_changed = os.path.join(self.path, "obs", "NSK10010.22o")
+        with open(path_changed, "w", encoding="utf-8") as f:
+            f.write(obs("NOVM", 1))
+        os.utime(path_changed, ns=(0, 10**18))
+        os.remove(os.path.join(self.path, "nav", "brdc0010.22n"))
+
+        with patch("moncenterlib.gnss.archive_index._read_file_info", wraps=archive_index._read_file_info) as mock_read:
+            result = index.refresh(self.path)
+        self.assertEqual({"added": 0, "changed": 1, "removed": 1, "unchanged": 7}, result)
+        self.assertEqual([path_changed], [args.args[0] for args in mock_read.call_args_list])
+        self.assertEqual(["NOVM"], [row["marker"] for row in index.files(file_type="obs", marker="NOVM")])
+        self.assertEqual([], index.files(file_type="nav"))
+
+        # the refresh of the subdirectory doesn't remove files of other directories
+        result = index.refresh(os.path.join(self.path, "obs"), recursion=False)
+        self.assertEqual({"added": 0, "changed": 0, "removed": 0, "unchanged": 2}, result)
+        self.assertEqual(8, len(index.files()))
+
+    def test_match_files_with_index(self):
+        index = ArchiveIndex(self.path_db)
+        index.refresh(self.path, workers=2)
+
+        path_obs = os.path.join(self.path, "obs")
+        path_nav = os.path.join(self.path, "nav")
+        match_list, no_match = Anubis(False).scan_dirs(path_obs, path_nav, True, index=index)
+        self.assertEqual({"NSK1": [[os.path.join(path_obs, "NSK10010.22o"), os.path.join(path_nav, "brdc0010.22n")]]},
+                         match_list)
+        self.assertEqual({"NSK1": [os.path.join(path_obs, "2022", "NSK10020.22o")]}, no_match)
+
+        input_rnx = {key: os.path.join(self.path, key) for key in ("nav", "sp3", "clk", "ionex", "erp", "dcb")}
+        input_rnx["rover"] = path_obs
+        match_list, no_match = RtkLibPost(False).match_files(input_rnx, index=index)
+        self.assertEqual(["2022-01-01"], list(match_list))
+        self.assertEqual([os.path.join(path_obs, "NSK10010.22o")], match_list["2022-01-01"]["rovers"])
+        self.assertEqual(os.path.join(self.path, "erp", "igs21906.erp"), match_list["2022-01-01"]["erp"])
+        self.assertEqual({"rovers", "erp"}, set(no_match["2022-01-02"]))
+
+    def test_broken_files(self):
+        files = {
+            "obs/NSK10030.22o": header(("     3.04           OBSERVATION DATA    M", "RINEX VERSION / TYPE"),
+                                       ("NSK1", "MARKER NAME")),
+            "sp3/broken.sp3": "#cP2022  1  1\n",
+            "erp/broken.erp": "version\n",
+        }
+        for name, text in files.items():
+            with open(os.path.join(self.path, name), "w", encoding="utf-8") as f:
+                f.write(text)
+        # compressed file
+        with open(os.path.join(self.path, "obs", "NSK10040.22o.gz"), "wb") as f:
+            f.write(b"\x1f\x8b\x08\x00\xff\xfe")
+
+        logger = logging.getLogger("test_archive_index")
+        index = ArchiveIndex(self.path_db, logger)
+        with self.assertLogs(logger, "WARNING") as logs:
+            index.refresh(self.path)
+        self.assertEqual(3, len(logs.output))
+        for name in ("sp3/broken.sp3", "erp/broken.erp", "obs/NSK10040.22o.gz"):
+            self.assertTrue(any(os.path.join(self.path, name) in message for message in logs.output))
+        self.assertEqual([None], [row["type"] for row in index.files() if row["path"].endswith(".gz")])
+
+        # obs file without the date is skipped as in the scan of directories
+        path_obs = os.path.join(self.path, "obs")
+        path_nav = os.path.join(self.path, "nav")
+        self.assertEqual((None, "NSK1"), tuple(row[key] for row in index.files(path_obs, "obs", marker="NSK1")
+                                               if row["path"].endswith("NSK10030.22o") for key in ("start", "marker")))
+        anubis = Anubis(False)
+        result = anubis.scan_dirs(path_obs, path_nav, False, index=index)
+        self.assertEqual(result, anubis.scan_dirs(path_obs, path_nav, False))
+        self.assertEqual({"NSK1": [os.path.join(path_obs, "NSK10010.22o")]}, {key: [match[0] for match in value]
+                                                                            for key, value in result[0].items()})
+        self.assertEqual({}, result[1])
+
+    def test_errors(self):
+        index = ArchiveIndex(self.path_db)
+        with self.assertRaises(ValueError) as e:
+            index.files(file_type="rinex")
+        self.assertEqual("Unknown type of file rinex.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            index.refresh(self.path, workers=0)
+        self.assertEqual("Number of workers must be positive.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            index.refresh(os.path.join(self.path, "none"))
+        self.assertEqual(f"Path '{os.path.join(self.path, 'none')}' to dir is strange.", str(e.exception))
+        index.close()
+
+        with sqlite3.connect(self.path_db) as db:
+            db.execute("PRAGMA user_version = 2")
+        with self.assertRaises(ValueError) as e:
+            ArchiveIndex(self.path_db)
+        self.assertEqual("Version of the index isn't supported.", str(e.exception))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import tempfile
+from unittest import TestCase, main
+import numpy as np
+from moncenterlib.gnss.downsampling import (build_pyramid, downsample_lttb, downsample_minmax, get_pos_pyramid,
+                                            select_pyramid_level)
+from moncenterlib.tests.gnss.unit_tests.synthetic import make_series
+
+
+ROW_SD = "   0.0123   0.0098   0.0234   0.0012  -0.0023   0.0034   0.00  999.9\n"
+
+
+def lttb_loop(x: np.ndarray, y: np.ndarray, n_points: int) -> list[int]:
+    """Reference LTTB with the loop over buckets as in the paper."""
+    every = (len(x) - 2) / (n_points - 2)
+    selected = [0]
+    for i in range(n_points - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        if i == n_points - 3:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx, cy = x[hi:int((i + 2) * every) + 1].mean(), y[hi:int((i + 2) * every) + 1].mean()
+        a = selected[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        selected.append(lo + int(np.argmax(area)))
+    return selected + [len(x) - 1]
+
+
+def make_pos_series(n: int, seed: int = 1) -> dict[str, np.ndarray]:
+    """Epochs every second, height is the random walk of the noise of make_series."""
+    data = make_series(n, seed, start="2022-01-01", step=np.timedelta64(1, "s"), noise=0.001)
+    return {"time": data["time"], "height": 150 + np.cumsum(data["u"]),
+            "Q": np.random.default_rng(seed).integers(1, 3, n).astype(np.int32)}
+
+
+class TestDownsampling(TestCase):
+    def test_lttb(self):
+        data = make_pos_series(10007)
+        data["height"][[5, 50]] = np.nan
+        small = downsample_lttb(data, 500)
+        self.assertEqual(list(small), ["time", "height", "Q"])
+        self.assertEqual(len(small["time"]), 500)
+
+        valid = np.isfinite(data["height"])
+        x = (data["time"][valid] - data["time"][0]) / np.timedelta64(1, "s")
+        exp = np.flatnonzero(valid)[lttb_loop(x, data["height"][valid], 500)]
+        np.testing.assert_array_equal(small["time"], data["time"][exp])
+        np.testing.assert_array_equal(small["Q"], data["Q"][exp])
+
+        # smooth curves change the choice of many buckets after the first guess
+        x = np.arange(20000.0)
+        data = {"time": x, "height": np.sin(x / 300)}
+        np.testing.assert_array_equal(downsample_lttb(data, 3000)["time"], x[lttb_loop(x, data["height"], 3000)])
+
+        # short series are returned as is, MJD time is supported
+        data = {"time": 59580 + np.arange(10.0), "height": np.arange(10.0)}
+        np.testing.assert_array_equal(downsample_lttb(data, 100)["height"], data["height"])
+
+    def test_minmax(self):
+        data = make_pos_series(100000)
+        data["height"][77777] = 200
+        small = downsample_minmax(data, 1000)
+        self.assertLessEqual(len(small["time"]), 1000)
+        self.assertGreater(len(small["time"]), 900)
+        self.assertTrue(np.all(np.diff(small["time"]) > np.timedelta64(0)))
+        self.assertIn(np.datetime64("2022-01-01", "ns") + np.timedelta64(77777, "s"), small["time"])
+        self.assertEqual(np.nanmin(data["height"]), small["height"].min())
+
+        # every bin has its minimum and maximum
+        bins = np.arange(100000) // 200
+        for i in (0, 123, 499):
+            self.assertIn(data["height"][bins == i].max(), small["height"])
+            self.assertIn(data["height"][bins == i].min(), small["height"])
+
+    def test_pyramid(self):
+        data = make_pos_series(100000)
+        pyramid = build_pyramid(data, "height", "lttb", factor=4, min_points=1000)
+        self.assertEqual([25000, 6250, 1562], [len(level["time"]) for level in pyramid])
+        for level in pyramid:
+            np.testing.assert_array_equal(level["height"], data["height"][level["index"]])
+
+        level = select_pyramid_level(pyramid, 2000)
+        self.assertEqual(1562, len(level["time"]))
+        start = np.datetime64("2022-01-01T01:00", "ns")
+        level = select_pyramid_level(pyramid, 2000, start=start, end=start + np.timedelta64(3600, "s"))
+        self.assertEqual(len(level["time"]), np.sum((pyramid[0]["time"] >= start) &
+                                                    (pyramid[0]["time"] < start + np.timedelta64(3600, "s"))))
+        self.assertTrue(np.all(level["time"] >= start))
+        self.assertLessEqual(len(select_pyramid_level(pyramid, 100)["time"]), 100)
+
+        self.assertEqual([], build_pyramid(data, min_points=30000))
+
+    def test_pos_pyramid(self):
+        data = make_pos_series(5000)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "file.pos")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("%  GPST                  latitude(deg) longitude(deg)  height(m)   Q  ns   sdn(m)   sde(m)   sdu(m)"
+                        "  sdne(m)  sdeu(m)  sdun(m) age(s)  ratio\n")
+                for time, height in zip(data["time"], data["height"]):
+                    text_time = np.datetime_as_string(time, unit="ms").replace("-", "/").replace("T", " ")
+                    f.write(f"{text_time}   55.012345678   82.123456789 {height:10.4f}   1   8" + ROW_SD)
+
+            pyramid = get_pos_pyramid(path, min_points=100)
+            self.assertTrue(os.path.exists(os.path.join(path + ".pyramid", "meta.json")))
+            self.assertEqual([1250, 312], [len(level["time"]) for level in pyramid])
+
+            cached = get_pos_pyramid(path, min_points=100)
+            self.assertIsInstance(cached[0]["height"], np.memmap)
+            for level, level_cached in zip(pyramid, cached):
+                for key in level:
+                    np.testing.assert_array_equal(level[key], level_cached[key])
+
+            # the second pyramid is kept together with the first one
+            get_pos_pyramid(path, "lat", "lttb", min_points=100)
+            self.assertIsInstance(get_pos_pyramid(path, min_points=100)[0]["height"], np.memmap)
+
+            # the pyramid is rebuilt after the change of the file
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("2022/01/01 02:00:00.000   55.012345678   82.123456789   0.0000   1   8" + ROW_SD)
+            pyramid = get_pos_pyramid(path, min_points=100)
+            self.assertNotIsInstance(pyramid[0]["height"], np.memmap)
+            self.assertEqual(0, pyramid[0]["height"].min())
+
+    def test_errors(self):
+        data = make_pos_series(100)
+        with self.assertRaises(ValueError) as e:
+            downsample_lttb(data, 2)
+        self.assertEqual("Number of points must be at least 3.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            downsample_minmax(data, 10, "lat")
+        self.assertEqual("Column lat is not found in time serie.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            downsample_lttb({"time": data["time"][::-1], "height": data["height"]}, 10)
+        self.assertEqual("Time serie must be sorted by time.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            build_pyramid(data, method="mean")
+        self.assertEqual("Method must be lttb or minmax.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            build_pyramid(data, factor=1)
+        self.assertEqual("Factor must be at least 2.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            select_pyramid_level([], 10)
+        self.assertEqual("Pyramid is empty.", str(e.exception))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,640 @@
+from datetime import datetime
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+import numpy as np
+from moncenterlib.gnss.gnss_time_series import (aggregate_pos_series, assemble_station_series, build_pos_index, gps_week2gpst, gpst2gps_seconds, iter_pos_file,
+                                                   parse_pos_file, read_pos_window, report_series_quality, PosTailReader,
+                                                   _PosSchema)
+
+
+POS_LLH = """% program   : RTKPOST ver.2.4.3 b34
+% inp file  : /data/novm0010.22o
+% inp file  : /data/novm0010.22n
+% obs start : 2022/01/01 00:00:00.0 GPST (week2190 518400.0s)
+% obs end   : 2022/01/01 00:00:02.0 GPST (week2190 518402.0s)
+% pos mode  : kinematic
+%
+% (lat/lon/height=WGS84/ellipsoidal,Q=1:fix,2:float,3:sbas,4:dgps,5:single,6:ppp,ns=# of satellites)
+%  GPST                  latitude(deg) longitude(deg)  height(m)   Q  ns   sdn(m)   sde(m)   sdu(m)  sdne(m)  sdeu(m)  sdun(m) age(s)  ratio
+2022/01/01 00:00:00.000   55.012345678   82.123456789   150.1234   1   8   0.0123   0.0098   0.0234   0.0012  -0.0023   0.0034   0.00  999.9
+2022/01/01 00:00:01.000   55.012345679   82.123456788   150.1240   2   7   0.1234   0.0987   0.2345   0.0123  -0.0234   0.0345   1.00    2.5
+2022/01/01 00:00:02.000  -55.012345680  -82.123456787   150.1250   5   6   1.2345   0.9876   2.3456   0.1234  -0.2345   0.3456   0.00    0.0
+"""
+
+POS_XYZ = """% program   : RTKPOST ver.2.4.3 b34
+%  GPST                      x-ecef(m)      y-ecef(m)      z-ecef(m)   Q  ns   sdx(m)   sdy(m)   sdz(m)  sdxy(m)  sdyz(m)  sdzx(m) age(s)  ratio
+2022/01/01 00:00:00.000    452260.6090   3635877.0120   5203453.4540   1   8   0.0123   0.0098   0.0234   0.0012  -0.0023   0.0034   0.00  999.9
+"""
+
+POS_DMS = """%  GPST                  latitude(d'") longitude(d'")  height(m)   Q  ns   sdn(m)   sde(m)   sdu(m)  sdne(m)  sdeu(m)  sdun(m) age(s)  ratio
+2022/01/01 00:00:00.000   55 00 44.44444   82 07 24.44444   150.1234   1   8   0.0123   0.0098   0.0234   0.0012  -0.0023   0.0034   0.00  999.9
+2022/01/01 00:00:01.000   -0 30 00.00000   -82 07 24.44444   150.1234   1   8   0.0123   0.0098   0.0234   0.0012  -0.0023   0.0034   0.00  999.9
+"""
+
+POS_ENU_VEL = """%  GPST                  e-baseline(m)  n-baseline(m)  u-baseline(m)   Q  ns   sde(m)   sdn(m)   sdu(m)  sden(m)  sdnu(m)  sdue(m) age(s)  ratio    ve(m/s)    vn(m/s)    vu(m/s)      sdve     sdvn     sdvu    sdven    sdvnu    sdvue
+2190   518400.000       1.2340        -5.6780         0.0120   2   9   0.0100   0.0200   0.0300   0.0010   0.0020   0.0030   0.00    1.5     0.0010    -0.0020     0.0030   0.0100   0.0200   0.0300   0.0000   0.0000   0.0000
+"""
+
+POS_NMEA = """$GPRMC,235959.00,A,5500.7407407,N,08207.4074074,E,0.00,0.00,311221,,E,A*00
+$GPGGA,235959.00,5500.7407407,N,08207.4074074,E,4,08,0.9,120.000,M,30.123,M,1.0,0000*00
+$GPRMC,000000.50,A,5500.7407407,S,08207.4074074,W,0.00,0.00,010122,,E,A*00
+$GPGGA,000000.50,5500.7407407,S,08207.4074074,W,5,07,1.2,121.000,M,30.000,M,,0000*00
+$GPGGA,,,,,,,,,,,,,,*00
+"""
+
+
+class TestParsePosFile(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def write_temp(self, text: str, name: str = "file.pos") -> str:
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_columnar_llh(self):
+        header, data = parse_pos_file(self.write_temp(POS_LLH), columnar=True)
+
+        self.assertEqual(["/data/novm0010.22o", "/data/novm0010.22n"], header["inp file"])
+        self.assertEqual("GPST", header["name_columns"][0])
+        self.assertEqual(["time", "lat", "lon", "height", "Q", "ns", "sdn", "sde", "sdu",
+                          "sdne", "sdeu", "sdun", "age", "ratio"], list(data.keys()))
+
+        self.assertEqual(np.dtype("datetime64[ns]"), data["time"].dtype)
+        self.assertEqual(np.datetime64("2022-01-01T00:00:01"), data["time"][1])
+        np.testing.assert_allclose(data["lat"], [55.012345678, 55.012345679, -55.012345680])
+        np.testing.assert_allclose(data["lon"], [82.123456789, 82.123456788, -82.123456787])
+        np.testing.assert_array_equal(data["Q"], [1, 2, 5])
+        self.assertEqual(np.int32, data["Q"].dtype)
+        np.testing.assert_array_equal(data["ns"], [8, 7, 6])
+        np.testing.assert_allclose(data["sdeu"], [-0.0023, -0.0234, -0.2345])
+        np.testing.assert_allclose(data["ratio"], [999.9, 2.5, 0.0])
+
+    def test_columnar_xyz(self):
+        _, data = parse_pos_file(self.write_temp(POS_XYZ), columnar=True)
+        self.assertEqual(["time", "x", "y", "z", "Q", "ns", "sdx", "sdy", "sdz",
+                          "sdxy", "sdyz", "sdzx", "age", "ratio"], list(data.keys()))
+        np.testing.assert_allclose(data["z"], [5203453.4540])
+
+    def test_columnar_dms(self):
+        _, data = parse_pos_file(self.write_temp(POS_DMS), columnar=True)
+        np.testing.assert_allclose(data["lat"], [55 + 44.44444 / 3600, -0.5])
+        np.testing.assert_allclose(data["lon"], [82 + 7 / 60 + 24.44444 / 3600, -(82 + 7 / 60 + 24.44444 / 3600)])
+
+    def test_columnar_enu_velocity(self):
+        _, data = parse_pos_file(self.write_temp(POS_ENU_VEL), columnar=True)
+        self.assertEqual(["time", "e", "n", "u", "Q", "ns", "sde", "sdn", "sdu", "sden", "sdnu", "sdue", "age", "ratio",
+                          "ve", "vn", "vu", "sdve", "sdvn", "sdvu", "sdven", "sdvnu", "sdvue"], list(data.keys()))
+        self.assertEqual(np.datetime64("2022-01-01T00:00:00"), data["time"][0])
+        np.testing.assert_allclose(data["n"], [-5.678])
+        np.testing.assert_allclose(data["vn"], [-0.002])
+        np.testing.assert_allclose(data["sdvu"], [0.03])
+
+    def test_columnar_nmea(self):
+        header, data = parse_pos_file(self.write_temp(POS_NMEA), columnar=True)
+        self.assertEqual({}, header)
+        self.assertEqual(["time", "lat", "lon", "height", "Q", "ns", "hdop", "age"], list(data.keys()))
+        # UTC + 18 s
+        np.testing.assert_array_equal(np.array(["2022-01-01T00:00:17", "2022-01-01T00:00:18.5"], dtype="datetime64[ns]"),
+                                      data["time"])
+        np.testing.assert_allclose(data["lat"], [55 + 0.7407407 / 60, -(55 + 0.7407407 / 60)])
+        np.testing.assert_allclose(data["lon"], [82 + 7.4074074 / 60, -(82 + 7.4074074 / 60)])
+        np.testing.assert_allclose(data["height"], [150.123, 151.0])
+        np.testing.assert_array_equal(data["Q"], [1, 2])
+        np.testing.assert_array_equal(data["ns"], [8, 7])
+        np.testing.assert_allclose(data["age"], [1.0, np.nan])
+
+        # RMC and GGA in different chunks
+        chunks = list(iter_pos_file(self.write_temp(POS_NMEA), chunk_size=1))
+        self.assertEqual(data["time"][0], chunks[2]["time"][0])
+        self.assertEqual(data["time"][1], chunks[4]["time"][0])
+
+        with self.assertRaises(ValueError) as msg:
+            parse_pos_file(self.write_temp("\n".join(POS_NMEA.splitlines()[1:])), columnar=True)
+        self.assertEqual("Date of NMEA sentence is not found.", str(msg.exception))
+
+        # PPP (3) and dead reckoning (6) of GGA are Q 6 and 7 of RTKLib
+        text = POS_NMEA.replace("E,4,08", "E,3,08").replace("W,5,07", "W,6,07")
+        _, data = parse_pos_file(self.write_temp(text), columnar=True)
+        np.testing.assert_array_equal(data["Q"], [6, 7])
+        _, data = parse_pos_file(self.write_temp(text), columnar=True, q=6)
+        self.assertEqual(1, len(data["time"]))
+
+        # NMEA has no ratio, the filter isn't ignored silently
+        for cache in (False, True):
+            with self.assertRaises(ValueError) as msg:
+                parse_pos_file(self.write_temp(POS_NMEA), columnar=True, min_ratio=3.0, cache=cache)
+            self.assertEqual("Column of the filter min_ratio is not found in .pos file.", str(msg.exception))
+
+    def test_columnar_time(self):
+        # GPST, week and tow
+        text = POS_XYZ.replace("2022/01/01 00:00:00.000", "2190 518400.125")
+        _, data = parse_pos_file(self.write_temp(text), columnar=True)
+        self.assertEqual(np.datetime64("2022-01-01T00:00:00.125"), data["time"][0])
+
+        # UTC, calendar. GPST - UTC = 18 s in 2022
+        text = POS_XYZ.replace("%  GPST  ", "%  UTC   ").replace("00:00:00.000", "23:59:45.500")
+        _, data = parse_pos_file(self.write_temp(text), columnar=True)
+        self.assertEqual(np.datetime64("2022-01-02T00:00:03.5"), data["time"][0])
+
+        # UTC before 2017-01-01 leap second
+        text = POS_XYZ.replace("%  GPST  ", "%  UTC   ").replace("2022/01/01", "2016/12/31")
+        _, data = parse_pos_file(self.write_temp(text), columnar=True)
+        self.assertEqual(np.datetime64("2016-12-31T00:00:17"), data["time"][0])
+
+        # JST, week and tow
+        text = POS_XYZ.replace("%  GPST  ", "%  JST   ").replace("2022/01/01 00:00:00.000", "2190 518400.000")
+        _, data = parse_pos_file(self.write_temp(text), columnar=True)
+        self.assertEqual(np.datetime64("2021-12-31T15:00:18"), data["time"][0])
+
+    def test_gpst2gps_seconds(self):
+        time = np.array(["1980-01-06T00:00:00", "2022-01-01T00:00:00.5"], dtype="datetime64[ns]")
+        np.testing.assert_allclose([0, 2190 * 604800 + 518400.5], gpst2gps_seconds(time))
+        np.testing.assert_array_equal(time, gps_week2gpst(np.array([0, 2190]), np.array([0, 518400.5])))
+
+    def test_columnar_sep(self):
+        text = POS_XYZ.replace("   1   8", ",1,8").replace("(m)   Q  ns", "(m),  Q, ns")
+        header, data = parse_pos_file(self.write_temp(text), sep=",", columnar=True)
+        np.testing.assert_array_equal(data["Q"], [1])
+        np.testing.assert_allclose(data["sdx"], [0.0123])
+
+    def test_columnar_empty(self):
+        _, data = parse_pos_file(self.write_temp(POS_LLH.split("2022/01/01 00:00:00.000")[0]), columnar=True)
+        self.assertEqual(0, len(data["time"]))
+        self.assertEqual(np.float64, data["lat"].dtype)
+
+    def test_columnar_raises(self):
+        with self.assertRaises(ValueError) as msg:
+            parse_pos_file(self.write_temp(POS_LLH.split("%  GPST")[0]), columnar=True)
+        self.assertEqual("Name of columns is not found in header of .pos file.", str(msg.exception))
+
+        with self.assertRaises(ValueError) as msg:
+            parse_pos_file(self.write_temp(POS_LLH + "2022/01/01 00:00:03.000 1 2 3\n"), columnar=True)
+        self.assertEqual("Number of fields in rows of .pos file doesn't match the name of columns.", str(msg.exception))
+
+    def test_cache(self):
+        path = self.write_temp(POS_LLH)
+        exp_header, exp_data = parse_pos_file(path, columnar=True)
+
+        header, data = parse_pos_file(path, columnar=True, cache=True)
+        self.assertTrue(os.path.isfile(path + ".cache/meta.json"))
+        self.assertEqual(exp_header, header)
+
+        with patch("moncenterlib.gnss.gnss_time_series._PosSchema.convert") as mock_convert:
+            header, data = parse_pos_file(path, columnar=True, cache=True)
+            mock_convert.assert_not_called()
+        self.assertEqual(exp_header, header)
+        self.assertIsInstance(data["lat"], np.memmap)
+        self.assertEqual(list(exp_data.keys()), list(data.keys()))
+        for key, value in exp_data.items():
+            np.testing.assert_array_equal(value, data[key])
+
+        # the cache is rebuilt after changing of the file
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(POS_LLH.splitlines()[-1] + "\n")
+        _, data = parse_pos_file(path, columnar=True, cache=True)
+        self.assertEqual(4, len(data["time"]))
+        _, data = parse_pos_file(path, columnar=True, cache=True)
+        self.assertEqual(4, len(data["time"]))
+
+        # other separator
+        with patch("moncenterlib.gnss.gnss_time_series._PosSchema.convert") as mock_convert:
+            mock_convert.return_value = {}
+            parse_pos_file(path, sep=";", columnar=True, cache=True)
+            mock_convert.assert_called_once()
+
+    def test_cache_raises(self):
+        with self.assertRaises(ValueError) as msg:
+            parse_pos_file(self.write_temp(POS_LLH), cache=True)
+        self.assertEqual("Cache is supported only in columnar mode.", str(msg.exception))
+
+    def test_filters(self):
+        path = self.write_temp(POS_LLH)
+
+        _, data = parse_pos_file(path, columnar=True, q=1)
+        np.testing.assert_array_equal(data["Q"], [1])
+        _, data = parse_pos_file(path, columnar=True, q=[1, 2])
+        np.testing.assert_array_equal(data["Q"], [1, 2])
+        _, data = parse_pos_file(path, columnar=True, min_ns=7)
+        np.testing.assert_array_equal(data["ns"], [8, 7])
+        _, data = parse_pos_file(path, columnar=True, min_ratio=3.0)
+        np.testing.assert_array_equal(data["ratio"], [999.9])
+        _, data = parse_pos_file(path, columnar=True, q=4)
+        self.assertEqual(0, len(data["time"]))
+        self.assertEqual(14, len(data))
+
+        _, data = parse_pos_file(path, columnar=True, start=datetime(2022, 1, 1, 0, 0, 1))
+        np.testing.assert_array_equal(data["Q"], [2, 5])
+        _, data = parse_pos_file(path, columnar=True, end=np.datetime64("2022-01-01T00:00:01"))
+        np.testing.assert_array_equal(data["Q"], [1])
+        _, data = parse_pos_file(path, columnar=True, start=datetime(2022, 1, 1, 0, 0, 1),
+                                 end=datetime(2022, 1, 1, 0, 0, 2), cache=True)
+        np.testing.assert_array_equal(data["Q"], [2])
+        _, data = parse_pos_file(path, columnar=True, q=5, cache=True)
+        np.testing.assert_array_equal(data["Q"], [5])
+
+        # UTC, GPST - UTC = 18 s
+        text = POS_LLH.replace("%  GPST  ", "%  UTC   ")
+        _, data = parse_pos_file(self.write_temp(text), columnar=True, start=datetime(2022, 1, 1, 0, 0, 19))
+        np.testing.assert_array_equal(data["Q"], [2, 5])
+
+        # week and tow
+        text = POS_XYZ.replace("2022/01/01 00:00:00.000", "2190 518400.000")
+        _, data = parse_pos_file(self.write_temp(text), columnar=True, start=datetime(2022, 1, 1, 0, 0, 1))
+        self.assertEqual(0, len(data["time"]))
+
+        # NMEA
+        _, data = parse_pos_file(self.write_temp(POS_NMEA, "nmea.pos"), columnar=True, q=2)
+        np.testing.assert_array_equal(data["Q"], [2])
+
+    def test_filters_skip_rows(self):
+        # broken rows out of the time window are never converted
+        rows = POS_LLH.splitlines(keepends=True)
+        text = "".join(rows[:9]) + "2021/12/31 23:59:50.000 broken\n" + "".join(rows[9:]) + "2022/01/01 00:00:09.000 broken\n"
+        path = self.write_temp(text)
+
+        _, data = parse_pos_file(path, columnar=True, start=datetime(2022, 1, 1), end=datetime(2022, 1, 1, 0, 0, 3))
+        np.testing.assert_array_equal(data["Q"], [1, 2, 5])
+
+        with self.assertRaises(ValueError):
+            parse_pos_file(path, columnar=True, start=datetime(2022, 1, 1))
+
+    def test_filters_sep(self):
+        # date and time of rows are separated by sep, "2022/01/01;00:00:00.000"
+        rows = POS_LLH.splitlines(keepends=True)
+        text = "".join(rows[:9]) + "".join(";".join(row.split()) + "\n" for row in rows[9:])
+        path = self.write_temp(text)
+
+        _, data = parse_pos_file(path, sep=";", columnar=True, start=datetime(2022, 1, 1, 0, 0, 1),
+                                 end=datetime(2022, 1, 1, 0, 0, 3))
+        np.testing.assert_array_equal(data["Q"], [2, 5])
+        _, data = parse_pos_file(path, sep=";", columnar=True, end=datetime(2022, 1, 1, 0, 0, 1))
+        np.testing.assert_array_equal(data["Q"], [1])
+
+    def test_filters_raises(self):
+        with self.assertRaises(ValueError) as msg:
+            parse_pos_file(self.write_temp(POS_LLH), q=1)
+        self.assertEqual("Filters are supported only in columnar mode.", str(msg.exception))
+
+    def test_list_mode(self):
+        header, data = parse_pos_file(self.write_temp(POS_XYZ.split("2022")[0] + "2022/01/01 00:00:00.000 1.5 2.5 3.5 1 8 1 1 1 0 0 0 0 3\n"))
+        self.assertEqual([["2022/01/01 00:00:00.000", 1.5, 2.5, 3.5, 1, 8, 1, 1, 1, 0, 0, 0, 0, 3]], data)
+
+
+class TestIterPosFile(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "file.pos")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(POS_LLH)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_chunks(self):
+        chunks = list(iter_pos_file(self.path, chunk_size=2))
+        self.assertEqual(3, len(chunks))
+
+        header, exp_data = parse_pos_file(self.path, columnar=True)
+        self.assertEqual(header, chunks[0])
+        self.assertEqual(2, len(chunks[1]["time"]))
+        self.assertEqual(1, len(chunks[2]["time"]))
+        for key, value in exp_data.items():
+            np.testing.assert_array_equal(value, np.concatenate([chunks[1][key], chunks[2][key]]))
+
+        chunks = list(iter_pos_file(self.path, chunk_size=3))
+        self.assertEqual(2, len(chunks))
+
+    def test_only_header(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(POS_LLH.split("2022/01/01 00:00:00.000")[0])
+        chunks = list(iter_pos_file(self.path))
+        self.assertEqual(1, len(chunks))
+        self.assertEqual("GPST", chunks[0]["name_columns"][0])
+
+    def test_raises(self):
+        with self.assertRaises(ValueError) as msg:
+            next(iter_pos_file(self.path, chunk_size=0))
+        self.assertEqual("Chunk size must be positive.", str(msg.exception))
+
+
+class TestPosWindow(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "file.pos")
+        self.start = np.datetime64("2022-01-01T00:00:00", "ns")
+        self.write_pos()
+
+    def write_pos(self, tow: bool = False):
+        header = POS_LLH.split("2022/01/01 00:00:00.000")[0]
+        row = "   55.012345678   82.123456789   150.1234   {q}   8   0.0123   0.0098   0.0234   0.0012  -0.0023   0.0034   0.00  999.9\n"
+        times = self.start + np.arange(5000) * np.timedelta64(1, "s")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(header)
+            for i, time in enumerate(times):
+                if tow:
+                    text_time = f"2190 {518400 + i:10.3f}"
+                else:
+                    text_time = np.datetime_as_string(time, unit="ms").replace("-", "/").replace("T", " ")
+                f.write(text_time + row.format(q=i % 2 + 1))
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def check_window(self, start, end, **kwargs):
+        _, exp_data = parse_pos_file(self.path, columnar=True, start=start, end=end)
+        header, data = read_pos_window(self.path, start, end, **kwargs)
+        self.assertEqual("GPST", header["name_columns"][0])
+        self.assertEqual(list(exp_data.keys()), list(data.keys()))
+        for key, value in exp_data.items():
+            np.testing.assert_array_equal(value, data[key])
+        return data
+
+    def test_build_pos_index(self):
+        index = build_pos_index(self.path, stride=1000)
+        np.testing.assert_array_equal(self.start + np.arange(0, 5000, 1000) * np.timedelta64(1, "s"), index["time"])
+        with open(self.path, "rb") as f:
+            for offset in index["offset"]:
+                f.seek(offset)
+                self.assertTrue(f.readline().startswith(b"2022/01/01"))
+
+        with self.assertRaises(ValueError) as msg:
+            build_pos_index(self.path, stride=0)
+        self.assertEqual("Stride must be positive.", str(msg.exception))
+
+    def test_read_pos_window(self):
+        index = build_pos_index(self.path, stride=300)
+        windows = [(self.start + np.timedelta64(3000, "s"), self.start + np.timedelta64(3600, "s")),
+                   (self.start - np.timedelta64(10, "s"), self.start + np.timedelta64(10, "s")),
+                   (self.start + np.timedelta64(4990, "s"), self.start + np.timedelta64(6000, "s")),
+                   (self.start + np.timedelta64(6000, "s"), self.start + np.timedelta64(7000, "s")),
+                   (datetime(2022, 1, 1, 0, 30), datetime(2022, 1, 1, 0, 31))]
+        for start, end in windows:
+            self.check_window(start, end)
+            self.check_window(start, end, index=index)
+
+        data = self.check_window(windows[0][0], windows[0][1])
+        self.assertEqual(600, len(data["time"]))
+
+        _, data = read_pos_window(self.path, windows[0][0], windows[0][1], q=2)
+        self.assertEqual(300, len(data["time"]))
+
+    def test_read_pos_window_reads_only_window(self):
+        with patch("moncenterlib.gnss.gnss_time_series._PosSchema.convert", autospec=True,
+                   side_effect=_PosSchema.convert) as mock_convert:
+            read_pos_window(self.path, self.start + np.timedelta64(4000, "s"), self.start + np.timedelta64(4010, "s"))
+        converted = sum(len(args[1]) for args, _ in mock_convert.call_args_list)
+        self.assertLess(converted, 1000)
+
+    def test_read_pos_window_tow(self):
+        self.write_pos(tow=True)
+        _, data = parse_pos_file(self.path, columnar=True)
+        self.assertEqual(self.start + np.timedelta64(4999, "s"), data["time"][-1])
+        data = self.check_window(self.start + np.timedelta64(100, "s"), self.start + np.timedelta64(200, "s"))
+        self.assertEqual(100, len(data["time"]))
+        self.check_window(self.start + np.timedelta64(100, "s"), self.start + np.timedelta64(200, "s"),
+                          index=build_pos_index(self.path, stride=70))
+
+    def test_read_pos_window_nmea(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(POS_NMEA)
+        with self.assertRaises(ValueError) as msg:
+            read_pos_window(self.path, self.start, self.start)
+        self.assertEqual("Random access isn't supported for NMEA files.", str(msg.exception))
+
+
+class TestPosTailReader(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "file.pos")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def append(self, text: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_read_new(self):
+        self.append("")
+        reader = PosTailReader(self.path)
+        self.assertEqual({}, reader.read_new())
+
+        header, rows = POS_LLH.split("%  GPST")
+        rows = "%  GPST" + rows
+        self.append(header + rows[:50])
+        self.assertEqual({}, reader.read_new())
+        self.assertEqual(["/data/novm0010.22o", "/data/novm0010.22n"], reader.header["inp file"])
+
+        # name of columns and a half of the first row
+        first_row_end = rows.index("\n", rows.index("\n") + 1) + 1
+        self.append(rows[50:first_row_end - 20])
+        data = reader.read_new()
+        self.assertEqual(0, len(data["time"]))
+        self.assertEqual("GPST", reader.header["name_columns"][0])
+
+        self.append(rows[first_row_end - 20:])
+        data = reader.read_new()
+        np.testing.assert_array_equal(data["Q"], [1, 2, 5])
+
+        data = reader.read_new()
+        self.assertEqual(0, len(data["time"]))
+
+        self.append(POS_LLH.splitlines(keepends=True)[-1])
+        data = reader.read_new()
+        np.testing.assert_array_equal(data["Q"], [5])
+        self.assertEqual(os.path.getsize(self.path), reader.offset)
+
+    def test_read_new_truncated(self):
+        self.append(POS_LLH)
+        reader = PosTailReader(self.path)
+        self.assertEqual(3, len(reader.read_new()["time"]))
+
+        # new run of rnx2rtkp rewrites the file
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(POS_XYZ)
+        data = reader.read_new()
+        np.testing.assert_allclose(data["z"], [5203453.4540])
+
+    def test_read_new_nmea(self):
+        reader = PosTailReader(self.path)
+        lines = POS_NMEA.splitlines(keepends=True)
+        times = []
+        for line in lines:
+            self.append(line)
+            times += list(reader.read_new().get("time", []))
+        self.assertEqual(2, len(times))
+
+
+class TestAssembleStationSeries(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        rows = POS_LLH.splitlines(keepends=True)
+        header = "".join(rows[:9])
+        day2 = "".join(rows[10:]).replace("00:00:01.000", "00:00:03.000").replace("00:00:02.000", "00:00:04.000")
+        files = {
+            "novm0010.22o.pos": header + "".join(rows[9:]),
+            "novm0020.22o.pos": header + rows[11] + day2,  # the first epoch is duplicated
+            "NSK100RUS_R_20220010000_01D_30S_MO.rnx.pos": POS_LLH,
+            "broken.pos": "bla bla",
+            "readme.txt": "bla bla"
+        }
+        for name, text in files.items():
+            with open(os.path.join(self.temp_dir.name, name), "w", encoding="utf-8") as f:
+                f.write(text)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def check_result(self, series, errors):
+        self.assertEqual(["NOVM", "NSK1"], sorted(series.keys()))
+        self.assertEqual([os.path.join(self.temp_dir.name, "broken.pos")], list(errors.keys()))
+
+        exp_time = np.datetime64("2022-01-01T00:00:00", "ns") + np.arange(5) * np.timedelta64(1, "s")
+        np.testing.assert_array_equal(exp_time, series["NOVM"]["time"])
+        np.testing.assert_array_equal([1, 2, 5, 2, 5], series["NOVM"]["Q"])
+        np.testing.assert_array_equal([1, 2, 5], series["NSK1"]["Q"])
+
+    def test_assemble(self):
+        self.check_result(*assemble_station_series(self.temp_dir.name))
+        self.check_result(*assemble_station_series(self.temp_dir.name, workers=2))
+
+        files = [os.path.join(self.temp_dir.name, name) for name in ("novm0020.22o.pos", "novm0010.22o.pos")]
+        series, errors = assemble_station_series(files, q=5)
+        self.assertEqual({}, errors)
+        np.testing.assert_array_equal([5, 5], series["NOVM"]["Q"])
+
+    def test_assemble_raises(self):
+        with self.assertRaises(ValueError) as msg:
+            assemble_station_series(self.temp_dir.name, workers=0)
+        self.assertEqual("Number of workers must be positive.", str(msg.exception))
+
+    def test_assemble_different_columns(self):
+        # the station with different columns is skipped, other stations are assembled
+        with open(os.path.join(self.temp_dir.name, "novm0030.22o.pos"), "w", encoding="utf-8") as f:
+            f.write(POS_XYZ)
+        series, errors = assemble_station_series(self.temp_dir.name)
+        self.assertEqual(["NSK1"], list(series))
+        np.testing.assert_array_equal([1, 2, 5], series["NSK1"]["Q"])
+        names = ("novm0010.22o.pos", "novm0020.22o.pos", "novm0030.22o.pos")
+        self.assertEqual(sorted(os.path.join(self.temp_dir.name, name) for name in names + ("broken.pos",)), sorted(errors))
+        for name in names:
+            self.assertEqual("Files of station NOVM have different columns.", errors[os.path.join(self.temp_dir.name, name)])
+
+
+class TestAggregatePosSeries(TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(1)
+        size = 3 * 1440 - 100
+        self.data = {
+            "time": np.datetime64("2022-01-01T00:00:00", "ns") + np.arange(100, 3 * 1440) * np.timedelta64(1, "m"),
+            "lat": 55 + rng.normal(0, 1e-7, size),
+            "height": 150 + rng.normal(0, 0.01, size),
+            "Q": rng.integers(1, 3, size),
+            "sdn": rng.uniform(0.005, 0.02, size),
+            "sdu": rng.uniform(0.01, 0.03, size)
+        }
+        self.data["sdu"][0] = 0
+
+    def check_day(self, result, index, mask):
+        height = self.data["height"][mask]
+        weights = 1 / np.maximum(self.data["sdu"][mask], 1e-4) ** 2
+        self.assertEqual(len(height), result["count"][index])
+        self.assertAlmostEqual(height.mean(), result["height_mean"][index])
+        self.assertAlmostEqual(np.median(height), result["height_median"][index])
+        self.assertAlmostEqual(height.std(ddof=1), result["height_std"][index])
+        self.assertAlmostEqual(np.sum(weights * height) / np.sum(weights), result["height_wmean"][index])
+        self.assertAlmostEqual(1 / np.sqrt(np.sum(weights)), result["height_wsigma"][index])
+        self.assertAlmostEqual(np.median(self.data["lat"][mask]), result["lat_median"][index])
+
+    def test_daily(self):
+        chunks = [{key: value[i:i + 1000] for key, value in self.data.items()} for i in range(0, 4220, 1000)]
+        result = aggregate_pos_series(chunks)
+        days = np.array(["2022-01-01", "2022-01-02", "2022-01-03"], dtype="datetime64[ns]")
+        np.testing.assert_array_equal(days, result["time"])
+        self.assertNotIn("lon_mean", result)
+        self.assertIn("lat_wmean", result)
+        for i, day in enumerate(days):
+            self.check_day(result, i, self.data["time"].astype("datetime64[D]") == day)
+
+        # the same without chunks and with Q
+        full = aggregate_pos_series(self.data)
+        for key, value in result.items():
+            np.testing.assert_allclose(value.astype(np.float64), full[key].astype(np.float64))
+        result = aggregate_pos_series(self.data, q=[2])
+        self.check_day(result, 1, (self.data["time"].astype("datetime64[D]") == days[1]) & (self.data["Q"] == 2))
+
+    def test_hourly_pos_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "file.pos")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(POS_LLH)
+            result = aggregate_pos_series(iter_pos_file(path, chunk_size=1), interval=np.timedelta64(1, "h"))
+        np.testing.assert_array_equal(np.array(["2022-01-01T00"], dtype="datetime64[ns]"), result["time"])
+        np.testing.assert_array_equal([3], result["count"])
+        self.assertAlmostEqual(150.1240, result["height_median"][0])
+
+    def test_empty_and_raises(self):
+        result = aggregate_pos_series([])
+        self.assertEqual(0, len(result["time"]))
+
+        with self.assertRaises(ValueError) as msg:
+            aggregate_pos_series(self.data, interval=np.timedelta64(0, "s"))
+        self.assertEqual("Interval must be positive.", str(msg.exception))
+
+        chunks = [{key: value[2000:3000] for key, value in self.data.items()},
+                  {key: value[:1000] for key, value in self.data.items()}]
+        with self.assertRaises(ValueError) as msg:
+            aggregate_pos_series(chunks)
+        self.assertEqual("Chunks must be sorted by time.", str(msg.exception))
+
+
+class TestReportSeriesQuality(TestCase):
+    def setUp(self) -> None:
+        seconds = np.concatenate([np.arange(0, 1000, 30), np.arange(1300, 87000, 30), [86980]])
+        self.data = {
+            "time": np.datetime64("2022-01-01T00:00:00", "ns") + seconds * np.timedelta64(1, "s"),
+            "Q": np.where(np.arange(len(seconds)) % 4 == 0, 2, 1)
+        }
+
+    def test_report(self):
+        report = report_series_quality(self.data)
+        self.assertEqual(len(self.data["time"]), report["epochs"])
+        self.assertEqual(np.timedelta64(30, "s"), report["nominal_interval"])
+        self.assertEqual(np.datetime64("2022-01-02T00:09:40", "ns"), report["end"])
+        self.assertEqual(1, report["duplicates"])
+        np.testing.assert_array_equal(np.array(["2022-01-01T00:16:30"], dtype="datetime64[ns]"), report["gaps"]["start"])
+        np.testing.assert_array_equal(np.array(["2022-01-01T00:21:40"], dtype="datetime64[ns]"), report["gaps"]["end"])
+        np.testing.assert_array_equal([np.timedelta64(310, "s")], report["gaps"]["duration"])
+        np.testing.assert_array_equal(np.array(["2022-01-01", "2022-01-02"], dtype="datetime64[D]"), report["days"])
+        np.testing.assert_array_equal([2871, 21], report["day_epochs"])
+        np.testing.assert_allclose([2871 / 2880, 21 / 2880], report["day_completeness"])
+        self.assertAlmostEqual(2892 / 2900, report["completeness"])
+        self.assertEqual([1, 2], list(report["q_fraction"]))
+        self.assertAlmostEqual(1.0, sum(report["q_fraction"].values()))
+
+        report = report_series_quality(self.data, nominal_interval=np.timedelta64(1, "s"), gap_factor=100.0)
+        self.assertEqual(np.timedelta64(1, "s"), report["nominal_interval"])
+        self.assertEqual(1, len(report["gaps"]["start"]))
+        self.assertLess(report["completeness"], 0.04)
+
+    def test_archive(self):
+        empty = {"time": np.array([], dtype="datetime64[ns]")}
+        reports = report_series_quality({"NSK1": self.data, "NOVM": empty})
+        self.assertEqual(["NSK1", "NOVM"], list(reports))
+        self.assertEqual({"epochs": 0}, reports["NOVM"])
+        self.assertEqual(report_series_quality(self.data)["duplicates"], reports["NSK1"]["duplicates"])
+
+        with self.assertRaises(ValueError) as msg:
+            report_series_quality(self.data, gap_factor=1.0)
+        self.assertEqual("Gap factor must be greater than 1.", str(msg.exception))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from unittest import TestCase, main
+import numpy as np
+from moncenterlib.gnss.hector import export_mom, import_mom, read_mom, write_mom
+from moncenterlib.tests.gnss.unit_tests.synthetic import make_series
+
+
+MOM_TREND = """# sampling period 1.0
+# offset 59582.0
+59580.0  0.0012  0.0010
+59581.0 -0.0030  0.0011
+59583.0  0.0040  0.0031
+"""
+
+
+class TestHector(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_write_mom(self):
+        path = os.path.join(self.temp_dir.name, "NSK1", "U", "Hector_U.mom")
+        time = np.array([59580.0, 59581.0, 59582.0, 59583.5])
+        write_mom(path, time, np.array([0.0012, -0.0000004, np.nan, -1234.5]), offsets=np.array([59582.0]))
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(["# sampling period 1", "# offset 59582"], lines[:2])
+        self.assertEqual(3, len(lines[2:]))
+        self.assertEqual([["59580.0000000000", "0.001200"], ["59581.0000000000", "0.000000"],
+                          ["59583.5000000000", "-1234.500000"]], [line.split() for line in lines[2:]])
+        self.assertEqual(1, len(set(len(line) for line in lines[2:])))
+
+        # the same text as "%.6f" for any values
+        values = np.random.default_rng(1).normal(0, 100, 1000)
+        write_mom(path, 59580 + np.arange(1000.0), values, model=values / 2, decimals=4)
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [line.split() for line in f.read().splitlines()[1:]]
+        self.assertEqual([f"{value:.4f}" for value in values], [row[1] for row in rows])
+        self.assertEqual([f"{value / 2:.4f}" for value in values], [row[2] for row in rows])
+
+    def test_read_mom(self):
+        path = os.path.join(self.temp_dir.name, "Hector_U_trend.mom")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(MOM_TREND)
+        header, data = read_mom(path)
+        self.assertEqual(1.0, header["sampling_period"])
+        np.testing.assert_array_equal([59582.0], header["offsets"])
+        np.testing.assert_array_equal([59580.0, 59581.0, 59583.0], data["time"])
+        np.testing.assert_array_equal([0.0012, -0.003, 0.004], data["value"])
+        np.testing.assert_array_equal([0.001, 0.0011, 0.0031], data["model"])
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(MOM_TREND + "59584.0 1.0\n")
+        with self.assertRaises(ValueError) as e:
+            read_mom(path)
+        self.assertEqual("Number of fields in rows of .mom file isn't the same.", str(e.exception))
+
+        # the only data line without the newline
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# sampling period 1.0\n59580.0 0.0012 1")
+        header, data = read_mom(path)
+        np.testing.assert_array_equal([59580.0], data["time"])
+        np.testing.assert_array_equal([1.0], data["model"])
+
+    def test_export_import(self):
+        # large values of u check the width of columns
+        noise = (0.002, 0.002, 200)
+        series = {"NSK1": make_series(100, 1, noise=noise), "NOVM": make_series(50, 2, noise=noise)}
+        series["NSK1"]["u"][[3, 7]] = np.nan
+        offsets = {"NSK1": series["NSK1"]["time"][[40]]}
+        paths = export_mom(series, self.temp_dir.name, offsets=offsets)
+        self.assertEqual(os.path.join(self.temp_dir.name, "NSK1", "U", "Hector_U.mom"), paths["NSK1"]["u"])
+
+        series_mom, offsets_mom = import_mom(self.temp_dir.name, workers=2)
+        self.assertEqual(["NOVM", "NSK1"], list(series_mom))
+        np.testing.assert_array_equal(series["NSK1"]["time"], series_mom["NSK1"]["time"])
+        np.testing.assert_array_equal(offsets["NSK1"], offsets_mom["NSK1"])
+        self.assertEqual(0, len(offsets_mom["NOVM"]))
+        for station, data in series.items():
+            for component in ("e", "n", "u"):
+                np.testing.assert_allclose(data[component], series_mom[station][component], atol=5e-7)
+
+        # components with different epochs (e.g. outliers are removed) are joined with NaN
+        path = paths["NOVM"]["e"]
+        header, data = read_mom(path)
+        write_mom(path, data["time"][1:], data["value"][1:], model=data["value"][1:])
+        series_mom, _ = import_mom(self.temp_dir.name, components=("e", "u"))
+        self.assertTrue(np.isnan(series_mom["NOVM"]["e"][0]))
+        self.assertFalse(np.isnan(series_mom["NOVM"]["u"][0]))
+        self.assertEqual(["time", "e", "e_model", "u"], list(series_mom["NOVM"]))
+
+        with self.assertRaises(ValueError) as e:
+            export_mom(series, self.temp_dir.name, components=("x",))
+        self.assertEqual("Component x is not found in time serie of station NSK1.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            import_mom(self.temp_dir.name, workers=0)
+        self.assertEqual("Number of workers must be positive.", str(e.exception))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from datetime import datetime
 from logging import Logger
 import logging
 from pathlib import Path
@@ -5,6 +6,7 @@ import tempfile
 from unittest import TestCase, main
 from unittest.mock import MagicMock, patch, call
 from moncenterlib.gnss.quality_check import Anubis
+from moncenterlib.gnss.tools import RinexHeader
 
 
 class TestAnubis(TestCase):
@@ -49,10 +51,21 @@ class TestAnubis(TestCase):
         self.assertEqual(str(msg.exception), "Please, remove spaces in path.")
 
     def test_scan_dirs(self):
+        def headers(dates, markers=None):
+            markers = markers or ["AAAA"] * len(dates)
+            result = []
+            for date, marker in zip(dates, markers):
+                if isinstance(marker, Exception):
+                    result.append(marker)
+                elif isinstance(date, Exception):
+                    result.append(date)
+                else:
+                    result.append(RinexHeader(marker_name=marker, time_first_obs=datetime.strptime(date, "%Y-%m-%d")))
+            return result
+
         with (patch("moncenterlib.gnss.quality_check.mcl_tools.get_files_from_dir") as mock_get_files_from_dir,
               patch("moncenterlib.gnss.quality_check.mcl_gnss_tools.get_start_date_from_nav") as mock_get_start_date_from_nav,
-              patch("moncenterlib.gnss.quality_check.mcl_gnss_tools.get_start_date_from_obs") as mock_get_start_date_from_obs,
-              patch("moncenterlib.gnss.quality_check.mcl_gnss_tools.get_marker_name") as mock_get_marker_name):
+              patch("moncenterlib.gnss.quality_check.mcl_gnss_tools.read_rinex_header") as mock_read_rinex_header):
 
             # check send arg to get_files_from_dir
             mock_get_files_from_dir.return_value = []
@@ -64,61 +77,63 @@ class TestAnubis(TestCase):
             self.anubis.scan_dirs("/obs", "/nav", True)
             self.assertEqual([call('/obs', True), call('/nav', True)], mock_get_files_from_dir.call_args_list)
 
-            # check send arg to get_start_date_from_nav, get_start_date_from_obs
+            # check send arg to get_start_date_from_nav, read_rinex_header, the header is read once
             mock_get_files_from_dir.side_effect = [["obs1", "obs2"], ["nav1", "nav2"]]
+            mock_read_rinex_header.side_effect = headers(["2020-01-01", "2020-01-02"])
             self.anubis.scan_dirs("/obs", "/nav")
             self.assertEqual([call("nav1"), call("nav2")], mock_get_start_date_from_nav.call_args_list)
-            self.assertEqual([call("obs1"), call("obs2")], mock_get_start_date_from_obs.call_args_list)
+            self.assertEqual([call("obs1"), call("obs2")], mock_read_rinex_header.call_args_list)
 
             # no found nav, found obs
             mock_get_files_from_dir.side_effect = [["obs1", "obs2"], ["nav1", "nav2"]]
             mock_get_start_date_from_nav.side_effect = []
-            mock_get_start_date_from_obs.side_effect = ["2020-01-01", "2020-01-02"]
-            mock_get_marker_name.return_value = "AAAA"
+            mock_read_rinex_header.side_effect = headers(["2020-01-01", "2020-01-02"])
             result = self.anubis.scan_dirs("/obs", "/nav")
             self.assertEqual(({}, {'AAAA': ['obs1', 'obs2']}), result)
 
             # no found obs, found nav
             mock_get_files_from_dir.side_effect = [["obs1", "obs2"], ["nav1", "nav2"]]
             mock_get_start_date_from_nav.side_effect = ["2020-01-01", "2020-01-02"]
-            mock_get_start_date_from_obs.side_effect = []
-            mock_get_marker_name.return_value = "AAAA"
+            mock_read_rinex_header.side_effect = []
             result = self.anubis.scan_dirs("/obs", "/nav")
             self.assertEqual(({}, {}), result)
 
             # check continue in nav
             mock_get_files_from_dir.side_effect = [["obs1", "obs2", "obs3"], ["nav1", "nav2", "nav3"]]
             mock_get_start_date_from_nav.side_effect = ["2020-01-01", Exception(), "2020-01-03"]
-            mock_get_start_date_from_obs.side_effect = ["2020-01-01", "2020-01-02", "2020-01-03"]
-            mock_get_marker_name.return_value = "AAAA"
+            mock_read_rinex_header.side_effect = headers(["2020-01-01", "2020-01-02", "2020-01-03"])
             result = self.anubis.scan_dirs("/obs", "/nav")
             self.assertEqual(({"AAAA": [['obs1', 'nav1'], ['obs3', 'nav3']]}, {'AAAA': ['obs2']}), result)
 
-            # check continue in obs date
+            # check continue in obs header
             mock_get_files_from_dir.side_effect = [["obs1", "obs2", "obs3"], ["nav1", "nav2", "nav3"]]
             mock_get_start_date_from_nav.side_effect = ["2020-01-01", "2020-01-02", "2020-01-03"]
-            mock_get_start_date_from_obs.side_effect = ["2020-01-01", Exception(), "2020-01-03"]
-            mock_get_marker_name.return_value = "AAAA"
+            mock_read_rinex_header.side_effect = headers(["2020-01-01", Exception(), "2020-01-03"])
             result = self.anubis.scan_dirs("/obs", "/nav")
             self.assertEqual(({"AAAA": [['obs1', 'nav1'], ['obs3', 'nav3']]}, {}), result)
 
-            # check continue in obs marker name
+            # check marker names
             mock_get_files_from_dir.side_effect = [["obs1", "obs2", "obs3"], ["nav1", "nav2", "nav3"]]
             mock_get_start_date_from_nav.side_effect = ["2020-01-01", "2020-01-02", "2020-01-03"]
-            mock_get_start_date_from_obs.side_effect = ["2020-01-01", "2020-01-02", "2020-01-03"]
-            mock_get_marker_name.side_effect = ["AAAA", Exception(), "CCCC"]
+            mock_read_rinex_header.side_effect = headers(["2020-01-01", "2020-01-02", "2020-01-03"],
+                                                         ["AAAA", Exception(), "CCCC"])
             result = self.anubis.scan_dirs("/obs", "/nav")
             self.assertEqual(({"AAAA": [['obs1', 'nav1']], "CCCC": [['obs3', 'nav3']]}, {}), result)
 
             # check if date_obs is not existing in filter_files_nav
             mock_get_files_from_dir.side_effect = [["obs1", "obs2", "obs3"], ["nav1", "nav2", "nav3"]]
             mock_get_start_date_from_nav.side_effect = ["2020-01-01", "2020-01-02", "2020-01-03"]
-            mock_get_start_date_from_obs.side_effect = ["2020-01-01", "2020-01-02", "2020-01-05"]
-            mock_get_marker_name.side_effect = None
-            mock_get_marker_name.return_value = "AAAA"
+            mock_read_rinex_header.side_effect = headers(["2020-01-01", "2020-01-02", "2020-01-05"])
             result = self.anubis.scan_dirs("/obs", "/nav")
             self.assertEqual(({'AAAA': [['obs1', 'nav1'], ['obs2', 'nav2']]}, {'AAAA': ['obs3']}), result)
 
+            # files without the date are skipped, obs without the date doesn't match nav without the date
+            mock_get_files_from_dir.side_effect = [["obs1", "obs2"], ["nav1", "nav2"]]
+            mock_get_start_date_from_nav.side_effect = ["2020-01-01", ""]
+            mock_read_rinex_header.side_effect = [*headers(["2020-01-01"]), RinexHeader(marker_name="AAAA")]
+            result = self.anubis.scan_dirs("/obs", "/nav")
+            self.assertEqual(({'AAAA': [['obs1', 'nav1']]}, {}), result)
+
     def test_start_raises(self):
         with self.assertRaises(Exception):
             self.anubis.start(None, False, "")
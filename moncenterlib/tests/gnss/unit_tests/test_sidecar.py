@@ -0,0 +1,57 @@
+import os
+import tempfile
+from unittest import TestCase, main
+import numpy as np
+from moncenterlib.gnss.sidecar import load_sidecar_arrays, make_stamp, read_sidecar_meta, write_sidecar
+
+
+class TestSidecar(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "file.pos")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("data\n")
+        self.path_sidecar = self.path + ".cache"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_write_and_read(self):
+        stamp = make_stamp(os.stat(self.path), 1, sep=";")
+        self.assertEqual({"version": 1, "size": 5, "mtime_ns": os.stat(self.path).st_mtime_ns, "sep": ";"}, stamp)
+        self.assertIsNone(read_sidecar_meta(self.path_sidecar, stamp))
+
+        self.assertTrue(write_sidecar(self.path_sidecar, {**stamp, "columns": ["a"]}, {"a.0": np.arange(3)}))
+        self.assertTrue(write_sidecar(self.path_sidecar, {**stamp, "columns": ["a", "b"]}, {"b.0": np.ones(2)}))
+        meta = read_sidecar_meta(self.path_sidecar, stamp)
+        self.assertEqual(["a", "b"], meta["columns"])
+
+        # arrays of the first write are kept
+        arrays = load_sidecar_arrays(self.path_sidecar, ["a.0", "b.0"])
+        self.assertIsInstance(arrays["a.0"], np.memmap)
+        np.testing.assert_array_equal(np.arange(3), arrays["a.0"])
+        self.assertIsNone(load_sidecar_arrays(self.path_sidecar, ["c.0"]))
+
+    def test_out_of_date(self):
+        stamp = make_stamp(os.stat(self.path), 1, sep=None)
+        write_sidecar(self.path_sidecar, stamp, {"0": np.arange(3)})
+        self.assertIsNone(read_sidecar_meta(self.path_sidecar, make_stamp(os.stat(self.path), 2, sep=None)))
+        self.assertIsNone(read_sidecar_meta(self.path_sidecar, make_stamp(os.stat(self.path), 1, sep=";")))
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("more data\n")
+        self.assertIsNone(read_sidecar_meta(self.path_sidecar, make_stamp(os.stat(self.path), 1, sep=None)))
+
+        # the broken meta isn't a valid cache
+        with open(os.path.join(self.path_sidecar, "meta.json"), "w", encoding="utf-8") as f:
+            f.write("{\"version\"")
+        self.assertIsNone(read_sidecar_meta(self.path_sidecar, stamp))
+
+    def test_write_fails(self):
+        # the sidecar directory can't be created under the file
+        stamp = make_stamp(os.stat(self.path), 1)
+        self.assertFalse(write_sidecar(os.path.join(self.path, "cache"), stamp, {"0": np.arange(3)}))
+
+
+if __name__ == "__main__":
+    main()
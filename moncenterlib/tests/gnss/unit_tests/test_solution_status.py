@@ -0,0 +1,111 @@
+import os
+import tempfile
+from unittest import TestCase, main
+import numpy as np
+from moncenterlib.gnss.solution_status import iter_stat_file, parse_stat_file
+
+
+STAT = """$POS,2190,518400.000,2,452260.6090,3635877.0120,5203453.4540,0.0000,0.0000,0.0000
+$VELACC,2190,518400.000,2,0.0000,0.0000,0.0000,0.00000,0.00000,0.00000,0.0000,0.0000,0.0000,0.00000,0.00000,0.00000
+$CLK,2190,518400.000,2,1,12.345,0.000,-1.250,0.000
+$ION,2190,518400.000,2,G05,123.4,45.6,0.1234,0.0000
+$TROP,2190,518400.000,2,1,2.3456,0.0000
+$HWBIAS,2190,518400.000,2,1,0.1234,0.0000
+$SAT,2190,518400.000,G05,1,123.4,45.6,0.1234,-0.0012,1,45.0,1,0,120,0,0,0
+$SAT,2190,518400.000,R07,1,200.0,10.5,-1.5000,0.0031,1,38.0,1,1,-1,2,3,4
+$SAT,2190,518400.000,E11,2,300.0,60.0,0.0500,0.0002,0,42.5,2,0,500,0,0,0
+$POS,2190,518401.000,1,452260.6091,3635877.0121,5203453.4541,452260.6092,3635877.0122,5203453.4542
+$SAT,2190,518401.000,G05,1,123.5,45.7,0.1000,-0.0010,1,45.0,2,0,121,0,0,0
+$SAT,2190,518401.000,C20,1,10.0,80.0,0.2000,0.0001,1,50.0,2,0,30,0,0,0
+$SAT,2190,518401.000,S20,1,170.0,30.0,0.3000,0.0003,1,40.0,2,0,40,0,0,0
+$POS,2190,518402.000,1,452260.6092,3635877.0122,5203453.4542,452260.6093,3635877.0123,5203453.4543
+$SAT,2190,518402.000,G05,1,123.6,45.8,0.0900,-0.0009,1,45.0,2,0,122,0,0,0
+"""
+
+
+class TestSolutionStatus(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "file.pos.stat")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(STAT)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_parse_stat_file(self):
+        stat = parse_stat_file(self.path)
+        self.assertEqual(["POS", "VELACC", "CLK", "ION", "TROP", "HWBIAS", "SAT"], list(stat))
+
+        pos = stat["POS"]
+        self.assertEqual(["time", "stat", "x", "y", "z", "xf", "yf", "zf"], list(pos))
+        np.testing.assert_array_equal(np.datetime64("2022-01-01", "ns") + np.arange(3) * np.timedelta64(1, "s"),
+                                      pos["time"])
+        np.testing.assert_array_equal([2, 1, 1], pos["stat"])
+        self.assertEqual(np.int32, pos["stat"].dtype)
+        self.assertEqual(452260.6093, pos["xf"][2])
+
+        sat = stat["SAT"]
+        np.testing.assert_array_equal(["G05", "R07", "E11", "G05", "C20", "S20", "G05"], sat["sat"])
+        np.testing.assert_array_equal([1, 1, 2, 1, 1, 1, 1], sat["frq"])
+        self.assertEqual(np.float32, sat["resp"].dtype)
+        self.assertAlmostEqual(-1.5, float(sat["resp"][1]))
+        self.assertEqual(-1, sat["lock"][1])
+        np.testing.assert_array_equal([2, 3, 4], [sat["outc"][1], sat["slipc"][1], sat["rejc"][1]])
+
+        self.assertEqual("G05", stat["ION"]["sat"][0])
+        self.assertAlmostEqual(-1.25, stat["CLK"]["clk3"][0])
+        self.assertAlmostEqual(2.3456, float(stat["TROP"]["ztd"][0]), places=6)
+        self.assertEqual(1, stat["HWBIAS"]["frq"][0])
+
+    def test_filters(self):
+        stat = parse_stat_file(self.path, records=["SAT"], satellites=["G05", "R"])
+        self.assertEqual(["SAT"], list(stat))
+        np.testing.assert_array_equal(["G05", "R07", "G05", "G05"], stat["SAT"]["sat"])
+
+        stat = parse_stat_file(self.path, records=["SAT", "POS"], start=np.datetime64("2022-01-01T00:00:01"),
+                               end=np.datetime64("2022-01-01T00:00:02"))
+        self.assertEqual(1, len(stat["POS"]["time"]))
+        np.testing.assert_array_equal(["G05", "C20", "S20"], stat["SAT"]["sat"])
+
+        # chunks of 4 lines give the same records, reading stops after the end
+        chunks = list(iter_stat_file(self.path, chunk_size=4, records=["SAT"], end=np.datetime64("2022-01-01T00:00:01")))
+        self.assertEqual(2, len(chunks))
+        np.testing.assert_array_equal(["G05", "R07", "E11"], np.concatenate([chunk["SAT"]["sat"] for chunk in chunks]))
+
+    def test_sbas(self):
+        # RTKLib writes SBAS satellites as bare PRNs, the PRN 120 isn't G20
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("$SAT,2190,518402.000,120,1,170.0,30.0,0.3000,0.0003,1,40.0,2,0,40,0,0,0\n"
+                    "$ION,2190,518402.000,2,138,170.0,30.0,0.1234,0.0000\n")
+        stat = parse_stat_file(self.path, records=["SAT", "ION"])
+        np.testing.assert_array_equal(["G05", "R07", "E11", "G05", "C20", "S20", "G05", "S20"], stat["SAT"]["sat"])
+        np.testing.assert_array_equal(["G05", "S38"], stat["ION"]["sat"])
+
+        stat = parse_stat_file(self.path, records=["SAT"], satellites=["G"])
+        np.testing.assert_array_equal(["G05", "G05", "G05"], stat["SAT"]["sat"])
+        stat = parse_stat_file(self.path, records=["SAT"], satellites=["S20"], start=np.datetime64("2022-01-01T00:00:02"))
+        np.testing.assert_array_equal(["S20"], stat["SAT"]["sat"])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError) as e:
+            parse_stat_file(self.path, records=["$SAT"])
+        self.assertEqual("Unknown record type $SAT.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            parse_stat_file(self.path, satellites=["X01"])
+        self.assertEqual("Unknown satellite X01.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            next(iter_stat_file(self.path, chunk_size=0))
+        self.assertEqual("Chunk size must be positive.", str(e.exception))
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("$TROP,2190,518402.000,1,1,2.3456\n")
+        with self.assertRaises(ValueError) as e:
+            parse_stat_file(self.path)
+        self.assertEqual("Number of fields of $TROP records doesn't match.", str(e.exception))
+
+
+if __name__ == "__main__":
+    main()
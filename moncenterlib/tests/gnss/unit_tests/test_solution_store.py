@@ -0,0 +1,140 @@
+from datetime import datetime
+import os
+import tempfile
+from unittest import TestCase, main
+import numpy as np
+from moncenterlib.gnss.solution_store import SolutionStore
+
+
+def make_day(day: str, epochs: int = 2880, height: float = 150.0) -> dict[str, np.ndarray]:
+    time = np.datetime64(day, "ns") + np.arange(epochs) * np.timedelta64(30, "s")
+    return {
+        "time": time,
+        "lat": np.full(epochs, 55.0),
+        "lon": np.full(epochs, 82.0),
+        "height": height + np.arange(epochs) * 1e-6,
+        "Q": np.ones(epochs, dtype=np.int32)
+    }
+
+
+class TestSolutionStore(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "store")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_ingest_and_read(self):
+        store = SolutionStore(self.path)
+        self.assertEqual(2880, store.ingest("NSK1", make_day("2021-12-31")))
+        store.ingest("NSK1", make_day("2022-01-01"))
+        store.ingest("NSK1", make_day("2022-01-02"))
+        store.ingest("NOVM", make_day("2022-01-01", 10))
+
+        self.assertEqual(["NOVM", "NSK1"], store.stations)
+        self.assertEqual(["2021.0", "2022.0"], sorted(os.listdir(os.path.join(self.path, "NSK1"))))
+        start, end, epochs = store.span("NSK1")
+        self.assertEqual(np.datetime64("2021-12-31", "ns"), start)
+        self.assertEqual(np.datetime64("2022-01-02T23:59:30", "ns"), end)
+        self.assertEqual(3 * 2880, epochs)
+
+        # the window inside one chunk is the memory map of the store
+        data = store.read("NSK1", datetime(2022, 1, 2), datetime(2022, 1, 3), columns=["height"])
+        self.assertEqual(["time", "height"], list(data))
+        self.assertIsInstance(data["height"], np.memmap)
+        np.testing.assert_array_equal(make_day("2022-01-02")["height"], data["height"])
+
+        # the window across years, the new instance reads only the manifest
+        data = SolutionStore(self.path).read("NSK1", np.datetime64("2021-12-31T23:00"), np.datetime64("2022-01-01T01:00"))
+        self.assertEqual(240, len(data["time"]))
+        self.assertEqual(np.dtype(np.int32), data["Q"].dtype)
+        self.assertTrue(np.all(np.diff(data["time"]) == np.timedelta64(30, "s")))
+
+        data = store.read("NSK1", datetime(2023, 1, 1))
+        self.assertEqual(0, len(data["time"]))
+        self.assertEqual(np.dtype("datetime64[ns]"), data["time"].dtype)
+
+        series = store.read_stations(columns=["height"])
+        self.assertEqual(["NOVM", "NSK1"], list(series))
+        self.assertEqual(10, len(series["NOVM"]["height"]))
+
+    def test_idempotent_ingest(self):
+        store = SolutionStore(self.path)
+        for day in ("2022-01-01", "2022-01-02", "2022-01-03"):
+            store.ingest("NSK1", make_day(day))
+        before = store.read("NSK1")
+
+        store.ingest("NSK1", make_day("2022-01-02"))
+        after = store.read("NSK1")
+        for key, value in before.items():
+            np.testing.assert_array_equal(value, after[key])
+        self.assertEqual(["2022.1"], os.listdir(os.path.join(self.path, "NSK1")))
+
+        # re-processed day replaces the old rows, epochs missing in the new solution are removed
+        day = make_day("2022-01-02", height=200.0)
+        keep = (np.arange(2880) % 2 == 0) | (np.arange(2880) == 2879)
+        day = {key: value[keep] for key, value in day.items()}
+        store.ingest("NSK1", day)
+        data = store.read("NSK1", datetime(2022, 1, 2), datetime(2022, 1, 3))
+        self.assertEqual(1441, len(data["time"]))
+        self.assertTrue(np.all(data["height"] >= 200))
+        self.assertEqual(2 * 2880 + 1441, store.span("NSK1")[2])
+        self.assertTrue(np.all(np.diff(store.read("NSK1")["time"]) > np.timedelta64(0)))
+
+    def test_ingest_shorter_day(self):
+        store = SolutionStore(self.path)
+        store.ingest("NSK1", make_day("2022-01-01"))
+        store.ingest("NSK1", make_day("2022-01-02"))
+
+        # the re-processed day ends at 22:29:30, old epochs after it are removed too
+        store.ingest("NSK1", make_day("2022-01-02", 2700, height=200.0))
+        data = store.read("NSK1")
+        self.assertEqual(5580, len(data["time"]))
+        self.assertEqual(np.datetime64("2022-01-02T22:29:30", "ns"), data["time"][-1])
+        self.assertTrue(np.all(data["height"][2880:] >= 200))
+
+        # the day after the end of the chunk is appended, the day of the end is rewritten
+        store.ingest("NSK1", make_day("2022-01-03", 10))
+        self.assertEqual(["2022.1"], os.listdir(os.path.join(self.path, "NSK1")))
+        store.ingest("NSK1", make_day("2022-01-03T12:00", 10))
+        self.assertEqual(["2022.2"], os.listdir(os.path.join(self.path, "NSK1")))
+        data = store.read("NSK1", datetime(2022, 1, 3))
+        self.assertEqual(10, len(data["time"]))
+        self.assertEqual(np.datetime64("2022-01-03T12:00", "ns"), data["time"][0])
+
+    def test_interrupted_append(self):
+        store = SolutionStore(self.path)
+        store.ingest("NSK1", make_day("2022-01-01", 10))
+        # bytes written without the manifest are ignored and cut by the next append
+        with open(os.path.join(self.path, "NSK1", "2022.0", "0.bin"), "ab") as f:
+            f.write(b"\x00" * 80)
+        store.ingest("NSK1", make_day("2022-01-02", 10))
+        data = SolutionStore(self.path).read("NSK1")
+        self.assertEqual(20, len(data["time"]))
+        self.assertTrue(np.all(np.diff(data["time"]) > np.timedelta64(0)))
+
+    def test_errors(self):
+        store = SolutionStore(self.path)
+        store.ingest("NSK1", make_day("2022-01-01", 10))
+        data = make_day("2022-01-02", 10)
+        del data["Q"]
+        with self.assertRaises(ValueError) as e:
+            store.ingest("NSK1", data)
+        self.assertEqual("Columns of data don't match columns of station NSK1.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            store.ingest("NSK1", {"height": np.zeros(1)})
+        self.assertEqual("Time serie has no key \"time\".", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            store.read("NOVM")
+        self.assertEqual("Station NOVM is not found in the store.", str(e.exception))
+
+        with self.assertRaises(ValueError) as e:
+            store.read("NSK1", columns=["x"])
+        self.assertEqual("Column x is not found in the store.", str(e.exception))
+
+
+if __name__ == "__main__":
+    main()
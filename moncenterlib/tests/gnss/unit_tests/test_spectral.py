@@ -0,0 +1,86 @@
+from functools import partial
+from unittest import TestCase, main
+import numpy as np
+from moncenterlib.gnss.spectral import fft_periodogram, lomb_scargle
+from moncenterlib.tests.gnss.unit_tests.synthetic import make_series
+
+
+# semiannual signal in e, white noise in n, trend and annual signal in u
+signal_series = partial(make_series, trend=(0, 0, 0.01), annual=(0, 0, 0.005), semiannual=(0.002, 0, 0), noise=0.001)
+
+
+class TestSpectral(TestCase):
+    def test_lomb_scargle(self):
+        series = {"NSK1": signal_series(1461, 1), "NOVM": signal_series(1000, 2)}
+        keep = np.random.default_rng(3).random(1000) > 0.3
+        series["NOVM"] = {key: value[keep] for key, value in series["NOVM"].items()}
+        series["NOVM"]["n"][:5] = np.nan
+
+        spectra = lomb_scargle(series)
+
+        self.assertEqual(list(spectra), ["NSK1", "NOVM"])
+        for station in spectra:
+            frequency = spectra[station]["frequency"]
+            self.assertAlmostEqual(frequency[np.argmax(spectra[station]["u"])], 1.0, delta=0.1)
+            self.assertAlmostEqual(frequency[np.argmax(spectra[station]["e"])], 2.0, delta=0.1)
+            self.assertEqual(len(frequency), len(spectra[station]["n"]))
+        # 4 years, oversampling 4 and Nyquist of daily data
+        self.assertAlmostEqual(spectra["NSK1"]["frequency"][0], 1 / 16, places=3)
+        self.assertAlmostEqual(spectra["NSK1"]["frequency"][-1], 182.6, delta=0.1)
+
+        # the fast method on the regular grid and the direct method agree
+        frequencies = np.linspace(0.1, 20, 300)
+        irregular = np.append(frequencies, 20.5)
+        fast = lomb_scargle(series, frequencies=frequencies)["NOVM"]["u"]
+        direct = lomb_scargle(series, frequencies=irregular)["NOVM"]["u"][:-1]
+        np.testing.assert_allclose(fast, direct, rtol=1e-4, atol=1e-4 * direct.max())
+
+    def test_fft_periodogram(self):
+        series = {"NSK1": signal_series(1024, 4)}
+        spectra = fft_periodogram(series)
+        frequency = spectra["NSK1"]["frequency"]
+        self.assertEqual(len(frequency), 512)
+        self.assertAlmostEqual(frequency[np.argmax(spectra["NSK1"]["u"])], 1.0, delta=0.1)
+
+        # white noise level: 2 * sigma^2 * step
+        level = 2 * 0.001 ** 2 / 365.25
+        self.assertAlmostEqual(np.mean(spectra["NSK1"]["n"]) / level, 1, delta=0.1)
+
+        # Lomb-Scargle of the evenly spaced serie is the same at Fourier frequencies
+        spectra_ls = lomb_scargle(series, frequencies=frequency[:100])
+        fft = spectra["NSK1"]["n"][:100]
+        np.testing.assert_allclose(spectra_ls["NSK1"]["n"], fft, rtol=1e-4, atol=1e-4 * fft.max())
+
+    def test_fft_periodogram_parseval(self):
+        # the one-sided PSD integrates to the variance, the Nyquist bin of even series isn't doubled
+        for days in (1024, 1023):
+            series = signal_series(days, 5)
+            spectra = fft_periodogram({"NSK1": series}, components=("n",))
+            years = np.arange(days) / 365.25
+            residuals = series["n"] - np.polyval(np.polyfit(years, series["n"], 1), years)
+            self.assertEqual(days // 2, len(spectra["NSK1"]["frequency"]))
+            self.assertAlmostEqual(np.sum(spectra["NSK1"]["n"]) * spectra["NSK1"]["frequency"][0] / np.mean(residuals ** 2),
+                                   1, places=9)
+
+    def test_errors(self):
+        series = signal_series(100, 5)
+        series["u"][10] = np.nan
+        with self.assertRaises(ValueError) as e:
+            fft_periodogram({"NSK1": series})
+        self.assertEqual(str(e.exception), "Serie of station NSK1 isn't evenly spaced or has gaps. Use lomb_scargle.")
+
+        with self.assertRaises(ValueError) as e:
+            lomb_scargle({"NSK1": series}, components=("x",))
+        self.assertEqual(str(e.exception), "Component x is not found in time serie of station NSK1.")
+
+        with self.assertRaises(ValueError) as e:
+            lomb_scargle({"NSK1": series}, frequencies=np.array([0.0, 1.0]))
+        self.assertEqual(str(e.exception), "Frequencies must be positive.")
+
+        with self.assertRaises(ValueError) as e:
+            lomb_scargle({"NSK1": series}, oversampling=0)
+        self.assertEqual(str(e.exception), "Oversampling must be positive.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import time
+from functools import partial
+from unittest import TestCase, main
+import numpy as np
+from moncenterlib.gnss.time_series_analysis import (detect_offsets, estimate_noise, estimate_trend, filter_common_mode,
+                                                    remove_outliers, sidereal_filter, time2mjd, _noise_likelihood,
+                                                    _NoiseProblem)
+from moncenterlib.tests.gnss.unit_tests.synthetic import make_series
+
+
+# daily series with trends of 10, 20 and 30 mm/year and seasonal terms
+seasonal_series = partial(make_series, trend=(0.01, 0.02, 0.03), annual=0.003, semiannual=0.001)
+
+
+class TestRemoveOutliers(TestCase):
+    def test_remove_outliers(self):
+        series = {"NSK1": seasonal_series(1000, 1), "NOVM": seasonal_series(700, 2)}
+        series["NSK1"]["u"][[10, 500, 900]] += 0.05
+        series["NOVM"]["e"][[3, 600]] -= 0.04
+        series["NOVM"]["n"][100] = np.nan
+
+        cleaned, outliers = remove_outliers(series)
+
+        self.assertEqual(list(cleaned), ["NSK1", "NOVM"])
+        self.assertEqual(len(outliers["NOVM"]["e"]), 700)
+        for index in (10, 500, 900):
+            self.assertTrue(outliers["NSK1"]["u"][index])
+            self.assertTrue(np.isnan(cleaned["NSK1"]["u"][index]))
+        self.assertTrue(outliers["NOVM"]["e"][[3, 600]].all())
+        self.assertFalse(outliers["NOVM"]["n"][100])
+        # gaussian noise of 3 IQR is rejected rarely
+        for station in series:
+            for component in ("e", "n", "u"):
+                self.assertLess(outliers[station][component].sum(), 8)
+        self.assertFalse(outliers["NSK1"]["e"][[10, 500, 900]].any())
+        # input isn't changed
+        self.assertFalse(np.isnan(series["NSK1"]["u"][10]))
+        np.testing.assert_array_equal(cleaned["NSK1"]["time"], series["NSK1"]["time"])
+
+    def test_mjd_and_other_components(self):
+        data = seasonal_series(400, 3)
+        series = {"NSK1": {"time": 58849.0 + np.arange(400.0), "x": data["e"]}}
+        series["NSK1"]["x"][200] += 1
+        _, outliers = remove_outliers(series, components=("x",), seasonal=False, half_seasonal=False)
+        self.assertTrue(outliers["NSK1"]["x"][200])
+
+        np.testing.assert_array_equal([58849.0, 59580.5], time2mjd(np.array(["2020-01-01", "2022-01-01T12:00"],
+                                                                            dtype="datetime64[ns]")))
+        np.testing.assert_array_equal(series["NSK1"]["time"], time2mjd(series["NSK1"]["time"]))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError) as e:
+            remove_outliers({"NSK1": {"time": np.arange(3.0), "e": np.zeros(3)}})
+        self.assertEqual(str(e.exception), "Component n is not found in time serie of station NSK1.")
+
+        with self.assertRaises(ValueError) as e:
+            remove_outliers({}, iq_factor=0.0)
+        self.assertEqual(str(e.exception), "IQ factor must be positive.")
+
+        with self.assertRaises(ValueError) as e:
+            remove_outliers({}, max_iterations=0)
+        self.assertEqual(str(e.exception), "Number of iterations must be positive.")
+
+
+class TestEstimateTrend(TestCase):
+    def test_estimate_trend(self):
+        series = {"NSK1": seasonal_series(1500, 1), "NOVM": seasonal_series(800, 2, trend=(-0.02, -0.04, -0.06))}
+        offset = series["NOVM"]["time"][500]
+        for component in ("e", "n", "u"):
+            series["NOVM"][component][500:] += 0.01
+        series["NSK1"]["u"][::7] = np.nan
+
+        result = estimate_trend(series, half_seasonal=True, offsets={"NOVM": np.array([offset])})
+
+        self.assertEqual(list(result), ["NSK1", "NOVM"])
+        for i, component in enumerate(("e", "n", "u")):
+            nsk1 = result["NSK1"][component]
+            self.assertAlmostEqual(nsk1["trend"], 0.01 * (i + 1), delta=4 * nsk1["trend_sigma"])
+            self.assertLess(nsk1["trend_sigma"], 0.0002)
+            self.assertAlmostEqual(nsk1["sigma0"], 0.002, delta=0.0002)
+            self.assertAlmostEqual(np.hypot(nsk1["annual_cos"], nsk1["annual_sin"]), 0.003, delta=0.0005)
+            self.assertNotIn("offset_0", nsk1)
+
+            novm = result["NOVM"][component]
+            self.assertAlmostEqual(novm["trend"], -0.02 * (i + 1), delta=4 * novm["trend_sigma"])
+            # phases are measured from J2000, series of different length give the same annual terms
+            shift = i - 2 * np.pi * (58849 - 51544) / 365.25
+            for station in (nsk1, novm):
+                self.assertAlmostEqual(station["annual_cos"], 0.003 * np.sin(shift), delta=4 * station["annual_cos_sigma"])
+                self.assertAlmostEqual(station["annual_sin"], 0.003 * np.cos(shift), delta=4 * station["annual_sin_sigma"])
+            self.assertAlmostEqual(novm["offset_0"], 0.01, delta=4 * novm["offset_0_sigma"])
+        self.assertEqual(result["NSK1"]["u"]["count"], 1500 - 215)
+        self.assertEqual(result["NSK1"]["e"]["count"], 1500)
+
+    def test_short_and_unused_offsets(self):
+        series = {"NSK1": {"time": np.array([58849.0, 58850.0]), "e": np.array([1.0, 2.0])},
+                  "NOVM": {"time": 58849.0 + np.arange(100.0), "e": np.arange(100.0) / 365.25}}
+        result = estimate_trend(series, components=("e",), seasonal=False,
+                                offsets={"NOVM": np.array([58000.0, 58900.0])})
+        self.assertTrue(np.isnan(result["NSK1"]["e"]["trend"]))
+        self.assertTrue(np.isnan(result["NSK1"]["e"]["sigma0"]))
+        self.assertAlmostEqual(result["NOVM"]["e"]["trend"], 1.0)
+        self.assertTrue(np.isnan(result["NOVM"]["e"]["offset_0"]))
+        self.assertAlmostEqual(result["NOVM"]["e"]["offset_1"], 0.0)
+
+        with self.assertRaises(ValueError) as e:
+            estimate_trend({"NSK1": {"time": np.arange(3.0)}})
+        self.assertEqual(str(e.exception), "Component e is not found in time serie of station NSK1.")
+
+
+def make_flicker(days: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    k = np.arange(1, days)
+    response = np.concatenate([[1.0], np.cumprod((k - 0.5) / k)])
+    return np.convolve(rng.normal(0, 0.002, days), response)[:days] + rng.normal(0, 0.001, days)
+
+
+class TestEstimateNoise(TestCase):
+    def test_estimate_noise(self):
+        days = 600
+        series = {"NSK1": {"time": 58849.0 + np.arange(days), "u": 0.01 * np.arange(days) / 365.25 + make_flicker(days, 1)}}
+        series["NOVM"] = {"time": series["NSK1"]["time"].copy(), "u": make_flicker(days, 2)}
+        series["NOVM"]["u"][100:130] = np.nan
+
+        result = estimate_noise(series, components=("u",), seasonal=False)
+        white = estimate_trend(series, components=("u",), seasonal=False)
+
+        for station in ("NSK1", "NOVM"):
+            noise = result[station]["u"]
+            self.assertTrue(-1.6 < noise["kappa"] < -0.4)
+            self.assertTrue(0 < noise["fraction"] < 1)
+            # colored noise gives the larger uncertainty of velocity
+            self.assertGreater(noise["trend_sigma"], 3 * white[station]["u"]["trend_sigma"])
+        self.assertAlmostEqual(result["NSK1"]["u"]["trend"], 0.01, delta=4 * result["NSK1"]["u"]["trend_sigma"])
+        self.assertEqual(result["NOVM"]["u"]["count"], days - 30)
+
+        parallel = estimate_noise(series, components=("u",), seasonal=False, workers=2)
+        self.assertAlmostEqual(parallel["NOVM"]["u"]["kappa"], result["NOVM"]["u"]["kappa"])
+
+    def test_likelihood_with_gaps(self):
+        index = np.delete(np.arange(300), [5, 6, 7, 150])
+        design = np.column_stack([np.ones(len(index)), index / 365.25])
+        y = make_flicker(300, 3)[index]
+        toeplitz = _noise_likelihood(0.7, -1.2, _NoiseProblem(design, y, index, False))
+        dense = _noise_likelihood(0.7, -1.2, _NoiseProblem(design, y, index, True))
+        self.assertAlmostEqual(toeplitz[0], dense[0])
+        np.testing.assert_allclose(toeplitz[1], dense[1])
+        np.testing.assert_allclose(toeplitz[2], dense[2])
+
+        # many gaps, the block of missing epochs by diagonals of the inverse
+        rng = np.random.default_rng(4)
+        index = np.sort(rng.choice(np.arange(1, 1999), 1500, replace=False))
+        index = np.concatenate([[0], index, [1999]])
+        design = np.column_stack([np.ones(len(index)), index / 365.25])
+        y = make_flicker(2000, 5)[index]
+        problem = _NoiseProblem(design, y, index, False)
+        self.assertFalse(problem.by_rows)
+        toeplitz = _noise_likelihood(0.9, -1.7, problem)
+        dense = _noise_likelihood(0.9, -1.7, _NoiseProblem(design, y, index, True))
+        self.assertAlmostEqual(toeplitz[0], dense[0], places=6)
+        np.testing.assert_allclose(toeplitz[2], dense[2], rtol=1e-8)
+
+    def test_long_serie_time(self):
+        # 10 years of daily solutions with 2% of gaps
+        days = 3650
+        u = 0.003 * np.arange(days) / 365.25 + make_flicker(days, 6)
+        u[np.random.default_rng(7).random(days) < 0.02] = np.nan
+        series = {"NSK1": {"time": 50000.0 + np.arange(days), "u": u}}
+
+        start = time.perf_counter()
+        result = estimate_noise(series, components=("u",))
+        self.assertLess(time.perf_counter() - start, 20)
+        self.assertTrue(-1.3 < result["NSK1"]["u"]["kappa"] < -0.7)
+        self.assertAlmostEqual(result["NSK1"]["u"]["trend"], 0.003, delta=4 * result["NSK1"]["u"]["trend_sigma"])
+
+    def test_short_and_errors(self):
+        result = estimate_noise({"NSK1": {"time": np.arange(3.0), "u": np.zeros(3)}}, components=("u",))
+        self.assertTrue(np.isnan(result["NSK1"]["u"]["trend"]))
+        self.assertTrue(np.isnan(result["NSK1"]["u"]["kappa"]))
+
+        with self.assertRaises(ValueError) as e:
+            estimate_noise({}, workers=0)
+        self.assertEqual(str(e.exception), "Number of workers must be positive.")
+
+
+class TestDetectOffsets(TestCase):
+    def test_detect_offsets(self):
+        series = {"NSK1": seasonal_series(1500, 1), "NOVM": seasonal_series(1000, 2), "BRDK": seasonal_series(800, 3)}
+        series["NSK1"]["u"][400:] += 0.01
+        series["NSK1"]["e"][1100:] -= 0.008
+        series["NOVM"]["n"][600:] += 0.02
+        series["NOVM"]["n"][1::5] = np.nan
+
+        offsets = detect_offsets(series)
+
+        self.assertEqual(list(offsets), ["NSK1", "NOVM", "BRDK"])
+        np.testing.assert_array_equal(offsets["NSK1"], series["NSK1"]["time"][[400, 1100]])
+        np.testing.assert_array_equal(offsets["NOVM"], series["NOVM"]["time"][[600]])
+        self.assertEqual(len(offsets["BRDK"]), 0)
+        self.assertEqual(offsets["BRDK"].dtype, series["BRDK"]["time"].dtype)
+
+        result = estimate_trend(series, half_seasonal=True, offsets=offsets)
+        self.assertAlmostEqual(result["NSK1"]["u"]["offset_0"], 0.01, delta=0.001)
+        self.assertAlmostEqual(result["NSK1"]["e"]["offset_1"], -0.008, delta=0.001)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError) as e:
+            detect_offsets({}, window=0.0)
+        self.assertEqual(str(e.exception), "Window must be positive.")
+
+        with self.assertRaises(ValueError) as e:
+            detect_offsets({}, threshold=-1.0)
+        self.assertEqual(str(e.exception), "Threshold must be positive.")
+
+
+class TestFilterCommonMode(TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(5)
+        days = 1200
+        # random walk without the trend, it stays in residuals
+        self.common = np.cumsum(rng.normal(0, 0.001, days))
+        self.common -= np.polyval(np.polyfit(np.arange(days), self.common, 1), np.arange(days))
+        self.series = {}
+        for i in range(12):
+            time = np.datetime64("2020-01-01", "ns") + np.arange(days) * np.timedelta64(1, "D")
+            data = {"time": time}
+            for j, component in enumerate(("e", "n", "u")):
+                data[component] = (0.01 * j * np.arange(days) / 365.25 + (1 + 0.05 * i) * self.common
+                                   + rng.normal(0, 0.001, days))
+            # missing epochs and different lengths
+            keep = rng.random(days) > 0.1
+            keep[:i * 20] = False
+            self.series[f"S{i:03d}"] = {key: value[keep] for key, value in data.items()}
+
+    def scatter(self, series):
+        result = estimate_trend(series, seasonal=False)
+        return np.mean([result[station]["u"]["sigma0"] for station in result])
+
+    def test_stacking(self):
+        filtered, common_mode = filter_common_mode(self.series, seasonal=False)
+        self.assertEqual(list(filtered), list(self.series))
+        self.assertEqual(len(common_mode["time"]), 1200)
+        self.assertEqual(common_mode["u_modes"].shape, (1200, 1))
+        np.testing.assert_array_equal(common_mode["stations"], list(self.series))
+        self.assertLess(self.scatter(filtered), self.scatter(self.series) / 2)
+        # the trend is kept
+        result = estimate_trend(filtered, seasonal=False)
+        self.assertAlmostEqual(result["S000"]["u"]["trend"], 0.02, delta=0.002)
+        self.assertEqual(len(filtered["S005"]["u"]), len(self.series["S005"]["u"]))
+
+    def test_pca(self):
+        filtered, common_mode = filter_common_mode(self.series, method="pca", n_modes=2, seasonal=False)
+        self.assertEqual(common_mode["e_response"].shape, (12, 2))
+        self.assertLess(self.scatter(filtered), self.scatter(self.series) / 2)
+        response = common_mode["u_response"][:, 0]
+        np.testing.assert_allclose(response / response[0], 1 + 0.05 * np.arange(12), rtol=0.05)
+        self.assertGreater(np.corrcoef(common_mode["u_modes"][300:, 0], self.common[300:])[0, 1], 0.98)
+
+    def test_few_stations_and_errors(self):
+        series = {station: self.series[station] for station in ("S000", "S001")}
+        filtered, common_mode = filter_common_mode(series)
+        self.assertTrue(np.isnan(common_mode["u_modes"]).all())
+        np.testing.assert_array_equal(filtered["S000"]["u"], series["S000"]["u"])
+
+        with self.assertRaises(ValueError) as e:
+            filter_common_mode(series, method="ica")
+        self.assertEqual(str(e.exception), "Method must be stacking or pca.")
+
+        with self.assertRaises(ValueError) as e:
+            filter_common_mode(series, n_modes=0)
+        self.assertEqual(str(e.exception), "Number of modes must be positive.")
+
+
+class TestSiderealFilter(TestCase):
+    def test_sidereal_filter(self):
+        rng = np.random.default_rng(7)
+        period = 86154
+        seconds = np.arange(0, 4 * period, 2)
+        multipath = 0.005 * np.sin(2 * np.pi * (seconds % period) / 600)
+        data = {"time": np.datetime64("2022-01-01", "ns") + seconds * np.timedelta64(1, "s"),
+                "u": multipath + 0.01 * (seconds // period) + rng.normal(0, 0.001, len(seconds)),
+                "e": multipath.copy()}
+        data["u"][1000:1100] = np.nan
+
+        filtered, templates = sidereal_filter({"NSK1": data}, components=("e", "u"), n_days=2)
+
+        first_day = seconds < period
+        self.assertTrue(np.isnan(templates["NSK1"]["u"][first_day]).all())
+        np.testing.assert_array_equal(filtered["NSK1"]["u"][first_day], data["u"][first_day])
+        after = seconds >= 2 * period
+        self.assertLess(np.std(filtered["NSK1"]["e"][after]), 1e-9)
+        residual = filtered["NSK1"]["u"][after] - 0.01 * (seconds[after] // period)
+        self.assertLess(np.nanstd(residual), 0.0015)
+        self.assertGreater(np.nanstd(data["u"][after] - 0.01 * (seconds[after] // period)), 0.003)
+        # the daily position is kept
+        day3 = (seconds >= 3 * period)
+        self.assertAlmostEqual(np.nanmean(filtered["NSK1"]["u"][day3]), 0.03, delta=0.0005)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError) as e:
+            sidereal_filter({}, n_days=0)
+        self.assertEqual(str(e.exception), "Number of days must be positive.")
+
+        with self.assertRaises(ValueError) as e:
+            sidereal_filter({}, period=0.0)
+        self.assertEqual(str(e.exception), "Period must be positive.")
+
+        filtered, _ = sidereal_filter({"NSK1": {"time": np.array([], dtype="datetime64[ns]"), "u": np.array([])}},
+                                      components=("u",))
+        self.assertEqual(len(filtered["NSK1"]["u"]), 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pathlib import Path
 import tempfile
 from unittest import TestCase, main
@@ -243,6 +244,89 @@ NOVM                                                        MARKER NAME
                 result = mcl_gnss_tools.get_marker_name(temp_file.name)
             self.assertEqual(str(msg.exception), "Unknown version rinex 4")
 
+    def test_read_rinex_header(self):
+        text = """     3.04           OBSERVATION DATA    M                   RINEX VERSION / TYPE
+NOVM                                                        MARKER NAME
+12367M002                                                   MARKER NUMBER
+5233K85139          TRIMBLE NETR9       5.45                REC # / TYPE / VERS
+1441112501          TRM59800.00     NONE                    ANT # / TYPE
+   452260.6090  3635877.0120  5203453.4540                  APPROX POSITION XYZ
+G   18 C1C L1C D1C S1C C1W S1W C2W L2W D2W S2W C2L L2L D2L  SYS / # / OBS TYPES
+       S2L C5Q L5Q D5Q S5Q                                  SYS / # / OBS TYPES
+R    4 C1C L1C C2P L2P                                      SYS / # / OBS TYPES
+    30.000                                                  INTERVAL
+  2022     1     1     0     0    0.0000000     GPS         TIME OF FIRST OBS
+  2022     1     1    23    59   30.0000000     GPS         TIME OF LAST OBS
+                                                            END OF HEADER
+> 2022 01 01 00 00  0.0000000  0 20
+"""
+        with tempfile.NamedTemporaryFile() as temp_file:
+            with open(temp_file.name, "w", encoding="utf-8") as f:
+                f.write(text)
+                # the data after the header isn't read
+                f.write("\xff" * 100)
+            header = mcl_gnss_tools.read_rinex_header(temp_file.name)
+
+        self.assertEqual(("3.04", "O", "M"), (header.version, header.file_type, header.system))
+        self.assertEqual(("NOVM", "12367M002"), (header.marker_name, header.marker_number))
+        self.assertEqual(("5233K85139", "TRIMBLE NETR9", "5.45"),
+                         (header.receiver_number, header.receiver_type, header.receiver_version))
+        self.assertEqual(("1441112501", "TRM59800.00     NONE"), (header.antenna_number, header.antenna_type))
+        self.assertEqual((452260.609, 3635877.012, 5203453.454), header.approx_position)
+        self.assertEqual(30.0, header.interval)
+        self.assertEqual(datetime(2022, 1, 1), header.time_first_obs)
+        self.assertEqual(datetime(2022, 1, 1, 23, 59, 30), header.time_last_obs)
+        self.assertEqual("GPS", header.time_system)
+        self.assertEqual(["G", "R"], list(header.obs_types))
+        self.assertEqual(18, len(header.obs_types["G"]))
+        self.assertEqual("D5Q", header.obs_types["G"][-2])
+        self.assertEqual(["C1C", "L1C", "C2P", "L2P"], header.obs_types["R"])
+        self.assertEqual("2022-01-01", mcl_gnss_tools.get_start_date(header))
+        self.assertEqual("NOVM", mcl_gnss_tools.get_marker(header, "file"))
+
+        text = """     2.11           OBSERVATION DATA    G (GPS)             RINEX VERSION / TYPE
+     4    L1    L2    C1    P2                              # / TYPES OF OBSERV
+                                                            END OF HEADER
+"""
+        with tempfile.NamedTemporaryFile() as temp_file:
+            with open(temp_file.name, "w", encoding="utf-8") as f:
+                f.write(text)
+            header = mcl_gnss_tools.read_rinex_header(temp_file.name)
+        self.assertEqual({"G": ["L1", "L2", "C1", "P2"]}, header.obs_types)
+        self.assertIsNone(header.marker_name)
+        self.assertIsNone(header.time_first_obs)
+        self.assertEqual("", mcl_gnss_tools.get_start_date(header))
+        self.assertEqual("", mcl_gnss_tools.get_marker(header, "file"))
+
+    def test_read_rinex_header_invalid_values(self):
+        # optional values which can't be converted don't break fields which are asked
+        text = """     3.04           OBSERVATION DATA    M                   RINEX VERSION / TYPE
+NOVM                                                        MARKER NAME
+   452260.6090  3635877.0120                                APPROX POSITION XYZ
+                                                            INTERVAL
+  2022     1     1     0     0    0.0000000     GPS         TIME OF FIRST OBS
+  2022     1     1    23                                    TIME OF LAST OBS
+                                                            END OF HEADER
+"""
+        with tempfile.NamedTemporaryFile() as temp_file:
+            with open(temp_file.name, "w", encoding="utf-8") as f:
+                f.write(text)
+            header = mcl_gnss_tools.read_rinex_header(temp_file.name)
+            self.assertEqual("2022-01-01", mcl_gnss_tools.get_start_date_from_obs(temp_file.name))
+            self.assertEqual("NOVM", mcl_gnss_tools.get_marker_name(temp_file.name))
+
+        self.assertIsNone(header.approx_position)
+        self.assertIsNone(header.interval)
+        self.assertIsNone(header.time_last_obs)
+        self.assertEqual(["APPROX POSITION XYZ", "INTERVAL", "TIME OF LAST OBS"], list(header.invalid))
+        self.assertEqual("", header.invalid["INTERVAL"])
+
+        # the asked field can't be converted
+        header.invalid["TIME OF FIRST OBS"] = "2022 1"
+        with self.assertRaises(ValueError) as msg:
+            mcl_gnss_tools.get_start_date(header)
+        self.assertEqual("Value '2022 1' of TIME OF FIRST OBS can't be converted.", str(msg.exception))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,91 @@
+from unittest import TestCase, main
+import numpy as np
+from moncenterlib.gnss.transforms import llh2enu, llh2xyz, sd_xyz2enu, series2enu, xyz2enu, xyz2llh
+
+
+# NSK1 from rgs-centre
+NSK1_XYZ = (447670.3, 3638117.39, 5202281.56)
+NSK1_LLH = (55.01225551, 82.98501852, 141.68742225)
+
+
+class TestTransforms(TestCase):
+    def test_llh2xyz(self):
+        x, y, z = llh2xyz(*NSK1_LLH)
+        np.testing.assert_allclose([x, y, z], NSK1_XYZ, atol=0.05)
+
+        x, y, z = llh2xyz(0.0, 0.0, 0.0)
+        np.testing.assert_allclose([x, y, z], [6378137.0, 0, 0], atol=1e-6)
+
+        with self.assertRaises(ValueError) as e:
+            llh2xyz(0.0, 0.0, 0.0, "KRASS")
+        self.assertEqual(str(e.exception), "Unknown ellipsoid KRASS")
+
+    def test_xyz2llh_roundtrip(self):
+        rng = np.random.default_rng(1)
+        lat = rng.uniform(-90, 90, 1000)
+        lon = rng.uniform(-180, 180, 1000)
+        height = rng.uniform(-100, 10000, 1000)
+        for ellipsoid in ("WGS84", "GRS80"):
+            lat2, lon2, height2 = xyz2llh(*llh2xyz(lat, lon, height, ellipsoid), ellipsoid=ellipsoid)
+            np.testing.assert_allclose(lat2, lat, atol=1e-9)
+            np.testing.assert_allclose(lon2, lon, atol=1e-9)
+            np.testing.assert_allclose(height2, height, atol=1e-4)
+
+        lat, lon, height = xyz2llh(0.0, 0.0, 6356852.3142)
+        self.assertAlmostEqual(float(lat), 90.0)
+        self.assertAlmostEqual(float(height), 100.0, places=3)
+
+    def test_xyz2enu(self):
+        x, y, z = llh2xyz(np.array([NSK1_LLH[0], NSK1_LLH[0]]),
+                          np.array([NSK1_LLH[1], NSK1_LLH[1]]),
+                          np.array([NSK1_LLH[2], NSK1_LLH[2] + 1]))
+        ref = tuple(float(v) for v in llh2xyz(*NSK1_LLH))
+        e, n, u = xyz2enu(x, y, z, ref)
+        np.testing.assert_allclose(e, [0, 0], atol=1e-6)
+        np.testing.assert_allclose(n, [0, 0], atol=1e-6)
+        np.testing.assert_allclose(u, [0, 1], atol=1e-6)
+
+        # 1e-5 deg to the north is about 1.1 m
+        e, n, u = llh2enu(NSK1_LLH[0] + 1e-5, NSK1_LLH[1], NSK1_LLH[2], NSK1_LLH)
+        self.assertAlmostEqual(float(e), 0, places=6)
+        self.assertAlmostEqual(float(n), 1.1133, places=3)
+
+    def test_sd_xyz2enu(self):
+        # pure vertical variance at the equator on lon 0 is the variance of x
+        sd = sd_xyz2enu(np.array([0.03]), np.array([0.01]), np.array([0.02]),
+                        np.array([0.0]), np.array([0.0]), np.array([0.0]), 0.0, 0.0)
+        np.testing.assert_allclose(sd["sdu"], [0.03])
+        np.testing.assert_allclose(sd["sde"], [0.01])
+        np.testing.assert_allclose(sd["sdn"], [0.02])
+
+        # trace of covariance is invariant
+        sdxy, sdyz, sdzx = np.array([0.005]), np.array([-0.004]), np.array([0.003])
+        sd = sd_xyz2enu(np.array([0.03]), np.array([0.01]), np.array([0.02]), sdxy, sdyz, sdzx, *NSK1_LLH[:2])
+        self.assertAlmostEqual(float(sd["sde"][0] ** 2 + sd["sdn"][0] ** 2 + sd["sdu"][0] ** 2),
+                               0.03 ** 2 + 0.01 ** 2 + 0.02 ** 2)
+
+    def test_series2enu(self):
+        x, y, z = llh2xyz(np.full(3, NSK1_LLH[0]), np.full(3, NSK1_LLH[1]), NSK1_LLH[2] + np.arange(3.0))
+        data = {"time": np.arange(3), "x": x, "y": y, "z": z, "Q": np.array([1, 1, 2]),
+                "sdx": np.full(3, 0.01), "sdy": np.full(3, 0.01), "sdz": np.full(3, 0.01),
+                "sdxy": np.zeros(3), "sdyz": np.zeros(3), "sdzx": np.zeros(3)}
+        ref = dict(zip("xyz", (float(v) for v in llh2xyz(*NSK1_LLH))))
+        enu = series2enu(data, ref)
+        self.assertEqual(list(enu), ["time", "e", "n", "u", "sde", "sdn", "sdu", "sden", "sdnu", "sdue", "Q"])
+        np.testing.assert_allclose(enu["u"], [0, 1, 2], atol=1e-6)
+        np.testing.assert_allclose(enu["sdu"], [0.01] * 3)
+
+        data = {"lat": np.full(2, NSK1_LLH[0]), "lon": np.full(2, NSK1_LLH[1]), "height": np.array([1.0, 2.0]),
+                "sdn": np.ones(2), "sde": np.ones(2), "sdu": np.ones(2),
+                "sdne": np.zeros(2), "sdeu": np.zeros(2), "sdun": np.full(2, 0.5)}
+        enu = series2enu(data, tuple(float(v) for v in llh2xyz(NSK1_LLH[0], NSK1_LLH[1], 0.0)))
+        np.testing.assert_allclose(enu["u"], [1, 2], atol=1e-6)
+        np.testing.assert_allclose(enu["sdnu"], [0.5, 0.5])
+
+        with self.assertRaises(ValueError) as e:
+            series2enu({"e": np.zeros(1)}, NSK1_XYZ)
+        self.assertEqual(str(e.exception), "Time serie has no xyz or llh coordinates.")
+
+
+if __name__ == "__main__":
+    main()